@@ -6,14 +6,17 @@
 
 import pandas as pd
 
+from excel_ingest import open_workbook
+from settings import data_path
+
 def analyze_basic_info():
     """分析基本信息Excel文件"""
-    file_path = '/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台/基本信息.xlsx'
+    file_path = data_path('basic')
     
     try:
         # 检查Excel文件的所有工作表
         print("=== 检查Excel工作表 ===")
-        excel_file = pd.ExcelFile(file_path)
+        excel_file = open_workbook(file_path)
         print(f"工作表名称: {excel_file.sheet_names}")
         
         # 专门分析主要负责人工作表
@@ -21,7 +24,7 @@ def analyze_basic_info():
             print("\n=== 详细分析主要负责人工作表 ===")
             
             # 尝试不同的读取方式
-            df_raw = pd.read_excel(file_path, sheet_name='主要负责人', header=None)
+            df_raw = excel_file.parse(sheet_name='主要负责人', header=None)
             print(f"原始数据形状: {df_raw.shape}")
             print("前10行原始数据:")
             print(df_raw.head(10))
@@ -44,7 +47,7 @@ def analyze_basic_info():
         for sheet_name in excel_file.sheet_names:
             if sheet_name != '主要负责人':
                 print(f"\n=== 工作表: {sheet_name} ===")
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
+                df = excel_file.parse(sheet_name=sheet_name)
                 print(f"数据形状: {df.shape}")
                 print("流程列表:")
                 if len(df.columns) > 0:
@@ -54,7 +57,7 @@ def analyze_basic_info():
         # 尝试不同的读取方式
         print("\n=== 尝试不同的读取方式 ===")
         # 尝试读取所有列
-        df_all = pd.read_excel(file_path, header=None)
+        df_all = excel_file.parse(header=None)
         print(f"无表头读取数据形状: {df_all.shape}")
         print("前10行:")
         print(df_all.head(10))
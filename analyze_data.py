@@ -10,6 +10,8 @@ import pandas as pd
 import sys
 import os
 
+from settings import data_dir
+
 def analyze_excel_structure(file_path, file_description):
     """
     分析Excel文件的数据结构
@@ -99,8 +101,8 @@ def main():
     """
     print("开始分析Excel文件数据结构...")
     
-    # 设置文件路径
-    base_dir = "/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台"
+    # 设置文件路径（数据目录见 settings，可用环境变量 LCJX_DATA_DIR 指定）
+    base_dir = data_dir()
     
     # 要分析的文件列表
     files_to_analyze = [
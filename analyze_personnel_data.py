@@ -6,9 +6,11 @@
 
 import pandas as pd
 
+from settings import data_path
+
 def analyze_personnel_data():
     """分析人员效率明细Excel文件"""
-    file_path = '/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台/人员效率明细.xls'
+    file_path = data_path('personnel')
     
     # 先读取原始数据看结构
     print("=== 原始数据结构 ===")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量运行 - 按清单为多个业务单元/期间生成 chart_data.json
+所有任务在同一个进程池中执行：每个工作进程只导入一次 pandas 和各模块，
+打开过的工作簿句柄、时长解析缓存在它执行的各任务之间复用；
+输入文件大的任务先调度，避免最后只剩一个大任务在跑。
+每个任务的输出由 chart_format.write_chart_data 原子地写出（临时文件 + fsync + 改名），读取方不会读到写了一半的文件。
+
+清单格式（JSON，相对路径相对于清单文件所在目录）:
+{
+  "output_dir": "输出根目录（可选）",
+  "cache_dir": "步骤缓存根目录（可选）",
+  "jobs": [
+    {"tenant": "分公司A", "period": "2025-06", "data_dir": "A/2025-06"},
+    {"tenant": "分公司B", "period": "2025-06", "data_dir": "B/2025-06", "output": "B.json",
+     "personnel": "B/人员效率明细.xlsx"}
+  ]
+}
+任务的输出路径依次取：任务的 output；<output_dir>/<tenant>/<period>/chart_data.json；数据目录下的 chart_data.json。
+任务中的 flow / personnel / basic 可以单独指定某个输入文件
+
+用法:
+python batch_runner.py manifest.json --workers 4
+"""
+
+import argparse
+import json
+import os
+import time
+
+from chart_format import write_chart_data
+from instrumentation import add_arguments, recording, stage
+from parallel_loader import default_workers, run_jobs
+from pipeline import Pipeline
+from settings import FILE_NAMES, INPUT_KEYS, default_paths
+
+
+def _resolve(base_dir, path):
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(base_dir, path))
+
+
+def load_manifest(manifest_file):
+    """
+    读取清单，返回任务列表
+
+    每个任务为 {'name', 'tenant', 'period', 'paths', 'cache_dir'}，
+    name 为 "业务单元/期间"，在清单中必须唯一
+    """
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    output_dir = manifest.get('output_dir')
+    cache_dir = manifest.get('cache_dir')
+
+    jobs = []
+    seen = set()
+    for i, entry in enumerate(manifest.get('jobs', [])):
+        if 'data_dir' not in entry and not all(key in entry for key in INPUT_KEYS):
+            raise ValueError(f"清单第 {i + 1} 个任务缺少 data_dir")
+        tenant = str(entry.get('tenant') or f'job{i + 1}')
+        period = str(entry.get('period') or '')
+        name = f'{tenant}/{period}' if period else tenant
+        if name in seen:
+            raise ValueError(f"清单中有重复的任务: {name}")
+        seen.add(name)
+
+        data_dir = _resolve(base_dir, entry['data_dir']) if 'data_dir' in entry else base_dir
+        paths = default_paths(data_dir)
+        for key in INPUT_KEYS:
+            if entry.get(key):
+                paths[key] = _resolve(base_dir, entry[key])
+        if entry.get('output'):
+            paths['output'] = _resolve(base_dir, entry['output'])
+        elif output_dir:
+            paths['output'] = os.path.join(_resolve(base_dir, output_dir), tenant, period, FILE_NAMES['output'])
+
+        # 各任务的步骤缓存分开存放（同名步骤只保留最新指纹的结果，共用目录会互相删除）
+        job_cache = os.path.join(_resolve(base_dir, cache_dir), tenant, period) if cache_dir else None
+        jobs.append({'name': name, 'tenant': tenant, 'period': period, 'paths': paths, 'cache_dir': job_cache})
+    return jobs
+
+
+def input_size(job):
+    """任务输入文件的总大小（字节），用于调度顺序；文件不存在时按0计"""
+    return sum(os.path.getsize(job['paths'][key]) for key in INPUT_KEYS if os.path.exists(job['paths'][key]))
+
+
+def run_job(job, force=False):
+    """
+    执行一个任务（在工作进程中调用）
+
+    返回:
+    {'success', 'name', 'output', 'seconds', 'computed', 'cached'}，失败时带 'error'
+    """
+    started = time.perf_counter()
+    result = {'success': False, 'name': job['name'], 'output': job['paths']['output']}
+    try:
+        with stage('batch_job', tenant=job['tenant'], period=job['period']):
+            pipeline = Pipeline(job['paths'], cache_dir=job['cache_dir'], force=force)
+            document = pipeline.build_document()
+            write_chart_data(document, job['paths']['output'])
+        statuses = list(pipeline.status.values())
+        result.update(success=True, computed=statuses.count('computed'), cached=statuses.count('cached'))
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def run_batch(jobs, workers=None, force=False):
+    """
+    在进程池中执行所有任务，输入大的任务先调度
+
+    返回:
+    各任务的结果列表，顺序与 jobs 一致
+    """
+    scheduled = sorted(jobs, key=input_size, reverse=True)
+    results = run_jobs({job['name']: (run_job, (job, force)) for job in scheduled}, workers=workers)
+    return [results[job['name']] for job in jobs]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='按清单为多个业务单元/期间批量生成 chart_data.json')
+    parser.add_argument('manifest', help='清单文件（JSON）')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数（默认为CPU核数，1为串行）')
+    parser.add_argument('--only', action='append', metavar='TENANT', help='只运行指定业务单元的任务（可重复）')
+    parser.add_argument('--force', action='store_true', help='忽略步骤缓存，重新计算')
+    parser.add_argument('--summary', help='把各任务的结果写入该 JSON 文件')
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    jobs = load_manifest(args.manifest)
+    if args.only:
+        jobs = [job for job in jobs if job['tenant'] in args.only]
+    if not jobs:
+        print("清单中没有要运行的任务")
+        return 1
+
+    workers = default_workers() if args.workers is None else args.workers
+    print(f"共 {len(jobs)} 个任务，{min(workers, len(jobs))} 个工作进程")
+    with recording(args, 'batch_runner'):
+        results = run_batch(jobs, workers=workers, force=args.force)
+
+    for result in results:
+        if result['success']:
+            print(f"  {result['name']}: 完成 {result['seconds']:.1f}s "
+                  f"(重新计算 {result['computed']} 步，复用缓存 {result['cached']} 步) -> {result['output']}")
+        else:
+            print(f"  {result['name']}: 失败 {result['error']}")
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    failed = [result for result in results if not result['success']]
+    print(f"完成 {len(results) - len(failed)} 个，失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试的 pytest 配置
+数据规模由环境变量 LCJX_BENCH_SIZES 指定（逗号分隔，默认 1k），
+模拟文件第一次使用时生成到 benchmarks/data/<规模>/
+"""
+
+import os
+
+import pytest
+
+from generate_exports import DEFAULT_OUTPUT, generate_exports, parse_size
+
+
+def bench_sizes():
+    return [size.strip() for size in os.environ.get('LCJX_BENCH_SIZES', '1k').split(',') if size.strip()]
+
+
+@pytest.fixture(scope='session', params=bench_sizes())
+def export_paths(request):
+    """某个数据规模的模拟文件路径"""
+    size = request.param
+    return generate_exports(os.path.join(DEFAULT_OUTPUT, size), parse_size(size))
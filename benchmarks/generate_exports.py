@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成基准测试用的模拟导出文件
+按真实导出的版式（标题行、分组表头行、字段表头行、合计行，之后是数据行）写出
+流程效率明细.xlsx、人员效率明细.xlsx 和 基本信息.xlsx，全部在本地生成，不依赖网络
+
+用法:
+python benchmarks/generate_exports.py 1k 100k --output benchmarks/data
+"""
+
+import argparse
+import os
+import random
+
+import openpyxl
+
+# 预设的数据规模（数据行数）
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+# 默认输出目录：benchmarks/data/<规模>/
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+FLOW_GROUPS = ['', '流程使用情况', '', '', '', '流程运行情况', '', '流程超期结束情况', '', '', '',
+               '截至6月30日未结束情况', '']
+FLOW_HEADERS = ['模板名称', '发起流程数', '环比', '同比', '使用率', '结束流程数', '平均运行时长', '流程期限',
+                '超期结束流程数', '超期结束比例', '平均超期时长', '未结束流程数', '超期未结束流程数']
+
+PERSONNEL_GROUPS = ['', '', '', '处理情况', '', '超期处理情况', '', '', '', '未处理情况', '']
+PERSONNEL_HEADERS = ['人员名称', '部门名称', '单位名称', '处理数', '平均处理时长', '超期处理数', '超期处理比例',
+                     '平均超期时长', '平均超期时长', '未处理流程数', '超期未处理流程数']
+
+CATEGORY_SHEETS = ['销售类流程', '采购类流程', '项目&产品管理类流程']
+UNITS = ['总公司', '分公司A', '分公司B', '分公司C']
+DEPARTMENTS = ['销售部', '采购部', '财务部', '研发部', '行政部', '法务部', '项目管理部', '售后服务部']
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚'
+
+
+def parse_size(text):
+    """'1k' / '100k' / '1m' 或直接写行数"""
+    text = text.lower()
+    if text in SIZES:
+        return SIZES[text]
+    if text.endswith('k'):
+        return int(text[:-1]) * 1000
+    if text.endswith('m'):
+        return int(text[:-1]) * 1000000
+    return int(text)
+
+
+def random_duration(rng):
+    """模拟"2天3小时15分"这样的时长文字，少量为"-" """
+    if rng.random() < 0.05:
+        return '-'
+    days, hours, minutes = rng.choice([0, 0, 0, 1, 2, 5, 12]), rng.randrange(24), rng.randrange(60)
+    text = ''
+    if days:
+        text += f'{days}天'
+    if hours:
+        text += f'{hours}小时'
+    if minutes or not text:
+        text += f'{minutes}分'
+    return text
+
+
+def random_ratio(rng, signed=False):
+    value = rng.randrange(-60, 80) if signed else rng.randrange(0, 100)
+    return f'{value:+d}%' if signed else f'{value}%'
+
+
+def _write_sheet(path, title, groups, headers, rows, total_row):
+    """写出带标题行、分组表头行、字段表头行和合计行的工作表（write_only 模式，内存占用恒定）"""
+    book = openpyxl.Workbook(write_only=True)
+    sheet = book.create_sheet()
+    sheet.append([title])
+    sheet.append([group or None for group in groups])
+    sheet.append(headers)
+    sheet.append(total_row)
+    for row in rows:
+        sheet.append(row)
+    book.save(path)
+
+
+def template_names(count):
+    return [f'模板{i:07d}申请单' for i in range(count)]
+
+
+def person_names(count):
+    names = []
+    for i in range(count):
+        names.append(SURNAMES[i % len(SURNAMES)] + GIVEN_NAMES[(i // len(SURNAMES)) % len(GIVEN_NAMES)] + str(i))
+    return names
+
+
+def write_flow_export(path, rows, seed=0):
+    rng = random.Random(seed)
+
+    def generate():
+        for name in template_names(rows):
+            started = rng.randrange(0, 2000)
+            finished = rng.randrange(0, started + 1)
+            overdue = rng.randrange(0, finished + 1) if rng.random() < 0.2 else 0
+            yield [name, started, random_ratio(rng, True), random_ratio(rng, True), f'{rng.random():.1%}',
+                   finished, random_duration(rng), '－', overdue, random_ratio(rng), random_duration(rng),
+                   rng.randrange(0, 200), rng.randrange(0, 10)]
+
+    total = ['合计', rows * 1000, '-', '-', '100%', rows * 900, '1天', '-', 0, '0%', '-', 0, 0]
+    _write_sheet(path, '流程效率明细', FLOW_GROUPS, FLOW_HEADERS, generate(), total)
+
+
+def write_personnel_export(path, rows, seed=1):
+    rng = random.Random(seed)
+
+    def generate():
+        for name in person_names(rows):
+            handled = rng.randrange(0, 1200)
+            overdue = rng.randrange(0, handled + 1) if rng.random() < 0.3 else 0
+            yield [name, rng.choice(DEPARTMENTS), rng.choice(UNITS), handled, random_duration(rng), overdue,
+                   random_ratio(rng), random_duration(rng), random_duration(rng), rng.randrange(0, 50),
+                   rng.randrange(0, 5)]
+
+    total = ['合计', None, None, rows * 500, '1天', 0, '0%', '-', '-', 0, 0]
+    _write_sheet(path, '人员效率明细', PERSONNEL_GROUPS, PERSONNEL_HEADERS, generate(), total)
+
+
+def write_basic_info(path, flow_rows, personnel_rows, seed=2):
+    """基本信息.xlsx：三个流程分类工作表和主要负责人工作表，均没有表头行"""
+    rng = random.Random(seed)
+    book = openpyxl.Workbook(write_only=True)
+    templates = template_names(flow_rows)
+    for sheet_name in CATEGORY_SHEETS:
+        sheet = book.create_sheet(sheet_name)
+        for name in rng.sample(templates, min(len(templates), max(10, flow_rows // 20))):
+            sheet.append([name])
+    sheet = book.create_sheet('主要负责人')
+    persons = person_names(personnel_rows)
+    for name in rng.sample(persons, min(len(persons), max(15, personnel_rows // 50))):
+        sheet.append([name])
+    book.save(path)
+
+
+def export_paths(output_dir):
+    """模拟文件的路径，键与 settings.default_paths 一致"""
+    return {
+        'flow': os.path.join(output_dir, '流程效率明细.xlsx'),
+        'personnel': os.path.join(output_dir, '人员效率明细.xlsx'),
+        'basic': os.path.join(output_dir, '基本信息.xlsx'),
+        'output': os.path.join(output_dir, 'chart_data.json'),
+    }
+
+
+def generate_exports(output_dir, rows, force=False):
+    """
+    生成一组模拟文件（已存在时跳过）
+
+    返回:
+    模拟文件的路径字典
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = export_paths(output_dir)
+    if force or not os.path.exists(paths['flow']):
+        write_flow_export(paths['flow'], rows)
+    if force or not os.path.exists(paths['personnel']):
+        write_personnel_export(paths['personnel'], rows)
+    if force or not os.path.exists(paths['basic']):
+        write_basic_info(paths['basic'], rows, rows)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成基准测试用的模拟导出文件')
+    parser.add_argument('sizes', nargs='*', default=['1k'], help='数据规模：1k / 100k / 1m 或行数')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='输出目录（每种规模一个子目录）')
+    parser.add_argument('--force', action='store_true', help='重新生成已存在的文件')
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        output_dir = os.path.join(args.output, size)
+        print(f"生成 {size}（{parse_size(size)} 行）: {output_dir}")
+        generate_exports(output_dir, parse_size(size), force=args.force)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
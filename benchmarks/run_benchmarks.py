@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试运行器（不依赖 pytest-benchmark）
+对每个数据规模、每个步骤重复计时，结果逐行追加到 benchmarks/history.jsonl，
+并与历史上同一步骤、同一规模的最近一次结果比较，变慢超过阈值的步骤标记为回退
+
+用法:
+python benchmarks/run_benchmarks.py 1k 100k --repeat 5
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from generate_exports import DEFAULT_OUTPUT, generate_exports, parse_size
+from stages import ROOT, STAGE_NAMES, STAGES, rows_of
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.jsonl')
+
+# 中位数比上次慢超过该比例时视为回退
+DEFAULT_THRESHOLD = 0.2
+
+
+def git_commit():
+    """当前提交的哈希，不在 git 仓库中时返回 None"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_stage(prepare, run, paths, repeat):
+    """准备输入后重复执行 repeat 次，返回 (每次耗时列表, 最后一次结果)"""
+    inputs = prepare(paths)
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run(*inputs)
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def load_history(path):
+    """读取历史记录，返回 {(步骤, 规模): 最近一次记录}"""
+    latest = {}
+    if not os.path.exists(path):
+        return latest
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            latest[(record.get('stage'), record.get('size'))] = record
+    return latest
+
+
+def append_history(path, records):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def run_benchmarks(sizes, stage_names=None, repeat=3, history=DEFAULT_HISTORY, threshold=DEFAULT_THRESHOLD):
+    """
+    运行基准测试并写入历史记录
+
+    返回:
+    (本次记录列表, 回退的记录列表)
+    """
+    previous = load_history(history)
+    environment = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+    }
+
+    records = []
+    regressions = []
+    for size in sizes:
+        rows = parse_size(size)
+        paths = generate_exports(os.path.join(DEFAULT_OUTPUT, size), rows)
+        for name, prepare, run in STAGES:
+            if stage_names and name not in stage_names:
+                continue
+            timings, result = time_stage(prepare, run, paths, repeat)
+            record = {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'size': size,
+                'rows': rows,
+                'stage': name,
+                'repeat': repeat,
+                'min': min(timings),
+                'median': statistics.median(timings),
+                'mean': statistics.fmean(timings),
+                'output_rows': rows_of(result),
+                **environment,
+            }
+            last = previous.get((name, size))
+            if last and last.get('median'):
+                record['change'] = record['median'] / last['median'] - 1
+                if record['change'] > threshold:
+                    regressions.append(record)
+            records.append(record)
+
+            change = f"  ({record['change']:+.0%})" if 'change' in record else ''
+            print(f"{size:>6} {name:<30} 中位数 {record['median'] * 1000:10.1f} ms{change}")
+
+    append_history(history, records)
+    return records, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='运行各步骤的基准测试，结果写入 history.jsonl')
+    parser.add_argument('sizes', nargs='*', default=['1k'], help='数据规模：1k / 100k / 1m 或行数')
+    parser.add_argument('--stage', action='append', choices=STAGE_NAMES, help='只运行指定步骤（可重复）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个步骤重复次数')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='历史记录文件（JSON lines）')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='判定回退的变慢比例')
+    args = parser.parse_args(argv)
+
+    _, regressions = run_benchmarks(args.sizes, args.stage, args.repeat, args.history, args.threshold)
+    if regressions:
+        print("\n以下步骤比上次变慢:")
+        for record in regressions:
+            print(f"  {record['size']} {record['stage']}: {record['change']:+.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
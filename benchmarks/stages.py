@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试的各个步骤
+每个步骤由 prepare(paths) 准备输入（不计时），run(*inputs) 是被计时的部分；
+pytest-benchmark 用例和 run_benchmarks.py 共用这里的定义
+"""
+
+import os
+import sys
+import tempfile
+
+# 从仓库根目录导入被测模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import duration_parser  # noqa: E402
+import excel_ingest  # noqa: E402
+import generate_personnel_rankings as personnel  # noqa: E402
+import process_data  # noqa: E402
+from chart_format import write_chart_data  # noqa: E402
+from name_index import main_person_rows  # noqa: E402
+from personnel_stream import stream_personnel_rankings  # noqa: E402
+
+# 仓库中的真实流程导出（.xls）。没有可用的 .xls 写出库，模拟文件只能生成 .xlsx，
+# xlrd 的解析耗时用这个固定大小的文件测量，不随数据规模变化
+XLS_FIXTURE = os.path.join(ROOT, '流程效率明细.xls')
+
+
+def _fresh(func):
+    """清掉进程内的工作簿句柄和时长解析缓存，每次计时都从文件重新解析"""
+    def run(*args):
+        excel_ingest.close_workbooks()
+        duration_parser.clear_cache()
+        return func(*args)
+    return run
+
+
+def _flow_frame(paths):
+    return (process_data.load_flow_frame(paths['flow']),)
+
+
+def _personnel_frame(paths):
+    return (personnel._load_personnel_frame(paths['personnel']),)
+
+
+def _raw_flow_sheet(paths):
+    import pandas as pd
+    return (pd.read_excel(paths['flow'], header=None),)
+
+
+def _durations(paths):
+    df = personnel._load_personnel_frame(paths['personnel'])
+    return (df['平均处理时长'],)
+
+
+def _flow_inputs(paths):
+    data = process_data.process_flow_efficiency_data(paths['flow'])['data']
+    categories = process_data.process_flow_categories(paths['basic'])['categories']
+    return data, categories
+
+
+def _main_person_inputs(paths):
+    df = personnel._load_personnel_frame(paths['personnel'])
+    main_persons = personnel.load_main_responsible_persons(paths['basic'])
+    return df, main_persons, main_person_rows(df, main_persons)
+
+
+def _stream_inputs(paths):
+    return paths['personnel'], personnel.load_main_responsible_persons(paths['basic'])
+
+
+def _document(paths):
+    data, categories = _flow_inputs(paths)
+    df, main_persons, rows = _main_person_inputs(paths)
+    document = {
+        'success': True,
+        'data': process_data.build_flow_rankings(data, categories),
+        'personal_process_ranking': personnel.generate_personal_process_ranking(df),
+        'main_person_process_ranking': personnel.generate_main_person_process_ranking(df, main_persons, rows),
+        'main_person_duration_ranking': personnel.generate_main_person_duration_ranking(df, main_persons, rows),
+    }
+    return (document,)
+
+
+def _clean_column_names(df):
+    return process_data.clean_column_names(df)
+
+
+def _parse_durations(values):
+    duration_parser.clear_cache()
+    return duration_parser.parse_duration_minutes(values)
+
+
+def _write_json(document):
+    # 每次写到新的临时目录，结束后连同预压缩文件、快照、清单一起删除（创建和删除目录的耗时可以忽略）
+    with tempfile.TemporaryDirectory(prefix='lcjx-bench-') as directory:
+        write_chart_data(document, os.path.join(directory, 'chart_data.json'))
+
+
+# (步骤名称, 准备输入, 被计时的函数)
+STAGES = [
+    ('load_flow_excel', lambda paths: (paths['flow'],), _fresh(process_data.load_flow_frame)),
+    ('load_flow_xls', lambda paths: (XLS_FIXTURE,), _fresh(process_data.load_flow_frame)),
+    ('load_personnel_excel', lambda paths: (paths['personnel'],), _fresh(personnel._load_personnel_frame)),
+    ('load_categories', lambda paths: (paths['basic'],), _fresh(process_data.process_flow_categories)),
+    ('clean_column_names', _raw_flow_sheet, _clean_column_names),
+    ('parse_duration', _durations, _parse_durations),
+    ('flow_rankings', _flow_inputs, process_data.build_flow_rankings),
+    ('personal_process_ranking', _personnel_frame, personnel.generate_personal_process_ranking),
+    ('main_person_process_ranking', _main_person_inputs, personnel.generate_main_person_process_ranking),
+    ('main_person_duration_ranking', _main_person_inputs, personnel.generate_main_person_duration_ranking),
+    ('stream_personnel_rankings', _stream_inputs, _fresh(stream_personnel_rankings)),
+    ('write_chart_data', _document, _write_json),
+]
+
+STAGE_NAMES = [name for name, _, _ in STAGES]
+
+
+def rows_of(result):
+    """步骤结果的行数（记录数），无法判断时返回 None"""
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, dict):
+        for key in ['data', 'categories', 'personal_process_ranking']:
+            if key in result and hasattr(result[key], '__len__'):
+                return len(result[key])
+        return None
+    return len(result) if hasattr(result, '__len__') else None
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+各步骤的 pytest-benchmark 用例
+运行: python -m pytest benchmarks --benchmark-only
+没有安装 pytest-benchmark 时整个模块跳过
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from stages import STAGES  # noqa: E402
+
+
+@pytest.mark.parametrize('name, prepare, run', STAGES, ids=[name for name, _, _ in STAGES])
+def test_stage(benchmark, export_paths, name, prepare, run):
+    inputs = prepare(export_paths)
+    benchmark.group = name
+    result = benchmark(run, *inputs)
+    assert result is not None or name == 'write_chart_data'
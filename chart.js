@@ -32,6 +32,56 @@ window.addEventListener('load', function() {
     loadData();
 });
 
+/**
+ * 数据在 Web Worker（data_worker.js）中下载和解析，按清单只下载内容变化了的数据集，
+ * 未变化的取 IndexedDB 缓存；浏览器不支持 Worker 或 Worker 无法启动（如以 file:// 打开页面）时在页面线程下载
+ */
+const DATA_WORKER_URL = 'data_worker.js';
+const CHART_MANIFEST_URL = 'chart_data.manifest.json';
+const CHART_DATA_URL = 'chart_data.json';
+
+async function fetchFullDocument() {
+    const response = await fetch(CHART_DATA_URL, { cache: 'no-cache' });
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+}
+
+/**
+ * 取得最新的 chart_data.json（v2 结构）
+ */
+function fetchChartDocument() {
+    if (typeof Worker === 'undefined') {
+        return fetchFullDocument();
+    }
+    return new Promise((resolve, reject) => {
+        let worker;
+        try {
+            worker = new Worker(DATA_WORKER_URL);
+        } catch (error) {
+            resolve(fetchFullDocument());
+            return;
+        }
+        worker.onmessage = event => {
+            worker.terminate();
+            if (event.data.error) {
+                reject(new Error(event.data.error));
+            } else {
+                console.log('数据集加载情况:', event.data.stats);
+                resolve(event.data.document);
+            }
+        };
+        worker.onerror = event => {
+            event.preventDefault();
+            worker.terminate();
+            console.warn('数据加载 Worker 不可用，在页面线程下载:', event.message);
+            resolve(fetchFullDocument());
+        };
+        worker.postMessage({ manifest: CHART_MANIFEST_URL, fallback: CHART_DATA_URL });
+    });
+}
+
 /**
  * 加载JSON数据文件
  */
@@ -42,14 +92,8 @@ async function loadData() {
         // 显示加载状态
         showLoadingState();
         
-        // 获取数据文件
-        const response = await fetch('chart_data.json');
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        chartData = await response.json();
+        // 获取数据文件（在 Worker 中加载，未变化的数据集取缓存）
+        chartData = expandChartData(await fetchChartDocument());
         
         if (!chartData.success) {
             throw new Error(chartData.error || '数据加载失败');
@@ -67,6 +111,56 @@ async function loadData() {
     }
 }
 
+/**
+ * 将v2紧凑格式（按列存储 + 行号排名）还原为图表使用的记录结构
+ */
+function expandChartData(doc) {
+    if (!doc || doc.format_version !== 2) {
+        return doc;
+    }
+    
+    const fromColumns = table => {
+        const rowCount = table.values.length > 0 ? table.values[0].length : 0;
+        const rows = new Array(rowCount);
+        for (let i = 0; i < rowCount; i++) {
+            const row = {};
+            table.columns.forEach((column, c) => {
+                row[column] = table.values[c][i];
+            });
+            rows[i] = row;
+        }
+        return rows;
+    };
+    
+    const expanded = { ...doc };
+    delete expanded.format_version;
+    
+    if (doc.data && doc.data.raw_data) {
+        const rawData = fromColumns(doc.data.raw_data);
+        const pick = indices => indices.map(i => rawData[i]);
+        const categoryRankings = {};
+        Object.entries(doc.data.category_rankings || {}).forEach(([name, indices]) => {
+            categoryRankings[name] = pick(indices);
+        });
+        expanded.data = {
+            ...doc.data,
+            raw_data: rawData,
+            flow_ranking: pick(doc.data.flow_ranking || []),
+            duration_ranking: pick(doc.data.duration_ranking || []),
+            category_rankings: categoryRankings
+        };
+    }
+    
+    ['personal_process_ranking', 'main_person_process_ranking', 'main_person_duration_ranking',
+     'template_overdue_ranking', 'backlog_risk_ranking', 'person_overdue_ranking'].forEach(name => {
+        if (doc[name]) {
+            expanded[name] = fromColumns(doc[name]);
+        }
+    });
+    
+    return expanded;
+}
+
 /**
  * 显示加载状态
  */
@@ -88,38 +182,56 @@ function showErrorState(message) {
 }
 
 /**
- * 初始化所有图表
+ * 各图表的 canvas -> 创建函数；图表在 canvas 滚动到可见区域附近时才创建
+ */
+const CHART_BUILDERS = {
+    flowRankingChart: () => createFlowRankingChart(),
+    durationRankingChart: () => createDurationRankingChart(),
+    salesDurationChart: () => createCategoryDurationChart('销售类流程', 'salesDurationChart'),
+    purchaseDurationChart: () => createCategoryDurationChart('采购类流程', 'purchaseDurationChart'),
+    projectDurationChart: () => createCategoryDurationChart('项目&产品管理类流程', 'projectDurationChart')
+};
+
+// 提前创建的距离：canvas 距可见区域不到这个距离时就创建，滚动到时已经画好
+const CHART_LAZY_MARGIN = '200px 0px';
+
+let chartObserver = null;
+
+function buildChart(canvasId) {
+    try {
+        console.log(`创建图表 ${canvasId}...`);
+        CHART_BUILDERS[canvasId]();
+    } catch (error) {
+        console.error(`图表 ${canvasId} 创建失败:`, error);
+    }
+}
+
+/**
+ * 初始化所有图表（按需创建）
  */
 function initializeCharts() {
     console.log('开始初始化图表...');
-    console.log('chartData:', chartData);
     
-    try {
-        // 1. 发起流程数及完成数排名
-        console.log('创建发起流程数排名图表...');
-        createFlowRankingChart();
-        
-        // 2. 流程运行时长排名
-        console.log('创建流程运行时长排名图表...');
-        createDurationRankingChart();
-        
-        // 3. 销售类流程平均运行时长排名
-        console.log('创建销售类流程图表...');
-        createCategoryDurationChart('销售类流程', 'salesDurationChart');
-        
-        // 4. 采购类流程平均运行时长排名
-        console.log('创建采购类流程图表...');
-        createCategoryDurationChart('采购类流程', 'purchaseDurationChart');
-        
-        // 5. 项目&产品管理类流程平均运行时长排名
-        console.log('创建项目管理类流程图表...');
-        createCategoryDurationChart('项目&产品管理类流程', 'projectDurationChart');
-        
-        console.log('所有图表初始化完成');
-    } catch (error) {
-        console.error('图表初始化失败:', error);
-        showErrorState(error.message);
+    if (chartObserver) {
+        chartObserver.disconnect();
+    }
+    const canvasIds = Object.keys(CHART_BUILDERS).filter(id => document.getElementById(id));
+    
+    // 不支持 IntersectionObserver 的浏览器直接创建全部图表
+    if (typeof IntersectionObserver === 'undefined') {
+        canvasIds.forEach(buildChart);
+        return;
     }
+    
+    chartObserver = new IntersectionObserver((entries, observer) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                buildChart(entry.target.id);
+            }
+        });
+    }, { rootMargin: CHART_LAZY_MARGIN });
+    canvasIds.forEach(id => chartObserver.observe(document.getElementById(id)));
 }
 
 /**
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+chart_data.json 输出格式
+
+v1（旧格式）：每个排名都是完整记录的副本，raw_data 再存一遍，带缩进
+v2（当前格式）：
+- raw_data 按列存储一次：{"columns": [...], "values": [[第1列...], [第2列...]]}
+- flow_ranking / duration_ranking / category_rankings 只存 raw_data 的行号
+- 人员排名等独立表同样按列存储
+- sort_indexes 保存各数据集每个可排序列的升序行号，供明细表排序直接使用（见 sort_index）
+- 输出不带缩进，并生成 .gz（以及安装了 brotli 时的 .br）预压缩文件供静态服务器直接使用
+
+写出方式：
+- 先写同目录下的临时文件并 fsync，再改名覆盖目标文件，读取方不会读到写了一半的文件，
+  中途断电也只会留下旧文件或新文件
+- 写出期间持有 <输出文件>.lock 上的排他锁（fcntl），锁文件同时保存代数（generation），
+  每写一次加1，写入文档顶层的 generation
+- 多个脚本各自只负责文档的一部分时用 merge_chart_data：在锁内重新读取当前文件、
+  合并本脚本的键再写出，后写的不会覆盖先写的
+- 每一代在 .snapshots/ 下保留一份快照（硬链接，不额外占空间），只保留最近 SNAPSHOT_KEEP 份
+- 增量刷新（diff_refresh）同时写出 <输出文件名>.delta.json：相对上一代的 JSON Patch，
+  其他方式写出时删除旧的增量文件，浏览器取不到增量时重新下载完整文件
+- 同时写出版本化清单 <输出文件名>.manifest.json：文档按 DATASETS 拆成几个数据集，
+  每个数据集写到 <输出文件名>.datasets/<数据集>.<内容哈希>.json（内容不变时文件名不变，可长期缓存），
+  清单记录各数据集的哈希和路径，文档的其余部分（success、generation 等）直接放在清单的 meta 中；
+  前端的 data_worker.js 按清单只下载哈希变化了的数据集
+
+前端 loadData 读取后用 expandChartData 还原成 v1 结构
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from instrumentation import stage
+from serialization import json_dumps
+from sort_index import build_sort_indexes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 上没有 fcntl，不加锁（仍然原子改名）
+    fcntl = None
+
+FORMAT_VERSION = 2
+
+# 快照目录（输出文件所在目录下）和保留的份数
+SNAPSHOT_DIR = '.snapshots'
+SNAPSHOT_KEEP = 5
+
+# 增量文件：chart_data.json -> chart_data.delta.json
+DELTA_SUFFIX = '.delta'
+
+# 版本化清单：chart_data.json -> chart_data.manifest.json，数据集文件放在 chart_data.datasets/ 下
+MANIFEST_SUFFIX = '.manifest'
+DATASET_DIR_SUFFIX = '.datasets'
+MANIFEST_VERSION = 1
+
+# 清单中的数据集 -> 它在 v2 文档中占用的路径（排序索引跟随所属的数据集）
+DATASETS = {
+    'flow': [['data'], ['sort_indexes', 'raw_data']],
+    'personnel': [
+        ['personal_process_ranking'],
+        ['main_person_process_ranking'],
+        ['main_person_duration_ranking'],
+        ['sort_indexes', 'personal_process_ranking'],
+        ['sort_indexes', 'main_person_process_ranking'],
+        ['sort_indexes', 'main_person_duration_ranking'],
+    ],
+    'overdue': [['template_overdue_ranking'], ['backlog_risk_ranking'], ['person_overdue_ranking']],
+}
+
+# data 中以 raw_data 行号存储的排名
+INDEXED_RANKINGS = ['flow_ranking', 'duration_ranking']
+
+# 顶层按列存储的独立表
+COLUMNAR_TABLES = [
+    'personal_process_ranking',
+    'main_person_process_ranking',
+    'main_person_duration_ranking',
+    'template_overdue_ranking',
+    'backlog_risk_ranking',
+    'person_overdue_ranking',
+]
+
+
+def to_columns(records):
+    """记录列表 -> {"columns": [...], "values": [[...], ...]}"""
+    columns = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+    values = [[record.get(column) for record in records] for column in columns]
+    return {'columns': columns, 'values': values}
+
+
+def from_columns(table):
+    """{"columns": [...], "values": [[...], ...]} -> 记录列表"""
+    columns = table['columns']
+    return [dict(zip(columns, row)) for row in zip(*table['values'])]
+
+
+def _row_indexer(raw_data, columns):
+    """
+    返回把排名记录映射为 raw_data 行号的函数
+    排名记录通常就是 raw_data 中的同一个对象，按 id 查找；否则按各列取值查找
+    """
+    by_id = {id(record): i for i, record in enumerate(raw_data)}
+    by_value = {}
+    for i, record in enumerate(raw_data):
+        by_value.setdefault(tuple(record.get(column) for column in columns), i)
+
+    def index_of(record):
+        if id(record) in by_id:
+            return by_id[id(record)]
+        return by_value[tuple(record.get(column) for column in columns)]
+
+    return index_of
+
+
+def compact_document(document):
+    """v1 文档 -> v2 文档"""
+    if document.get('format_version') == FORMAT_VERSION:
+        return document
+
+    compact = {key: value for key, value in document.items() if key not in COLUMNAR_TABLES}
+    compact['format_version'] = FORMAT_VERSION
+    compact['sort_indexes'] = build_sort_indexes(document)
+
+    data = document.get('data')
+    if data is not None and 'raw_data' in data:
+        raw_data = data['raw_data']
+        raw_table = to_columns(raw_data)
+        index_of = _row_indexer(raw_data, raw_table['columns'])
+
+        compact_data = dict(data)
+        compact_data['raw_data'] = raw_table
+        for name in INDEXED_RANKINGS:
+            if name in data:
+                compact_data[name] = [index_of(record) for record in data[name]]
+        if 'category_rankings' in data:
+            compact_data['category_rankings'] = {
+                category: [index_of(record) for record in ranking]
+                for category, ranking in data['category_rankings'].items()
+            }
+        compact['data'] = compact_data
+
+    for name in COLUMNAR_TABLES:
+        if name in document:
+            compact[name] = to_columns(document[name])
+
+    return compact
+
+
+def expand_document(document):
+    """v2 文档 -> v1 文档；v1 文档原样返回"""
+    if document.get('format_version') != FORMAT_VERSION:
+        return document
+
+    expanded = {key: value for key, value in document.items()
+                if key not in COLUMNAR_TABLES and key != 'format_version'}
+
+    data = document.get('data')
+    if data is not None and 'raw_data' in data:
+        raw_data = from_columns(data['raw_data'])
+        expanded_data = dict(data)
+        expanded_data['raw_data'] = raw_data
+        for name in INDEXED_RANKINGS:
+            if name in data:
+                expanded_data[name] = [raw_data[i] for i in data[name]]
+        if 'category_rankings' in data:
+            expanded_data['category_rankings'] = {
+                category: [raw_data[i] for i in indices]
+                for category, indices in data['category_rankings'].items()
+            }
+        expanded['data'] = expanded_data
+
+    for name in COLUMNAR_TABLES:
+        if name in document:
+            expanded[name] = from_columns(document[name])
+
+    return expanded
+
+
+def dumps(document):
+    """v2 文档序列化为不带缩进的 JSON 字节串"""
+    return json_dumps(compact_document(document))
+
+
+def _fsync_directory(directory):
+    """改名后同步目录项；不支持打开目录的平台上跳过"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_temp(payload, output_file):
+    """把内容写到目标文件同目录下的临时文件并 fsync，返回临时文件路径"""
+    directory = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(output_file) + '-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def atomic_write(payload, output_file):
+    """原子地写出字节内容：临时文件 + fsync + 改名"""
+    tmp_path = _write_temp(payload, output_file)
+    try:
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class OutputLock:
+    """
+    输出文件的排他锁（<输出文件>.lock），锁文件中保存输出文件的代数
+
+    用法:
+    with OutputLock(output_file) as lock:
+        generation = lock.next_generation()
+    """
+
+    def __init__(self, output_file):
+        self.path = output_file + '.lock'
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+    def generation(self):
+        """当前代数（从未写过时为0）"""
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        text = os.read(self.fd, 32).decode('ascii', 'ignore').strip()
+        return int(text) if text.isdigit() else 0
+
+    def next_generation(self):
+        """代数加1并写回锁文件，返回新的代数"""
+        generation = self.generation() + 1
+        os.ftruncate(self.fd, 0)
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.write(self.fd, str(generation).encode('ascii'))
+        return generation
+
+
+def snapshot_paths(output_file):
+    """输出文件的各代快照，按代数升序：[(代数, 路径), ...]"""
+    directory = os.path.join(os.path.dirname(os.path.abspath(output_file)), SNAPSHOT_DIR)
+    stem, ext = os.path.splitext(os.path.basename(output_file))
+    pattern = re.compile(re.escape(stem) + r'\.(\d+)' + re.escape(ext) + '$')
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            snapshots.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(snapshots)
+
+
+def _save_snapshot(tmp_path, output_file, generation, keep):
+    """把这一代的临时文件保存为快照（优先硬链接），并删除超出保留份数的旧快照"""
+    directory = os.path.join(os.path.dirname(os.path.abspath(output_file)), SNAPSHOT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    stem, ext = os.path.splitext(os.path.basename(output_file))
+    snapshot = os.path.join(directory, f'{stem}.{generation:06d}{ext}')
+    try:
+        os.link(tmp_path, snapshot)
+    except OSError:
+        with open(tmp_path, 'rb') as src, open(snapshot, 'wb') as dst:
+            dst.write(src.read())
+    for _, path in snapshot_paths(output_file)[:-keep]:
+        os.remove(path)
+
+
+def delta_path(output_file):
+    """增量文件的路径"""
+    stem, ext = os.path.splitext(output_file)
+    return stem + DELTA_SUFFIX + ext
+
+
+def manifest_path(output_file):
+    """清单文件的路径"""
+    stem, ext = os.path.splitext(output_file)
+    return stem + MANIFEST_SUFFIX + ext
+
+
+def dataset_dir(output_file):
+    """数据集文件所在目录的路径"""
+    return os.path.splitext(output_file)[0] + DATASET_DIR_SUFFIX
+
+
+def _take(document, path):
+    """从 document 中取出 path 处的值（沿途的 dict 先复制，不改动原来的对象），不存在时返回 None"""
+    node = document
+    for key in path[:-1]:
+        child = node.get(key)
+        if not isinstance(child, dict):
+            return None
+        node[key] = node = dict(child)
+    return node.pop(path[-1], None)
+
+
+def split_document(document):
+    """
+    v2 文档 -> (meta, {数据集: 部分文档})
+
+    部分文档与 v2 文档的结构相同、只含该数据集的路径；meta 为其余部分（分完后变空的容器不保留）。
+    把 meta 和各部分文档逐层合并即还原原文档。文档中没有的数据集不出现在结果中
+    """
+    meta = dict(document)
+    parts = {}
+    for name, paths in DATASETS.items():
+        part = {}
+        for path in paths:
+            value = _take(meta, path)
+            if value is None:
+                continue
+            node = part
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = value
+        if part:
+            parts[name] = part
+    # 内容全部分到各数据集的容器（如 sort_indexes）不留空壳在 meta 中
+    for key in {path[0] for paths in DATASETS.values() for path in paths if len(path) > 1}:
+        if meta.get(key) == {}:
+            del meta[key]
+    return meta, parts
+
+
+def build_manifest(document, output_file):
+    """
+    生成清单
+
+    返回:
+    (清单, {数据集文件的相对路径: 内容})，相对路径相对于清单所在目录
+    """
+    meta, parts = split_document(compact_document(document))
+    directory = os.path.basename(dataset_dir(output_file))
+    datasets = {}
+    files = {}
+    for name, part in parts.items():
+        payload = json_dumps(part)
+        digest = hashlib.sha256(payload).hexdigest()[:16]
+        path = f'{directory}/{name}.{digest}.json'
+        datasets[name] = {'hash': digest, 'path': path, 'bytes': len(payload), 'paths': DATASETS[name]}
+        files[path] = payload
+    manifest = {
+        'manifest_version': MANIFEST_VERSION,
+        'generation': meta.get('generation'),
+        'meta': meta,
+        'datasets': datasets,
+    }
+    return manifest, files
+
+
+def read_manifest(output_file):
+    """读取输出文件的清单，没有或无法解析时返回 None"""
+    try:
+        with open(manifest_path(output_file), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(document, output_file, sidecars=True, delta=False):
+    """
+    写出各数据集文件和清单
+
+    数据集文件按内容哈希命名，已存在的不重写；写完数据集文件再改名清单，
+    读到新清单的浏览器一定取得到它引用的文件。当前和上一份清单都不再引用的数据集文件被删除
+    （刚读到上一份清单的浏览器仍取得到文件）
+
+    参数:
+    delta: 是否同时写出了增量文件（写入清单，浏览器据此决定是否请求增量）
+    """
+    manifest, files = build_manifest(document, output_file)
+    if delta:
+        manifest['delta'] = os.path.basename(delta_path(output_file))
+    base = os.path.dirname(os.path.abspath(output_file))
+    os.makedirs(dataset_dir(output_file), exist_ok=True)
+    for path, payload in files.items():
+        target = os.path.join(base, path)
+        if not os.path.exists(target):
+            atomic_write(payload, target)
+            if sidecars:
+                write_sidecars(payload, target)
+
+    keep = set(files)
+    previous = read_manifest(output_file)
+    if previous is not None:
+        keep.update(entry['path'] for entry in previous.get('datasets', {}).values())
+    atomic_write(json_dumps(manifest), manifest_path(output_file))
+
+    directory = os.path.basename(dataset_dir(output_file))
+    for name in os.listdir(dataset_dir(output_file)):
+        if name.startswith('.'):
+            continue
+        stem = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if f'{directory}/{stem}' not in keep:
+            os.remove(os.path.join(dataset_dir(output_file), name))
+    return manifest
+
+
+def write_sidecars(payload, output_file):
+    """原子地写出预压缩文件：chart_data.json.gz（以及 .br）"""
+    atomic_write(gzip.compress(payload, compresslevel=9, mtime=0), output_file + '.gz')
+    if brotli is not None:
+        atomic_write(brotli.compress(payload), output_file + '.br')
+
+
+def write_locked(document, output_file, lock, sidecars=True, snapshots=SNAPSHOT_KEEP, delta=None, manifest=True):
+    """
+    持有锁时写出：代数加1，先写预压缩文件、增量文件和清单，最后改名主文件
+
+    参数:
+    lock: 已进入的 OutputLock
+    delta: 相对上一代的增量（JSON 可序列化），None 时删除旧的增量文件
+    manifest: 是否写出清单和数据集文件
+    """
+    document = compact_document(dict(document, generation=lock.next_generation()))
+    with stage('serialize_json') as record:
+        payload = json_dumps(document)
+        record['bytes_out'] = len(payload)
+    tmp_path = _write_temp(payload, output_file)
+    try:
+        if sidecars:
+            with stage('write_sidecars', bytes_in=len(payload)):
+                write_sidecars(payload, output_file)
+        if snapshots:
+            _save_snapshot(tmp_path, output_file, document['generation'], snapshots)
+        # 增量文件先于主文件更新：浏览器拿到的增量不会比主文件旧
+        if delta is not None:
+            atomic_write(json_dumps(delta), delta_path(output_file))
+        elif os.path.exists(delta_path(output_file)):
+            os.remove(delta_path(output_file))
+        if manifest:
+            with stage('write_manifest'):
+                write_manifest(document, output_file, sidecars, delta is not None)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _fsync_directory(os.path.dirname(os.path.abspath(output_file)))
+    return payload
+
+
+def write_chart_data(document, output_file, sidecars=True, snapshots=SNAPSHOT_KEEP, manifest=True):
+    """
+    以 v2 格式原子地写出 chart_data.json（整体替换）
+
+    参数:
+    document: v1 或 v2 文档
+    output_file: 输出路径（所在目录不存在时创建）
+    sidecars: 是否同时写出预压缩文件
+    snapshots: 保留最近几代快照，0 表示不保留
+    manifest: 是否同时写出清单和数据集文件
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with OutputLock(output_file) as lock:
+        return write_locked(document, output_file, lock, sidecars, snapshots, manifest=manifest)
+
+
+def merge_chart_data(updates, output_file, sidecars=True, snapshots=SNAPSHOT_KEEP, manifest=True):
+    """
+    把 updates 中的顶层键合并进现有的 chart_data.json 后原子地写出
+
+    在锁内重新读取当前文件再合并：多个脚本分别更新同一文件的不同部分时互不覆盖
+
+    参数:
+    updates: {顶层键: 值}（v1 结构）
+    output_file: 输出路径，文件不存在时只写出 updates
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with OutputLock(output_file) as lock:
+        try:
+            document = read_chart_data(output_file)
+        except FileNotFoundError:
+            document = {}
+        document.update(updates)
+        return write_locked(document, output_file, lock, sidecars, snapshots, manifest=manifest)
+
+
+def read_chart_data(output_file):
+    """读取 chart_data.json（v1 或 v2），统一返回 v1 结构"""
+    with open(output_file, 'r', encoding='utf-8') as f:
+        return expand_document(json.load(f))
@@ -0,0 +1,215 @@
+/**
+ * 营销平台流程绩效分析平台 - 数据加载 Web Worker
+ * 在后台线程下载、解析 chart_data.json，不阻塞页面的首次渲染。
+ *
+ * 读取 chart_data.manifest.json（由 chart_format.write_manifest 生成），清单中每个数据集带内容哈希：
+ * - 哈希与 IndexedDB 中缓存的相同：直接用缓存
+ * - 缓存的是上一代且服务端有相对它的增量（chart_data.delta.json）：在缓存上应用增量
+ * - 其余：下载按哈希命名的数据集文件（内容不变时文件名不变，浏览器可长期缓存）
+ * 没有清单或加载失败时下载完整的 chart_data.json。
+ *
+ * 消息：页面发送 {manifest, fallback}（相对于页面的路径），
+ * 返回 {document: v2 文档, stats: {cached, patched, fetched}}，失败时返回 {error}
+ */
+
+const DB_NAME = 'lcjx-chart-data';
+const DB_STORE = 'datasets';
+const DB_VERSION = 1;
+
+self.addEventListener('message', async event => {
+    const manifestUrl = new URL(event.data.manifest, self.location.href).href;
+    const fallbackUrl = new URL(event.data.fallback, self.location.href).href;
+    try {
+        self.postMessage(await loadFromManifest(manifestUrl));
+    } catch (error) {
+        console.warn('按清单加载失败，下载完整数据:', error.message);
+        try {
+            const doc = await fetchJson(fallbackUrl, { cache: 'no-cache' });
+            self.postMessage({ document: doc, stats: { fetched: ['chart_data.json'], cached: [], patched: [] } });
+        } catch (fallbackError) {
+            self.postMessage({ error: fallbackError.message });
+        }
+    }
+});
+
+async function fetchJson(url, options) {
+    const response = await fetch(url, options);
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+}
+
+/**
+ * 按清单加载：返回 {document, stats}
+ */
+async function loadFromManifest(manifestUrl) {
+    const manifest = await fetchJson(manifestUrl, { cache: 'no-cache' });
+    const entries = Object.entries(manifest.datasets || {});
+    const db = await openDatabase();
+    const cachedMeta = db ? await readRecord(db, manifestUrl + '#') : null;
+    const cached = {};
+    for (const [name] of entries) {
+        cached[name] = db ? await readRecord(db, `${manifestUrl}#${name}`) : null;
+    }
+
+    const values = {};
+    const stats = { cached: [], patched: [], fetched: [] };
+    let stale = [];
+    entries.forEach(([name, entry]) => {
+        if (cached[name] && cached[name].hash === entry.hash) {
+            values[name] = cached[name].value;
+            stats.cached.push(name);
+        } else {
+            stale.push(name);
+        }
+    });
+
+    // 所有数据集都缓存了上一代时，先尝试增量
+    if (stale.length > 0 && manifest.delta && cachedMeta
+        && entries.every(([name]) => cached[name])) {
+        try {
+            const delta = await fetchJson(new URL(manifest.delta, manifestUrl).href, { cache: 'no-cache' });
+            if (delta.from_generation === cachedMeta.generation && delta.to_generation === manifest.generation) {
+                const doc = assembleDocument(cachedMeta.meta, entries.map(([name]) => cached[name].value));
+                applyJsonPatch(doc, delta.operations);
+                stale.forEach(name => {
+                    values[name] = pickPaths(doc, manifest.datasets[name].paths);
+                    stats.patched.push(name);
+                });
+                stale = [];
+            }
+        } catch (error) {
+            console.warn('增量更新失败，下载变化的数据集:', error.message);
+        }
+    }
+
+    await Promise.all(stale.map(async name => {
+        // 数据集文件按内容哈希命名，使用浏览器的常规缓存
+        values[name] = await fetchJson(new URL(manifest.datasets[name].path, manifestUrl).href);
+        stats.fetched.push(name);
+    }));
+
+    if (db) {
+        const records = [{ key: manifestUrl + '#', generation: manifest.generation, meta: manifest.meta }];
+        stats.patched.concat(stats.fetched).forEach(name => {
+            records.push({ key: `${manifestUrl}#${name}`, hash: manifest.datasets[name].hash, value: values[name] });
+        });
+        await writeRecords(db, records);
+        db.close();
+    }
+
+    const doc = assembleDocument(manifest.meta, entries.map(([name]) => values[name]));
+    return { document: doc, stats };
+}
+
+/**
+ * 把 meta 和各数据集的部分文档逐层合并为 v2 文档
+ */
+function assembleDocument(meta, parts) {
+    const merge = (target, source) => {
+        Object.entries(source).forEach(([key, value]) => {
+            const isObject = node => node && typeof node === 'object' && !Array.isArray(node);
+            if (isObject(value) && isObject(target[key])) {
+                target[key] = merge({ ...target[key] }, value);
+            } else {
+                target[key] = value;
+            }
+        });
+        return target;
+    };
+    return parts.reduce((doc, part) => merge(doc, part), merge({}, meta || {}));
+}
+
+/**
+ * 从文档中取出指定路径，组成与文档结构相同的部分文档
+ */
+function pickPaths(doc, paths) {
+    const part = {};
+    paths.forEach(path => {
+        let source = doc;
+        let target = part;
+        for (let i = 0; i < path.length - 1; i++) {
+            source = source ? source[path[i]] : undefined;
+            target = target[path[i]] = target[path[i]] || {};
+        }
+        if (source && source[path[path.length - 1]] !== undefined) {
+            target[path[path.length - 1]] = source[path[path.length - 1]];
+        }
+    });
+    return part;
+}
+
+/**
+ * 应用 JSON Patch（RFC 6902 的 add / remove / replace），直接修改 doc
+ */
+function applyJsonPatch(doc, operations) {
+    operations.forEach(operation => {
+        const parts = operation.path.split('/').slice(1)
+            .map(part => part.replace(/~1/g, '/').replace(/~0/g, '~'));
+        const last = parts.pop();
+        const parent = parts.reduce((node, part) => node[Array.isArray(node) ? Number(part) : part], doc);
+        if (Array.isArray(parent)) {
+            const index = last === '-' ? parent.length : Number(last);
+            if (operation.op === 'add') {
+                parent.splice(index, 0, operation.value);
+            } else if (operation.op === 'remove') {
+                parent.splice(index, 1);
+            } else if (operation.op === 'replace') {
+                parent[index] = operation.value;
+            } else {
+                throw new Error(`不支持的补丁操作: ${operation.op}`);
+            }
+        } else if (operation.op === 'remove') {
+            delete parent[last];
+        } else if (operation.op === 'add' || operation.op === 'replace') {
+            parent[last] = operation.value;
+        } else {
+            throw new Error(`不支持的补丁操作: ${operation.op}`);
+        }
+    });
+    return doc;
+}
+
+/**
+ * 打开 IndexedDB；浏览器不支持或被禁用（如隐私模式）时返回 null，所有数据集都从网络取
+ */
+function openDatabase() {
+    return new Promise(resolve => {
+        if (typeof indexedDB === 'undefined') {
+            resolve(null);
+            return;
+        }
+        try {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(DB_STORE, { keyPath: 'key' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+            request.onblocked = () => resolve(null);
+        } catch (error) {
+            resolve(null);
+        }
+    });
+}
+
+function readRecord(db, key) {
+    return new Promise(resolve => {
+        const request = db.transaction(DB_STORE, 'readonly').objectStore(DB_STORE).get(key);
+        request.onsuccess = () => resolve(request.result || null);
+        request.onerror = () => resolve(null);
+    });
+}
+
+function writeRecords(db, records) {
+    return new Promise(resolve => {
+        const transaction = db.transaction(DB_STORE, 'readwrite');
+        const store = transaction.objectStore(DB_STORE);
+        records.forEach(record => store.put(record));
+        transaction.oncomplete = () => resolve(true);
+        // 超出存储配额等错误时不缓存，下次仍从网络取
+        transaction.onerror = () => resolve(false);
+        transaction.onabort = () => resolve(false);
+    });
+}
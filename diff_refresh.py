@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量刷新 - 只重新计算受变化影响的排名，并生成浏览器可以直接应用的增量文件
+每次刷新按主键（流程：模板名称；人员：人员名称 + 部门名称）保存各行内容的哈希，
+下次刷新时与新的数据逐行比较，得到新增、删除、修改的行：
+- 数据集没有变化：沿用上次文档中的排名，不重新计算
+- 上次各排名的入选行都没有变化：前K名只可能来自 上次入选的行 + 新增或修改的行，
+  只用这些行重新计算
+- 上次入选的行有变化、行的先后顺序变了、主键有重复、基本信息.xlsx 变了：整张表重新计算
+写出的文档与 pipeline 完整生成的相同，同时写出相对上一代的 JSON Patch（RFC 6902），
+浏览器缓存了上一代时只下载增量（见 chart_format.delta_path）。
+
+用法:
+python diff_refresh.py --data-dir <数据目录>
+python diff_refresh.py --data-dir <数据目录> --full    # 忽略上次的行哈希，整体重新计算
+"""
+
+import argparse
+import json
+import os
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from chart_format import FORMAT_VERSION, OutputLock, compact_document, expand_document, write_locked
+from frame_cache import source_fingerprint
+import generate_personnel_rankings as personnel
+from instrumentation import add_arguments, recording, stage
+from name_index import load_name_aliases, main_person_rows
+from overdue_analytics import person_overdue_analytics, template_overdue_analytics
+import process_data
+from serialization import frame_records
+from settings import data_dir, default_paths
+
+# 行哈希状态的格式版本，排名逻辑变化时递增，旧状态随之失效
+STATE_VERSION = 1
+
+# 各数据集的主键列
+DATASET_KEYS = {
+    'flow': ['模板名称'],
+    'personnel': ['人员名称', '部门名称'],
+}
+
+# 各数据集上的前K名排名：(在文档中的位置, 记录中的主键字段)；位置中的 '*' 表示该层的每一项（各流程分类）
+RANKING_KEYS = {
+    'flow': [
+        (('data', 'flow_ranking'), ['模板名称']),
+        (('data', 'duration_ranking'), ['模板名称']),
+        (('data', 'category_rankings', '*'), ['模板名称']),
+        (('template_overdue_ranking',), ['模板名称']),
+        (('backlog_risk_ranking',), ['模板名称']),
+    ],
+    'personnel': [
+        (('personal_process_ranking',), ['人员名称', '部门名称']),
+        (('main_person_process_ranking',), ['负责人姓名', '部门名称']),
+        (('main_person_duration_ranking',), ['负责人姓名', '部门名称']),
+        (('person_overdue_ranking',), ['人员名称', '部门名称']),
+    ],
+}
+
+# 等长列表中变化的项超过该比例时整体替换，不再逐项生成补丁
+REPLACE_RATIO = 0.5
+
+
+def _key_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+def row_keys(df, columns):
+    """每行的主键元组（缺失值为 None，其余转为文本）"""
+    values = [[_key_value(value) for value in df[column].tolist()] if column in df.columns else [None] * len(df)
+              for column in columns]
+    return list(zip(*values))
+
+
+def record_key(record, fields):
+    """排名记录的主键元组，与 row_keys 的写法一致"""
+    return tuple(_key_value(record.get(field)) for field in fields)
+
+
+def row_hashes(df):
+    """每行所有列内容的 64 位哈希"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def diff_rows(previous, keys, hashes):
+    """
+    按主键比较上次和这次的行哈希
+
+    参数:
+    previous: 上次的 {'keys': [...], 'hashes': 数组}，None 表示没有上次的记录
+
+    返回:
+    {'added', 'removed', 'modified'}（主键集合）和 'ordered'（两次都有的行先后顺序是否一致）；
+    没有上次的记录或主键有重复时返回 None（只能整体重新计算）
+    """
+    if previous is None or len(set(keys)) != len(keys) or len(set(previous['keys'])) != len(previous['keys']):
+        return None
+    old = dict(zip(previous['keys'], previous['hashes'].tolist()))
+    new = dict(zip(keys, hashes.tolist()))
+    common_old = [key for key in previous['keys'] if key in new]
+    common_new = [key for key in keys if key in old]
+    return {
+        'added': {key for key in new if key not in old},
+        'removed': {key for key in old if key not in new},
+        'modified': {key for key in common_new if old[key] != new[key]},
+        'ordered': common_old == common_new,
+    }
+
+
+def _changed(changes):
+    return changes is None or not changes['ordered'] or any(changes[kind] for kind in ('added', 'removed', 'modified'))
+
+
+def _rankings_at(document, path):
+    """文档中某个位置上的排名列表（'*' 展开为该层的每一项）；文档中没有时返回 None"""
+    nodes = [document]
+    for part in path:
+        if part == '*':
+            nodes = [value for node in nodes for value in node.values()]
+        else:
+            if any(not isinstance(node, dict) or part not in node for node in nodes):
+                return None
+            nodes = [node[part] for node in nodes]
+    return nodes
+
+
+def candidate_rows(document, dataset, keys, changes):
+    """
+    重新计算排名时需要参与的行号（升序）；返回 None 表示需要整张表
+
+    上次各排名的入选行都没有变化时，其余没有变化的行上次排在它们之后（或不满足入选条件），
+    这次也一样；取值相同时按行的先后排列，两次的先后顺序一致时结果不变
+    """
+    if document is None or changes is None or not changes['ordered']:
+        return None
+    previous = set()
+    for path, fields in RANKING_KEYS[dataset]:
+        rankings = _rankings_at(document, path)
+        if rankings is None:
+            return None
+        for ranking in rankings:
+            previous.update(record_key(record, fields) for record in ranking)
+    if previous & (changes['added'] | changes['removed'] | changes['modified']):
+        return None
+    wanted = previous | changes['added'] | changes['modified']
+    return np.array([i for i, key in enumerate(keys) if key in wanted], dtype='int64')
+
+
+def flow_outputs(df_flow, categories, rows=None):
+    """
+    流程数据集上的各项排名
+
+    参数:
+    rows: 参与计算的行号，None 表示整张表
+
+    返回:
+    {'data', 'template_overdue_ranking', 'backlog_risk_ranking'}，与 pipeline 生成的相同
+    """
+    records = frame_records(df_flow)
+    if rows is None:
+        data = process_data.build_flow_rankings(records, categories)
+        return {'data': data, **template_overdue_analytics(df_flow)}
+
+    # 排名记录取自完整的 raw_data（同一个对象），写出时按 id 换算为行号
+    data = process_data.build_flow_rankings([records[i] for i in rows], categories)
+    data['raw_data'] = records
+    return {'data': data, **template_overdue_analytics(df_flow.iloc[rows].reset_index(drop=True))}
+
+
+def personnel_outputs(df_personnel, main_persons, aliases, rows=None):
+    """人员数据集上的各项排名（rows 含义同 flow_outputs）"""
+    frame = df_personnel if rows is None else df_personnel.iloc[rows].reset_index(drop=True)
+    main_rows = main_person_rows(frame, main_persons, aliases)
+    return {
+        'personal_process_ranking': personnel.generate_personal_process_ranking(frame),
+        'main_person_process_ranking': personnel.generate_main_person_process_ranking(frame, None, main_rows),
+        'main_person_duration_ranking': personnel.generate_main_person_duration_ranking(frame, None, main_rows),
+        **person_overdue_analytics(frame),
+    }
+
+
+def _pointer(path):
+    """JSON Pointer（RFC 6901）"""
+    return ''.join('/' + str(part).replace('~', '~0').replace('/', '~1') for part in path)
+
+
+def json_patch(old, new, path=(), operations=None):
+    """
+    生成把 old 变为 new 的 JSON Patch 操作列表
+    字典逐键比较；等长列表逐项比较（变化的项过多时整体替换）；其余不同的值整体替换
+    """
+    operations = [] if operations is None else operations
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                operations.append({'op': 'remove', 'path': _pointer(path + (key,))})
+        for key, value in new.items():
+            if key not in old:
+                operations.append({'op': 'add', 'path': _pointer(path + (key,)), 'value': value})
+            else:
+                json_patch(old[key], value, path + (key,), operations)
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changed = [i for i, (a, b) in enumerate(zip(old, new)) if type(a) is not type(b) or a != b]
+        if len(changed) > len(new) * REPLACE_RATIO:
+            operations.append({'op': 'replace', 'path': _pointer(path), 'value': new})
+        else:
+            for i in changed:
+                json_patch(old[i], new[i], path + (i,), operations)
+    elif type(old) is not type(new) or old != new:
+        operations.append({'op': 'replace', 'path': _pointer(path), 'value': new})
+    return operations
+
+
+def raw_data_patch(old_table, new_table, old_keys, new_keys, modified, path=('data', 'raw_data')):
+    """
+    按主键对齐的 raw_data（按列存储）补丁：删除的行、新增的行、修改的单元格
+    调用方需保证两次都有的行先后顺序一致；列不同时返回 None
+    """
+    if old_table['columns'] != new_table['columns']:
+        return None
+    old_index = {key: i for i, key in enumerate(old_keys)}
+    new_set = set(new_keys)
+    removed = [i for i, key in enumerate(old_keys) if key not in new_set]
+    added = [j for j, key in enumerate(new_keys) if key not in old_index]
+    changed = [(old_index[key], j) for j, key in enumerate(new_keys) if key in modified]
+
+    operations = []
+    for c, (old_values, new_values) in enumerate(zip(old_table['values'], new_table['values'])):
+        base = path + ('values', c)
+        # 先从后往前删除，再从前往后插入，两次都有的行保持原有先后
+        for i in reversed(removed):
+            operations.append({'op': 'remove', 'path': _pointer(base + (i,))})
+        for j in added:
+            operations.append({'op': 'add', 'path': _pointer(base + (j,)), 'value': new_values[j]})
+        for i, j in changed:
+            if type(old_values[i]) is not type(new_values[j]) or old_values[i] != new_values[j]:
+                operations.append({'op': 'replace', 'path': _pointer(base + (j,)), 'value': new_values[j]})
+    return operations
+
+
+def document_patch(old_document, new_document, flow_alignment=None):
+    """
+    两代 v2 文档之间的补丁
+
+    参数:
+    flow_alignment: (上次的主键列表, 这次的主键列表, 修改过的主键集合)，给出时 raw_data 按行生成补丁
+    """
+    operations = []
+    old_raw = (old_document.get('data') or {}).get('raw_data')
+    new_raw = (new_document.get('data') or {}).get('raw_data')
+    if flow_alignment is not None and old_raw is not None and new_raw is not None:
+        raw_operations = raw_data_patch(old_raw, new_raw, *flow_alignment)
+        if raw_operations is not None:
+            operations.extend(raw_operations)
+            # raw_data 已按行处理，其余部分逐项比较
+            old_document = dict(old_document, data=dict(old_document['data'], raw_data=new_raw))
+    return json_patch(old_document, new_document, operations=operations)
+
+
+def _state_path(output_file, cache_dir=None):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(output_file)), '.cache', 'diff')
+    return os.path.join(cache_dir, os.path.basename(output_file) + '.state.pkl')
+
+
+def load_state(state_path):
+    """上次刷新保存的行哈希；没有或版本不符时返回 None"""
+    try:
+        with open(state_path, 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    return state if state.get('version') == STATE_VERSION else None
+
+
+def save_state(state_path, state):
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, state_path)
+
+
+def _read_current(output_file):
+    """读取当前输出文件（v2 结构）；不存在时返回 None"""
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+    except FileNotFoundError:
+        return None
+    return document if document.get('format_version') == FORMAT_VERSION else compact_document(document)
+
+
+def refresh(paths, cache_dir=None, full=False):
+    """
+    增量刷新 paths['output']
+
+    参数:
+    paths: {'flow', 'personnel', 'basic', 'output'}（见 settings.default_paths）
+    cache_dir: 行哈希状态的存放目录，默认为输出目录下的 .cache/diff
+    full: 忽略上次的行哈希，整张表重新计算
+
+    返回:
+    {'success', 'generation', 'operations', 'datasets': {数据集: 'unchanged' / 'incremental' / 'full'},
+     'changes': {数据集: {'added', 'removed', 'modified'} 行数}}
+    """
+    output_file = paths['output']
+    state_path = _state_path(output_file, cache_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    with stage('load_inputs'):
+        frames = {
+            'flow': process_data.load_flow_data(paths['flow']),
+            'personnel': personnel.load_personnel_data(paths['personnel']),
+        }
+        basic_sha, _ = source_fingerprint(paths['basic'])
+
+    with OutputLock(output_file) as lock:
+        old_document = _read_current(output_file)
+        state = None if full else load_state(state_path)
+        # 上次刷新之后有其他脚本写过输出文件（代数不同），或基本信息变了，上次的排名不能作为依据
+        if (state is None or old_document is None or state['generation'] != old_document.get('generation')
+                or state['basic'] != basic_sha):
+            state = None
+
+        keys, hashes, changes = {}, {}, {}
+        with stage('diff_rows') as record:
+            for dataset, frame in frames.items():
+                keys[dataset] = row_keys(frame, DATASET_KEYS[dataset])
+                hashes[dataset] = row_hashes(frame)
+                changes[dataset] = diff_rows(state[dataset] if state else None, keys[dataset], hashes[dataset])
+            record['rows_out'] = sum(len(change['added'] | change['modified']) for change in changes.values()
+                                     if change is not None)
+
+        result = {'success': True, 'generation': old_document.get('generation') if old_document else None,
+                  'operations': 0, 'datasets': {}, 'changes': {}}
+        for dataset, change in changes.items():
+            if change is not None:
+                result['changes'][dataset] = {kind: len(change[kind]) for kind in ('added', 'removed', 'modified')}
+        if state is not None and not any(_changed(change) for change in changes.values()):
+            result['datasets'] = {dataset: 'unchanged' for dataset in frames}
+            return result
+
+        document = expand_document(old_document) if state is not None else {}
+        document.update(success=True, generated_at=datetime.now().isoformat())
+
+        if state is None or _changed(changes['flow']):
+            rows = candidate_rows(document, 'flow', keys['flow'], changes['flow'])
+            with stage('flow_rankings', rows_in=len(frames['flow']) if rows is None else len(rows)):
+                categories = process_data.process_flow_categories(paths['basic'])
+                if not categories['success']:
+                    raise RuntimeError(f"流程分类数据处理失败: {categories['error']}")
+                document.update(flow_outputs(frames['flow'], categories['categories'], rows))
+            result['datasets']['flow'] = 'full' if rows is None else 'incremental'
+        else:
+            result['datasets']['flow'] = 'unchanged'
+
+        if state is None or _changed(changes['personnel']):
+            rows = candidate_rows(document, 'personnel', keys['personnel'], changes['personnel'])
+            with stage('personnel_rankings', rows_in=len(frames['personnel']) if rows is None else len(rows)):
+                main_persons = personnel.load_main_responsible_persons(paths['basic'])
+                document.update(personnel_outputs(frames['personnel'], main_persons,
+                                                  load_name_aliases(paths['basic']), rows))
+            result['datasets']['personnel'] = 'full' if rows is None else 'incremental'
+        else:
+            result['datasets']['personnel'] = 'unchanged'
+
+        generation = lock.generation() + 1
+        new_document = compact_document(dict(document, generation=generation))
+        delta = None
+        if old_document is not None and old_document.get('generation') is not None:
+            with stage('json_patch') as record:
+                flow_change = changes['flow']
+                alignment = None
+                if state is not None and flow_change is not None and flow_change['ordered']:
+                    alignment = (state['flow']['keys'], keys['flow'], flow_change['modified'])
+                operations = document_patch(old_document, new_document, alignment)
+                record['rows_out'] = len(operations)
+            delta = {'format': 'json-patch', 'from_generation': old_document['generation'],
+                     'to_generation': generation, 'operations': operations}
+            result['operations'] = len(operations)
+
+        write_locked(new_document, output_file, lock, delta=delta)
+        save_state(state_path, {
+            'version': STATE_VERSION,
+            'generation': generation,
+            'basic': basic_sha,
+            **{dataset: {'keys': keys[dataset], 'hashes': hashes[dataset]} for dataset in frames},
+        })
+        result['generation'] = generation
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='增量刷新 chart_data.json，并生成相对上一代的增量文件')
+    parser.add_argument('--data-dir', help='输入文件所在目录（默认取环境变量 LCJX_DATA_DIR，见 settings）')
+    parser.add_argument('--flow-file', help='流程效率明细.xls 路径')
+    parser.add_argument('--personnel-file', help='人员效率明细.xls 路径')
+    parser.add_argument('--basic-file', help='基本信息.xlsx 路径')
+    parser.add_argument('--output', help='输出的 chart_data.json 路径')
+    parser.add_argument('--cache-dir', help='行哈希状态的存放目录')
+    parser.add_argument('--full', action='store_true', help='忽略上次的行哈希，整张表重新计算')
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    paths = default_paths(args.data_dir or data_dir())
+    for key, value in [('flow', args.flow_file), ('personnel', args.personnel_file),
+                       ('basic', args.basic_file), ('output', args.output)]:
+        if value:
+            paths[key] = value
+
+    with recording(args, 'diff_refresh'):
+        try:
+            result = refresh(paths, cache_dir=args.cache_dir, full=args.full)
+        except Exception as e:
+            print(f"增量刷新失败: {e}")
+            return 1
+
+    names = {'unchanged': '没有变化', 'incremental': '增量计算', 'full': '整表计算'}
+    for dataset, mode in result['datasets'].items():
+        counts = result['changes'].get(dataset)
+        detail = f"（新增 {counts['added']}，删除 {counts['removed']}，修改 {counts['modified']}）" if counts else ''
+        print(f"  {dataset}: {names[mode]}{detail}")
+    if all(mode == 'unchanged' for mode in result['datasets'].values()):
+        print(f"输入没有变化，{paths['output']} 未改写")
+    else:
+        print(f"输出文件: {paths['output']}（第 {result['generation']} 代，增量 {result['operations']} 项操作）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
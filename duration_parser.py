@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时长解析模块 - 流程效率和人员效率数据共用
+把"13天2小时29分"这类时长文本整列解析为分钟数，
+process_data 和 generate_personnel_rankings 都通过这里解析，保证两边口径一致
+"""
+
+import re
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+# 一个正则覆盖所有时长写法："X天Y小时Z分"，各部分都可以省略；
+# 纯数字（如"12"或"1.5"）按小时处理，和原来 parse_duration 的约定一致
+DURATION_PATTERN = re.compile(
+    r'^\s*(?:'
+    r'(?:(?P<days>\d+(?:\.\d+)?)\s*天)?\s*'
+    r'(?:(?P<hours>\d+(?:\.\d+)?)\s*(?:小时|时))?\s*'
+    r'(?:(?P<minutes>\d+(?:\.\d+)?)\s*分(?:钟)?)?'
+    r'|(?P<bare_hours>\d+(?:\.\d+)?)'
+    r')\s*$'
+)
+
+# 已解析过的时长文本 -> 分钟数（无法解析的记为 NaN），导出文件里同一时长反复出现，跨调用复用
+_duration_cache = {}
+
+# 缓存的文本数上限：常驻进程（ranking_server、worker_daemon）会陆续见到大量不同的时长文本，
+# 超出时先删除最早加入的（同一次调用内的去重由 factorize 完成，不依赖这个缓存）
+MAX_CACHED_DURATIONS = 100000
+
+
+def _extract_minutes(literals):
+    """
+    用 .str.extract 一次性解析一批（去重后的）时长文本
+    返回分钟数数组，无法解析的位置为 NaN
+    """
+    if len(literals) == 0:
+        return np.empty(0, dtype='float64')
+
+    parts = pd.Series(literals, dtype='object').str.extract(DURATION_PATTERN)
+    parts = parts.apply(pd.to_numeric, errors='coerce').astype('float64')
+
+    minutes = (
+        parts['days'].fillna(0) * 24 * 60
+        + parts['hours'].fillna(0) * 60
+        + parts['minutes'].fillna(0)
+        + parts['bare_hours'].fillna(0) * 60
+    ).to_numpy(dtype='float64', copy=True)
+
+    # 正则能匹配空串，所以至少要有一个部分被解析出来才算有效
+    matched = parts.notna().any(axis=1).to_numpy()
+    minutes[~matched] = np.nan
+    return minutes
+
+
+def parse_duration_minutes(values):
+    """
+    整列解析时长文本
+
+    参数:
+    values: 时长列（Series、列表或数组），空值、"-"、"－"均视为无效
+
+    返回:
+    (minutes, valid) - float64 分钟数数组（无效位置为 0.0）和布尔有效性掩码
+    """
+    series = pd.Series(values, dtype='object')
+    if len(series) == 0:
+        return np.empty(0, dtype='float64'), np.empty(0, dtype=bool)
+
+    # 先去重，每个不同的文本只解析一次
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    literals = [str(value).strip() for value in uniques]
+
+    unseen = [literal for literal in literals if literal not in _duration_cache]
+    if unseen:
+        _duration_cache.update(zip(unseen, _extract_minutes(unseen)))
+
+    unique_minutes = np.array([_duration_cache[literal] for literal in literals], dtype='float64')
+    _trim_cache()
+
+    # 空值（code = -1）映射到末尾追加的 NaN 上
+    unique_minutes = np.append(unique_minutes, np.nan)
+    minutes = unique_minutes[codes]
+
+    valid = ~np.isnan(minutes)
+    minutes[~valid] = 0.0
+    return minutes, valid
+
+
+def _trim_cache():
+    """缓存超出上限时删除最早加入的文本"""
+    excess = len(_duration_cache) - MAX_CACHED_DURATIONS
+    if excess > 0:
+        for literal in list(islice(_duration_cache, excess)):
+            del _duration_cache[literal]
+
+
+def parse_duration_hours(values):
+    """
+    整列解析时长文本，返回小时数（保留分钟的小数部分）和有效性掩码
+    """
+    minutes, valid = parse_duration_minutes(values)
+    return minutes / 60, valid
+
+
+def duration_to_minutes(duration_str):
+    """
+    解析单个时长文本，返回分钟数，无法解析时返回 0
+    例如："13天2小时29分" -> 18869
+    """
+    minutes, _ = parse_duration_minutes([duration_str])
+    return float(minutes[0])
+
+
+def clear_cache():
+    """清空时长文本缓存"""
+    _duration_cache.clear()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel读取模块 - 每个工作簿只打开一次
+pd.read_excel 每次调用都会重新解压、解析整个工作簿，
+这里把打开后的 pd.ExcelFile 句柄缓存起来，同一个文件的所有工作表都从这个句柄读取。
+常驻进程（ranking_server、worker_daemon、批量运行的工作进程）会陆续打开很多文件，
+缓存只保留最近使用的 MAX_OPEN_WORKBOOKS 个句柄，超出时移出最久未用的。
+读取工作表期间句柄处于借用状态（borrow_workbook），借用中的句柄移出缓存后等最后一次借用结束才关闭
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+# 最多同时保留的句柄数
+MAX_OPEN_WORKBOOKS = 8
+
+# (绝对路径, 修改时间, 文件大小) -> pd.ExcelFile，按最近使用排序
+_workbooks = OrderedDict()
+
+# id(句柄) -> 借用次数
+_borrowed = {}
+
+# 已移出缓存、等借用结束后关闭的句柄：id(句柄) -> 句柄
+_retired = {}
+
+# ranking_server 在线程中处理上传，缓存的增删和借用计数要加锁
+_lock = threading.Lock()
+
+
+def _workbook_key(file_path):
+    """文件被替换后修改时间或大小会变化，缓存随之失效"""
+    abs_path = os.path.abspath(file_path)
+    stat = os.stat(abs_path)
+    return abs_path, stat.st_mtime_ns, stat.st_size
+
+
+def _discard(key):
+    """移出缓存的句柄：没有借用时直接关闭，否则等借用结束（调用方持有 _lock）"""
+    workbook = _workbooks.pop(key)
+    if id(workbook) in _borrowed:
+        _retired[id(workbook)] = workbook
+    else:
+        workbook.close()
+
+
+def _acquire(key):
+    """取出或打开缓存的句柄（调用方持有 _lock）"""
+    workbook = _workbooks.get(key)
+    if workbook is not None:
+        _workbooks.move_to_end(key)
+        return workbook
+    # 同一文件的旧句柄已经过期
+    for old_key in [k for k in _workbooks if k[0] == key[0]]:
+        _discard(old_key)
+    workbook = pd.ExcelFile(key[0])
+    _workbooks[key] = workbook
+    while len(_workbooks) > MAX_OPEN_WORKBOOKS:
+        _discard(next(iter(_workbooks)))
+    return workbook
+
+
+def open_workbook(source):
+    """
+    打开工作簿，返回 pd.ExcelFile 句柄
+
+    参数:
+    source: 文件路径，或已经打开的文件对象 / pd.ExcelFile
+
+    同一路径的文件未变化时返回同一个句柄；文件对象不缓存。
+    返回的句柄在移出缓存时会被关闭，其他线程同时打开文件时请用 borrow_workbook
+    """
+    if isinstance(source, pd.ExcelFile):
+        return source
+    if not isinstance(source, (str, os.PathLike)):
+        return pd.ExcelFile(source)
+
+    key = _workbook_key(source)
+    with _lock:
+        return _acquire(key)
+
+
+@contextmanager
+def borrow_workbook(source):
+    """
+    借用工作簿句柄，参数同 open_workbook
+    借用期间句柄即使被移出缓存（超出上限、文件已更新、close_workbooks）也不会关闭
+    """
+    if isinstance(source, pd.ExcelFile) or not isinstance(source, (str, os.PathLike)):
+        yield open_workbook(source)
+        return
+
+    key = _workbook_key(source)
+    with _lock:
+        workbook = _acquire(key)
+        _borrowed[id(workbook)] = _borrowed.get(id(workbook), 0) + 1
+    try:
+        yield workbook
+    finally:
+        with _lock:
+            _borrowed[id(workbook)] -= 1
+            if _borrowed[id(workbook)] == 0:
+                del _borrowed[id(workbook)]
+                retired = _retired.pop(id(workbook), None)
+                if retired is not None:
+                    retired.close()
+
+
+def sheet_names(source):
+    """返回工作簿中的工作表名称"""
+    return open_workbook(source).sheet_names
+
+
+def read_sheet(source, sheet_name=0, **kwargs):
+    """
+    从缓存的句柄读取一个工作表，参数与 pd.read_excel 相同
+    """
+    with borrow_workbook(source) as workbook:
+        return workbook.parse(sheet_name=sheet_name, **kwargs)
+
+
+def read_sheets(source, names, **kwargs):
+    """
+    从同一个句柄读取多个工作表
+
+    返回:
+    {工作表名称: DataFrame}
+    """
+    with borrow_workbook(source) as workbook:
+        return {name: workbook.parse(sheet_name=name, **kwargs) for name in names}
+
+
+def close_workbooks(prefix=None):
+    """
+    关闭并移出缓存的句柄（借用中的句柄在借用结束后关闭）
+
+    参数:
+    prefix: 只关闭该文件或该目录下的文件的句柄（如上传的临时目录）；None 时关闭全部
+
+    返回:
+    关闭的句柄数
+    """
+    if prefix is not None:
+        prefix = os.path.abspath(prefix)
+    with _lock:
+        keys = [key for key in _workbooks
+                if prefix is None or key[0] == prefix or key[0].startswith(prefix.rstrip(os.sep) + os.sep)]
+        for key in keys:
+            _discard(key)
+    return len(keys)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel表头识别与列绑定模块
+导出的明细表前几行是标题行和两层表头（分组表头 + 字段表头），
+这里先只读表头行，按表头文字找到每个字段所在的列，
+再用 usecols/dtype 只加载需要的列，并做基本校验
+"""
+
+import re
+
+import pandas as pd
+
+from excel_ingest import read_sheet
+
+# 在前多少行里查找字段表头
+HEADER_SCAN_ROWS = 6
+
+# 列类型：text - 文本；count - 计数（转为数值）；
+# duration - 时长文本（如"7小时26分"）；percent - 百分比文本（如"+8%"）
+TEXT = 'text'
+COUNT = 'count'
+DURATION = 'duration'
+PERCENT = 'percent'
+
+# 流程效率明细.xls 的字段定义
+# name: 程序内使用的列名；headers: 表头里可能出现的文字；required: 缺失时是否报错
+FLOW_SCHEMA = {
+    'key': '模板名称',
+    'columns': [
+        {'name': '模板名称', 'headers': ['模板名称', '流程名称'], 'kind': TEXT, 'required': True},
+        {'name': '发起流程数', 'headers': ['发起流程数'], 'kind': COUNT, 'required': True},
+        {'name': '环比', 'headers': ['环比'], 'kind': PERCENT, 'required': False},
+        {'name': '同比', 'headers': ['同比'], 'kind': PERCENT, 'required': False},
+        {'name': '使用率', 'headers': ['使用率'], 'kind': PERCENT, 'required': False},
+        {'name': '完成流程数', 'headers': ['结束流程数', '完成流程数'], 'kind': COUNT, 'required': True},
+        {'name': '平均运行时长', 'headers': ['平均运行时长'], 'kind': DURATION, 'required': True},
+        {'name': '流程期限', 'headers': ['流程期限'], 'kind': TEXT, 'required': False},
+        {'name': '超期结束流程数', 'headers': ['超期结束流程数'], 'kind': COUNT, 'required': False},
+        {'name': '超期结束比例', 'headers': ['超期结束比例'], 'kind': PERCENT, 'required': False},
+        {'name': '平均超期时长', 'headers': ['平均超期时长'], 'kind': DURATION, 'required': False},
+        {'name': '未结束流程数', 'headers': ['未结束流程数'], 'kind': COUNT, 'required': False},
+        {'name': '超期未结束流程数', 'headers': ['超期未结束流程数'], 'kind': COUNT, 'required': False},
+    ]
+}
+
+# 人员效率明细.xls 的字段定义
+# 表头里"平均超期时长"出现两次，第二次出现的绑定为"平均超期时长2"
+PERSONNEL_SCHEMA = {
+    'key': '人员名称',
+    'columns': [
+        {'name': '人员名称', 'headers': ['人员名称', '姓名', '处理人'], 'kind': TEXT, 'required': True},
+        {'name': '部门名称', 'headers': ['部门名称', '部门'], 'kind': TEXT, 'required': True},
+        {'name': '单位名称', 'headers': ['单位名称', '单位'], 'kind': TEXT, 'required': False},
+        {'name': '处理数', 'headers': ['处理数'], 'kind': COUNT, 'required': True},
+        {'name': '平均处理时长', 'headers': ['平均处理时长'], 'kind': DURATION, 'required': True},
+        {'name': '超期处理数', 'headers': ['超期处理数'], 'kind': COUNT, 'required': False},
+        {'name': '超期处理比例', 'headers': ['超期处理比例'], 'kind': PERCENT, 'required': False},
+        {'name': '平均超期时长', 'headers': ['平均超期时长'], 'kind': DURATION, 'required': False},
+        {'name': '平均超期时长2', 'headers': ['平均超期时长2'], 'kind': DURATION, 'required': False},
+        {'name': '未处理流程数', 'headers': ['未处理流程数'], 'kind': COUNT, 'required': True},
+        {'name': '超期未处理流程数', 'headers': ['超期未处理流程数'], 'kind': COUNT, 'required': False},
+    ]
+}
+
+
+def normalize_header(text):
+    """去掉表头文字中的空白和换行"""
+    if pd.isna(text):
+        return ''
+    return re.sub(r'\s+', '', str(text))
+
+
+def _number_duplicates(headers):
+    """重复出现的表头依次编号：第二次出现的"平均超期时长"记为"平均超期时长2\""""
+    seen = {}
+    numbered = []
+    for header in headers:
+        if not header:
+            numbered.append(header)
+            continue
+        seen[header] = seen.get(header, 0) + 1
+        numbered.append(header if seen[header] == 1 else f'{header}{seen[header]}')
+    return numbered
+
+
+def bind_header_row(header_cells, schema):
+    """
+    根据一行表头文字，找出每个字段所在的列位置
+
+    参数:
+    header_cells: 字段表头行的单元格列表
+    schema: FLOW_SCHEMA / PERSONNEL_SCHEMA
+
+    返回:
+    {列名: 列位置}，只包含找到的字段
+    """
+    headers = _number_duplicates([normalize_header(cell) for cell in header_cells])
+    positions = {}
+    for column in schema['columns']:
+        for alias in column['headers']:
+            if alias in headers:
+                positions[column['name']] = headers.index(alias)
+                break
+    return positions
+
+
+def find_header_row(rows, schema):
+    """
+    在表头区域中找到字段表头所在的行（包含主键列表头文字的那一行）
+
+    参数:
+    rows: 表头区域的 DataFrame（header=None 读取）
+
+    返回:
+    (行号, {列名: 列位置})
+    """
+    key_column = next(c for c in schema['columns'] if c['name'] == schema['key'])
+    for row_index in range(len(rows)):
+        cells = [normalize_header(cell) for cell in rows.iloc[row_index].tolist()]
+        if any(alias in cells for alias in key_column['headers']):
+            return row_index, bind_header_row(cells, schema)
+
+    raise ValueError(f"未找到表头行：前{len(rows)}行中没有'{schema['key']}'列")
+
+
+def check_required(positions, schema):
+    """缺少必需字段时报错"""
+    missing = [c['name'] for c in schema['columns'] if c['required'] and c['name'] not in positions]
+    if missing:
+        raise ValueError(f"表头中缺少必需的列: {', '.join(missing)}")
+
+
+def detect_columns(file_path, schema, sheet_name=0):
+    """
+    只读取表头区域，返回字段表头所在行号和字段列位置
+    """
+    rows = read_sheet(file_path, sheet_name, header=None, nrows=HEADER_SCAN_ROWS, dtype=str)
+    header_row, positions = find_header_row(rows, schema)
+    check_required(positions, schema)
+    return header_row, positions
+
+
+def convert_columns(df, schema):
+    """按字段类型转换列：计数列转为数值，其余列保持文本"""
+    kinds = {c['name']: c['kind'] for c in schema['columns']}
+    for name in df.columns:
+        if kinds.get(name) == COUNT:
+            df[name] = pd.to_numeric(df[name], errors='coerce')
+    return df
+
+
+def validate_frame(df, schema):
+    """
+    校验绑定后的数据：主键列不能全为空，计数列不能出现负数
+    """
+    key = schema['key']
+    if df[key].notna().sum() == 0:
+        raise ValueError(f"'{key}'列没有任何数据，请检查表头是否对齐")
+
+    for column in schema['columns']:
+        name = column['name']
+        if column['kind'] == COUNT and name in df.columns and (df[name] < 0).any():
+            raise ValueError(f"'{name}'列出现负数，请检查表头是否对齐")
+    return df
+
+
+def load_with_schema(file_path, schema, columns=None, sheet_name=0):
+    """
+    按表头文字绑定列并加载数据
+
+    参数:
+    file_path: Excel文件路径（表头和数据从同一个缓存的工作簿句柄读取）
+    schema: FLOW_SCHEMA / PERSONNEL_SCHEMA
+    columns: 需要加载的列名列表，默认加载 schema 中所有找到的列
+
+    返回:
+    只包含所需列的 DataFrame，列顺序与 schema 一致，计数列为数值类型
+    """
+    header_row, positions = detect_columns(file_path, schema, sheet_name=sheet_name)
+
+    wanted = [c['name'] for c in schema['columns']
+              if c['name'] in positions and (columns is None or c['name'] in columns)]
+    if columns is not None:
+        unknown = [name for name in columns if name not in positions]
+        if unknown:
+            raise ValueError(f"表头中没有这些列: {', '.join(unknown)}")
+
+    # usecols 按列位置升序读取，names 需要同样的顺序
+    by_position = sorted(wanted, key=lambda name: positions[name])
+    kinds = {c['name']: c['kind'] for c in schema['columns']}
+    dtype = {name: str for name in by_position if kinds[name] != COUNT}
+
+    df = read_sheet(
+        file_path,
+        sheet_name,
+        header=None,
+        skiprows=header_row + 1,
+        usecols=[positions[name] for name in by_position],
+        names=by_position,
+        dtype=dtype,
+    )
+
+    df = convert_columns(df[wanted], schema)
+    return validate_frame(df, schema)
+
+
+def bind_columns(df, schema):
+    """
+    为已经读入的整表（header=None 或带 Unnamed 列名）按表头文字重新命名列
+    并去掉表头行，返回只包含 schema 字段的 DataFrame
+    """
+    # 用 header=0 读入时，第一行表头文字落在列名上，这里把它放回表头区域一起查找
+    rows = pd.concat([pd.DataFrame([list(df.columns)]), pd.DataFrame(df.head(HEADER_SCAN_ROWS).values)],
+                     ignore_index=True)
+    header_row, positions = find_header_row(rows, schema)
+    check_required(positions, schema)
+
+    wanted = [c['name'] for c in schema['columns'] if c['name'] in positions]
+    body = df.iloc[header_row:, [positions[name] for name in wanted]].reset_index(drop=True)
+    body.columns = wanted
+    body = convert_columns(body, schema)
+    return validate_frame(body, schema)
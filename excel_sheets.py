@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只读取工作表名称，不加载 pandas
+.xlsx 直接读取压缩包中的 xl/workbook.xml，.xls 用 xlrd 的按需模式只解析工作簿目录；
+查看工作表列表这类轻量操作不必为导入 pandas/NumPy 付出启动时间
+"""
+
+import argparse
+import zipfile
+from xml.etree import ElementTree
+
+# workbook.xml 的命名空间
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+# .xlsx 是 zip 压缩包；.xls（OLE 复合文档）内部也可能嵌着 zip 格式的主题，
+# 所以按文件头而不是 zipfile.is_zipfile 判断
+_ZIP_MAGIC = b'PK\x03\x04'
+
+
+def is_xlsx(file_path):
+    """按文件内容判断是否为 .xlsx（zip 格式），不看扩展名：导出的 .xlsx 常被改名为 .xls"""
+    with open(file_path, 'rb') as f:
+        return f.read(len(_ZIP_MAGIC)) == _ZIP_MAGIC
+
+
+def sheet_names(file_path):
+    """返回工作簿中的工作表名称（按工作簿中的顺序）"""
+    if is_xlsx(file_path):
+        with zipfile.ZipFile(file_path) as archive:
+            root = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        return [sheet.get('name') for sheet in root.iter(f'{_MAIN_NS}sheet')]
+
+    import xlrd
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        return book.sheet_names()
+    finally:
+        book.release_resources()
+
+
+def main(argv=None):
+    """命令行入口：列出一个或多个工作簿的工作表"""
+    parser = argparse.ArgumentParser(description='列出 Excel 工作簿中的工作表名称')
+    parser.add_argument('files', nargs='+', help='.xls / .xlsx 文件')
+    args = parser.parse_args(argv)
+
+    status = 0
+    for file_path in args.files:
+        try:
+            names = sheet_names(file_path)
+        except Exception as e:
+            print(f"{file_path}: 读取失败 ({e})")
+            status = 1
+            continue
+        print(f"{file_path}:")
+        for name in names:
+            print(f"  {name}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析结果缓存模块
+.xls 文件用 xlrd 解析很慢，这里把清理后的 DataFrame 按列存储（有 pyarrow 时用 Parquet，
+否则用 pickle），以"文件内容哈希 + 修改时间"作为键；源文件不变时直接读缓存，
+源文件变化后重新解析并重建缓存
+
+多个进程（parallel_loader、batch_runner 的工作进程）可能同时读写同一个缓存目录：
+缓存文件和索引都先写到各自唯一的临时文件再改名，索引在文件锁内重新读取、合并后写回
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 上没有 fcntl，索引不加锁（仍然原子改名，最坏情况是丢掉一条索引、下次重新计算哈希）
+    fcntl = None
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+# 清理逻辑或缓存格式变化时递增，旧缓存自动失效
+CACHE_VERSION = 1
+
+# 缓存目录名，默认放在源文件所在目录下
+CACHE_DIR_NAME = '.cache'
+
+
+def default_cache_dir(source_path):
+    """源文件所在目录下的 .cache 目录"""
+    return os.path.join(os.path.dirname(os.path.abspath(source_path)), CACHE_DIR_NAME)
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """分块计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_index(cache_dir):
+    """读取 {源文件路径: {mtime_ns, size, sha256}} 索引，避免每次都重新计算哈希"""
+    try:
+        with open(os.path.join(cache_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _replace_from_temp(path, write):
+    """write(tmp_path) 写出同目录下唯一的临时文件，再改名为 path；失败时删除临时文件"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '-', suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _update_index(cache_dir, abs_path, entry):
+    """在 index.json.lock 的排他锁内重新读取索引，合并这一条后写回"""
+    index_path = os.path.join(cache_dir, 'index.json')
+    lock_fd = os.open(index_path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        index = _load_index(cache_dir)
+        index[abs_path] = entry
+
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+
+        _replace_from_temp(index_path, write)
+    finally:
+        os.close(lock_fd)
+
+
+def source_fingerprint(source_path, cache_dir=None):
+    """
+    返回源文件的指纹 (sha256, mtime_ns)
+    修改时间和大小都没变时复用索引里记录的哈希
+    """
+    cache_dir = cache_dir or default_cache_dir(source_path)
+    abs_path = os.path.abspath(source_path)
+    stat = os.stat(abs_path)
+
+    index = _load_index(cache_dir)
+    entry = index.get(abs_path)
+    if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+        return entry['sha256'], stat.st_mtime_ns
+
+    sha256 = file_sha256(abs_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _update_index(cache_dir, abs_path, {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': sha256})
+    except OSError as e:
+        # 索引写不进去只是下次要重新计算哈希
+        print(f"缓存索引写入失败: {cache_dir} ({e})")
+    return sha256, stat.st_mtime_ns
+
+
+def cache_path(source_path, tag, cache_dir=None):
+    """
+    缓存文件路径：<缓存目录>/<文件名>.<tag>.v<版本>.<哈希前16位>-<修改时间>.<格式>
+    """
+    cache_dir = cache_dir or default_cache_dir(source_path)
+    sha256, mtime_ns = source_fingerprint(source_path, cache_dir)
+    stem = os.path.basename(source_path)
+    extension = 'parquet' if CACHE_FORMAT == 'parquet' else 'pkl'
+    return os.path.join(cache_dir, f'{stem}.{tag}.v{CACHE_VERSION}.{sha256[:16]}-{mtime_ns}.{extension}')
+
+
+def _read(path):
+    if CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _write(df, path):
+    if CACHE_FORMAT == 'parquet':
+        _replace_from_temp(path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+    else:
+        _replace_from_temp(path, df.to_pickle)
+
+
+def _remove_stale(source_path, tag, cache_dir, keep_path):
+    """删除同一源文件、同一 tag 的旧缓存"""
+    pattern = os.path.join(cache_dir, f'{glob.escape(os.path.basename(source_path))}.{tag}.*')
+    for path in glob.glob(pattern):
+        if path != keep_path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def cached_frame(source_path, build, tag, cache_dir=None):
+    """
+    读取源文件对应的缓存 DataFrame，没有缓存或源文件已变化时调用 build 重新解析
+
+    参数:
+    source_path: 源 Excel 文件路径
+    build: 解析函数，build(source_path) 返回清理后的 DataFrame
+    tag: 区分同一文件不同解析方式的标签，如 'flow'、'personnel'
+    cache_dir: 缓存目录，默认为源文件所在目录下的 .cache
+
+    返回:
+    清理后的 DataFrame
+    """
+    cache_dir = cache_dir or default_cache_dir(source_path)
+    path = cache_path(source_path, tag, cache_dir)
+
+    if os.path.exists(path):
+        try:
+            return _read(path)
+        except Exception as e:
+            # 缓存损坏时回退到完整解析
+            print(f"缓存读取失败，重新解析: {path} ({e})")
+
+    df = build(source_path)
+
+    try:
+        _write(df, path)
+        _remove_stale(source_path, tag, cache_dir, path)
+    except Exception as e:
+        # 缓存写不进去不影响本次结果
+        print(f"缓存写入失败: {path} ({e})")
+
+    return df
@@ -7,208 +7,232 @@
 3. 主要负责人流程处理时长排名
 """
 
-import pandas as pd
-import json
-from datetime import datetime
+import argparse
 
-def load_personnel_data():
-    """加载人员效率明细数据"""
-    file_path = '/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台/人员效率明细.xls'
-    
-    # 跳过前两行，手动设置列名
-    df = pd.read_excel(file_path, header=None, skiprows=2)
-    
-    # 设置列名
-    column_names = [
-        '人员名称', '部门名称', '单位名称', '处理数', '平均处理时长', 
-        '超期处理数', '超期处理比例', '平均超期时长', '平均超期时长2', 
-        '未处理流程数', '超期未处理流程数', '备注'
-    ]
-    df.columns = column_names[:len(df.columns)]
+from chart_format import merge_chart_data
+from duration_parser import duration_to_minutes, parse_duration_minutes
+from excel_ingest import read_sheet
+from excel_schema import PERSONNEL_SCHEMA, load_with_schema
+from frame_cache import cached_frame
+from instrumentation import add_arguments, recording, stage
+from name_index import load_name_aliases, main_person_rows, normalize_name
+from personnel_stream import stream_personnel_rankings
+import query_engine
+from ranking import top_k_indices
+from serialization import COUNT, LABEL, TEXT, build_records
+from settings import data_path
+
+
+def _load_personnel_frame(file_path):
+    """解析并清理人员效率明细，返回带类型的 DataFrame"""
+    # 按表头文字绑定列，只加载需要的列（计数列已转为数值）
+    df = load_with_schema(file_path, PERSONNEL_SCHEMA)
     
     # 清理数据
     df_clean = df[df['人员名称'].notna() & (df['人员名称'] != '合计')].reset_index(drop=True)
     
     # 转换数值列
-    df_clean['处理数_数值'] = pd.to_numeric(df_clean['处理数'], errors='coerce')
-    df_clean['未处理流程数_数值'] = pd.to_numeric(df_clean['未处理流程数'], errors='coerce')
+    df_clean['处理数_数值'] = df_clean['处理数']
+    df_clean['未处理流程数_数值'] = df_clean['未处理流程数']
     
     return df_clean
 
-def load_main_responsible_persons():
-    """加载主要负责人列表"""
-    file_path = '/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台/基本信息.xlsx'
-    
-    # 读取主要负责人工作表
-    df = pd.read_excel(file_path, sheet_name='主要负责人', header=None)
+def load_personnel_data(file_path=None):
+    """加载人员效率明细数据（源文件没有变化时直接读取缓存），默认读取数据目录下的文件"""
+    return cached_frame(file_path or data_path('personnel'), _load_personnel_frame, 'personnel')
+
+def load_main_responsible_persons(file_path=None):
+    """加载主要负责人列表（默认读取数据目录下的基本信息.xlsx）"""
+    # 读取主要负责人工作表（与流程分类共用同一个工作簿句柄）
+    df = read_sheet(file_path or data_path('basic'), '主要负责人', header=None)
     
     # 主要负责人姓名在第一列，按行排列
     main_persons = df.iloc[:, 0].dropna().tolist()
     
-    # 清理姓名，去除可能的空格和特殊字符
-    main_persons = [str(name).strip() for name in main_persons if str(name).strip() and str(name) != 'nan']
+    # 规范化姓名（全角字符、空格、零宽字符等），去掉重复
+    main_persons = [normalize_name(name) for name in main_persons]
+    main_persons = list(dict.fromkeys(name for name in main_persons if name))
     
     return main_persons
 
-def generate_personal_process_ranking(df_personnel):
-    """生成个人流程处理数排名"""
-    # 筛选有效数据（处理数大于0）
-    df_valid = df_personnel[df_personnel['处理数_数值'] > 0].copy()
-    
-    # 按处理数排序
-    df_sorted = df_valid.sort_values('处理数_数值', ascending=False)
-    
-    # 生成排名数据
-    ranking_data = []
-    for i, (_, row) in enumerate(df_sorted.head(20).iterrows(), 1):
-        ranking_data.append({
-            '排名': i,
-            '人员名称': row['人员名称'],
-            '部门名称': row['部门名称'],
-            '处理数': int(row['处理数_数值']),
-            '平均处理时长': row['平均处理时长'] if pd.notna(row['平均处理时长']) else '-',
-            '未处理流程数': int(row['未处理流程数_数值']) if pd.notna(row['未处理流程数_数值']) else 0
-        })
-    
-    return ranking_data
-
-def generate_main_person_process_ranking(df_personnel, main_persons):
-    """生成主要负责人流程数排名"""
-    # 筛选主要负责人数据
-    df_main = df_personnel[df_personnel['人员名称'].isin(main_persons)].copy()
-    
-    # 筛选有效数据
-    df_valid = df_main[df_main['处理数_数值'] > 0].copy()
-    
-    # 按处理数排序
-    df_sorted = df_valid.sort_values('处理数_数值', ascending=False)
-    
-    # 生成排名数据
-    ranking_data = []
-    for i, (_, row) in enumerate(df_sorted.head(15).iterrows(), 1):
-        ranking_data.append({
-            '排名': i,
-            '负责人姓名': row['人员名称'],
-            '部门名称': row['部门名称'],
-            '处理数': int(row['处理数_数值']),
-            '平均处理时长': row['平均处理时长'] if pd.notna(row['平均处理时长']) else '-',
-            '未处理流程数': int(row['未处理流程数_数值']) if pd.notna(row['未处理流程数_数值']) else 0
-        })
-    
-    return ranking_data
+# 排名记录的字段：(输出键名, 列名, 输出方式)，见 serialization.build_records
+PERSONAL_RANKING_FIELDS = [
+    ('人员名称', '人员名称', TEXT),
+    ('部门名称', '部门名称', TEXT),
+    ('处理数', '处理数_数值', COUNT),
+    ('平均处理时长', '平均处理时长', LABEL),
+    ('未处理流程数', '未处理流程数_数值', COUNT),
+]
+
+MAIN_PERSON_PROCESS_FIELDS = [('负责人姓名', '人员名称', TEXT)] + PERSONAL_RANKING_FIELDS[1:]
+
+MAIN_PERSON_DURATION_FIELDS = [
+    ('负责人姓名', '人员名称', TEXT),
+    ('部门名称', '部门名称', TEXT),
+    ('平均处理时长', '平均处理时长', LABEL),
+    ('处理数', '处理数_数值', COUNT),
+    ('未处理流程数', '未处理流程数_数值', COUNT),
+]
+
+def generate_personal_process_ranking(df_personnel, k=20, engine=None):
+    """
+    生成个人流程处理数排名
+    k: 取前几名，None 表示输出全部有效记录
+    engine: query_engine.QueryEngine，给出时由 SQL 查询取前K名所在的行
+    """
+    # 按处理数排序，只取出前K名所在的行（筛选有效数据：处理数大于0）
+    if engine is not None:
+        top_rows = query_engine.personal_process_rows(engine, df_personnel, k)
+    else:
+        counts = df_personnel['处理数_数值'].to_numpy(dtype='float64')
+        top_rows = top_k_indices([counts], k, mask=counts > 0)
+    
+    # 按列生成排名数据
+    return build_records(df_personnel.iloc[top_rows], PERSONAL_RANKING_FIELDS)
+
+def generate_main_person_process_ranking(df_personnel, main_persons, main_rows=None, k=15, engine=None):
+    """
+    生成主要负责人流程数排名
+    main_rows: 主要负责人所在的行号数组（见 name_index.main_person_rows），不传时按姓名现算
+    k: 取前几名，None 表示输出全部有效记录
+    engine: query_engine.QueryEngine，给出时由 SQL 查询取前K名所在的行
+    """
+    # 主要负责人所在的行（按规范化姓名的哈希索引查找，不复制整张表）
+    if main_rows is None:
+        main_rows = main_person_rows(df_personnel, main_persons)
+    if engine is not None:
+        top_rows = query_engine.main_person_process_rows(engine, df_personnel, main_rows, k)
+        return build_records(df_personnel.iloc[top_rows], MAIN_PERSON_PROCESS_FIELDS)
+    counts = df_personnel['处理数_数值'].to_numpy(dtype='float64')[main_rows]
+    
+    # 按处理数排序，只取出前K名所在的行（筛选有效数据：处理数大于0）
+    top_rows = main_rows[top_k_indices([counts], k, mask=counts > 0)]
+    
+    # 按列生成排名数据
+    return build_records(df_personnel.iloc[top_rows], MAIN_PERSON_PROCESS_FIELDS)
 
 def parse_time_duration(time_str):
-    """解析时间字符串，返回分钟数用于排序"""
-    if pd.isna(time_str) or time_str == '-' or time_str == '':
-        return 0
-    
-    time_str = str(time_str).strip()
-    total_minutes = 0
-    
-    try:
-        # 解析"X天Y小时Z分"格式
-        if '天' in time_str:
-            parts = time_str.split('天')
-            days = int(parts[0])
-            total_minutes += days * 24 * 60
-            time_str = parts[1] if len(parts) > 1 else ''
-        
-        if '小时' in time_str:
-            parts = time_str.split('小时')
-            hours = int(parts[0])
-            total_minutes += hours * 60
-            time_str = parts[1] if len(parts) > 1 else ''
-        
-        if '分' in time_str:
-            minutes = int(time_str.replace('分', ''))
-            total_minutes += minutes
-            
-    except (ValueError, IndexError):
-        return 0
-    
-    return total_minutes
-
-def generate_main_person_duration_ranking(df_personnel, main_persons):
-    """生成主要负责人流程处理时长排名"""
-    # 筛选主要负责人数据
-    df_main = df_personnel[df_personnel['人员名称'].isin(main_persons)].copy()
-    
-    # 筛选有处理时长数据的记录
-    df_valid = df_main[df_main['平均处理时长'].notna() & (df_main['平均处理时长'] != '-')].copy()
-    
-    # 解析处理时长为分钟数
-    df_valid['处理时长_分钟'] = df_valid['平均处理时长'].apply(parse_time_duration)
-    
-    # 筛选有效时长数据
-    df_valid = df_valid[df_valid['处理时长_分钟'] > 0].copy()
-    
-    # 按处理时长排序（从长到短）
-    df_sorted = df_valid.sort_values('处理时长_分钟', ascending=False)
-    
-    # 生成排名数据
-    ranking_data = []
-    for i, (_, row) in enumerate(df_sorted.head(15).iterrows(), 1):
-        ranking_data.append({
-            '排名': i,
-            '负责人姓名': row['人员名称'],
-            '部门名称': row['部门名称'],
-            '平均处理时长': row['平均处理时长'],
-            '处理数': int(row['处理数_数值']) if pd.notna(row['处理数_数值']) else 0,
-            '未处理流程数': int(row['未处理流程数_数值']) if pd.notna(row['未处理流程数_数值']) else 0
-        })
-    
-    return ranking_data
-
-def update_chart_data(personal_ranking, main_person_ranking, main_duration_ranking):
-    """更新chart_data.json文件"""
-    # 读取现有数据
-    try:
-        with open('chart_data.json', 'r', encoding='utf-8') as f:
-            chart_data = json.load(f)
-    except FileNotFoundError:
-        chart_data = {}
-    
-    # 添加新的排名数据
-    chart_data['personal_process_ranking'] = personal_ranking
-    chart_data['main_person_process_ranking'] = main_person_ranking
-    chart_data['main_person_duration_ranking'] = main_duration_ranking
-    
-    # 保存更新后的数据
-    with open('chart_data.json', 'w', encoding='utf-8') as f:
-        json.dump(chart_data, f, ensure_ascii=False, indent=2)
-    
-    print("chart_data.json 文件已更新")
-
-def main():
-    """主函数"""
-    print("开始生成人员排名数据...")
-    
+    """解析时间字符串，返回分钟数用于排序（整列解析请使用 duration_parser.parse_duration_minutes）"""
+    return duration_to_minutes(time_str)
+
+def generate_main_person_duration_ranking(df_personnel, main_persons, main_rows=None, k=15, engine=None):
+    """
+    生成主要负责人流程处理时长排名
+    main_rows: 主要负责人所在的行号数组（见 name_index.main_person_rows），不传时按姓名现算
+    k: 取前几名，None 表示输出全部有效记录
+    engine: query_engine.QueryEngine，给出时由 SQL 查询取前K名所在的行
+    """
+    # 主要负责人所在的行（按规范化姓名的哈希索引查找，不复制整张表）
+    if main_rows is None:
+        main_rows = main_person_rows(df_personnel, main_persons)
+    if engine is not None:
+        top_rows = query_engine.main_person_duration_rows(engine, df_personnel, main_rows, k)
+        return build_records(df_personnel.iloc[top_rows], MAIN_PERSON_DURATION_FIELDS)
+    
+    # 解析处理时长为分钟数（空值和"-"解析为无效）
+    with stage('parse_duration', rows_in=len(main_rows)) as record:
+        minutes, valid = parse_duration_minutes(df_personnel['平均处理时长'].to_numpy()[main_rows])
+        record['rows_out'] = int(valid.sum())
+    
+    # 按处理时长排序（从长到短），只取出前K名所在的行（筛选有效时长数据）
+    top_rows = main_rows[top_k_indices([minutes], k, mask=valid & (minutes > 0))]
+    
+    # 按列生成排名数据
+    return build_records(df_personnel.iloc[top_rows], MAIN_PERSON_DURATION_FIELDS)
+
+def update_chart_data(personal_ranking, main_person_ranking, main_duration_ranking, output_file=None):
+    """更新chart_data.json文件（默认为数据目录下的 chart_data.json，与 process_data 写的是同一个文件）"""
+    output_file = output_file or data_path('output')
+    
+    # 在文件锁内读取现有数据（v1/v2格式均可）并合并三个人员排名后原子地写出，
+    # 与同时运行的 process_data 不会互相覆盖
+    merge_chart_data({
+        'personal_process_ranking': personal_ranking,
+        'main_person_process_ranking': main_person_ranking,
+        'main_person_duration_ranking': main_duration_ranking,
+    }, output_file)
+    
+    print(f"{output_file} 文件已更新")
+
+def _generate_rankings(full=False):
+    """
+    一次性载入人员效率明细并生成三个排名
+    full=True 时输出全部有效记录，而不只是前20/15名
+    """
     # 加载数据
     print("1. 加载人员效率数据...")
-    df_personnel = load_personnel_data()
+    with stage('load_personnel') as record:
+        df_personnel = load_personnel_data()
+        record['rows_out'] = len(df_personnel)
     print(f"   加载了 {len(df_personnel)} 条人员数据")
     
     print("2. 加载主要负责人列表...")
-    main_persons = load_main_responsible_persons()
+    with stage('load_main_persons') as record:
+        main_persons = load_main_responsible_persons()
+        record['rows_out'] = len(main_persons)
     print(f"   找到 {len(main_persons)} 位主要负责人")
     print(f"   主要负责人: {main_persons[:10]}...")  # 显示前10个
     
-    # 生成排名
+    # 主要负责人所在的行只查找一次，两个负责人排名共用
+    with stage('match_main_persons', rows_in=len(df_personnel)) as record:
+        main_rows = main_person_rows(df_personnel, main_persons, load_name_aliases(data_path('basic')))
+        record['rows_out'] = len(main_rows)
+    print(f"   对应人员效率数据中的 {len(main_rows)} 行")
+    
+    # 生成排名（k=None 表示不限名次）
+    top = {'k': None} if full else {}
     print("3. 生成个人流程处理数排名...")
-    personal_ranking = generate_personal_process_ranking(df_personnel)
+    with stage('personal_process_ranking', rows_in=len(df_personnel)) as record:
+        personal_ranking = generate_personal_process_ranking(df_personnel, **top)
+        record['rows_out'] = len(personal_ranking)
     print(f"   生成了前 {len(personal_ranking)} 名的排名")
     
     print("4. 生成主要负责人流程数排名...")
-    main_person_ranking = generate_main_person_process_ranking(df_personnel, main_persons)
+    with stage('main_person_process_ranking', rows_in=len(main_rows)) as record:
+        main_person_ranking = generate_main_person_process_ranking(df_personnel, main_persons, main_rows, **top)
+        record['rows_out'] = len(main_person_ranking)
     print(f"   生成了前 {len(main_person_ranking)} 名的排名")
     
     print("5. 生成主要负责人流程处理时长排名...")
-    main_duration_ranking = generate_main_person_duration_ranking(df_personnel, main_persons)
+    with stage('main_person_duration_ranking', rows_in=len(main_rows)) as record:
+        main_duration_ranking = generate_main_person_duration_ranking(df_personnel, main_persons, main_rows, **top)
+        record['rows_out'] = len(main_duration_ranking)
     print(f"   生成了前 {len(main_duration_ranking)} 名的排名")
     
+    return personal_ranking, main_person_ranking, main_duration_ranking
+
+def main(stream=False, full=False):
+    """
+    主函数
+    stream=True（命令行 --stream）时分块读取人员效率明细，适合超大的导出文件（.xls 仍整表载入，见 personnel_stream）
+    full=True（命令行 --all）时输出完整排名；流式读取只保留前K名，不支持该选项
+    """
+    print("开始生成人员排名数据...")
+    
+    if stream:
+        print("1. 加载主要负责人列表...")
+        with stage('load_main_persons') as record:
+            main_persons = load_main_responsible_persons()
+            record['rows_out'] = len(main_persons)
+        print(f"   找到 {len(main_persons)} 位主要负责人")
+        
+        # 边读边计算排名，不把整张表载入内存
+        print("2-5. 流式读取人员效率数据并生成排名...")
+        with stage('stream_personnel_rankings') as record:
+            result = stream_personnel_rankings(data_path('personnel'), main_persons,
+                                               aliases=load_name_aliases(data_path('basic')))
+            record['rows_in'] = result['totals']['人员数']
+        print(f"   读取了 {result['totals']['人员数']} 条人员数据")
+        personal_ranking = result['personal_process_ranking']
+        main_person_ranking = result['main_person_process_ranking']
+        main_duration_ranking = result['main_person_duration_ranking']
+    else:
+        personal_ranking, main_person_ranking, main_duration_ranking = _generate_rankings(full)
+    
     # 更新数据文件
     print("6. 更新chart_data.json文件...")
-    update_chart_data(personal_ranking, main_person_ranking, main_duration_ranking)
+    with stage('update_chart_data'):
+        update_chart_data(personal_ranking, main_person_ranking, main_duration_ranking)
     
     # 显示示例数据
     print("\n=== 个人流程处理数排名前5名 ===")
@@ -225,5 +249,19 @@ def main():
     
     print("\n数据生成完成！")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='生成人员相关的三个排名数据并写入 chart_data.json')
+    parser.add_argument('--stream', action='store_true', help='分块读取人员效率明细（适合超大的导出文件；.xlsx 逐行读取，.xls 仍整表载入）')
+    parser.add_argument('--all', action='store_true', help='输出完整排名，而不只是前20/15名')
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+def cli(argv=None):
+    """命令行入口（lcjx.py personnel 也调用这里）"""
+    args = parse_args(argv)
+    with recording(args, 'generate_personnel_rankings'):
+        main(stream=args.stream, full=args.all)
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(cli())
\ No newline at end of file
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多期历史数据存储 - 基于 SQLite 的追加式存储
+每个月的导出文件带上期间标签（如 2025-06）只入库一次，
+环比/同比由本地历史数据按索引查询计算，不再依赖导出文件里的"+8%"字符串；
+按模板或人员查询历史趋势也只需一次索引查询
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from duration_parser import parse_duration_minutes
+from frame_cache import cached_frame, source_fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS 入库记录 (
+    数据类型 TEXT NOT NULL,
+    期间 TEXT NOT NULL,
+    文件哈希 TEXT NOT NULL,
+    入库时间 TEXT NOT NULL,
+    PRIMARY KEY (数据类型, 期间)
+);
+
+CREATE TABLE IF NOT EXISTS 流程历史 (
+    模板名称 TEXT NOT NULL,
+    期间 TEXT NOT NULL,
+    发起流程数 INTEGER NOT NULL,
+    完成流程数 INTEGER NOT NULL,
+    平均运行时长_分钟 REAL,
+    未结束流程数 INTEGER,
+    超期未结束流程数 INTEGER,
+    PRIMARY KEY (模板名称, 期间)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS 流程历史_期间 ON 流程历史 (期间);
+
+CREATE TABLE IF NOT EXISTS 人员历史 (
+    人员名称 TEXT NOT NULL,
+    部门名称 TEXT NOT NULL,
+    期间 TEXT NOT NULL,
+    单位名称 TEXT,
+    处理数 INTEGER NOT NULL,
+    平均处理时长_分钟 REAL,
+    超期处理数 INTEGER,
+    未处理流程数 INTEGER,
+    PRIMARY KEY (人员名称, 部门名称, 期间)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS 人员历史_期间 ON 人员历史 (期间);
+"""
+
+# 各数据类型的主键列和可比较的指标列
+KINDS = {
+    'flow': {
+        'table': '流程历史',
+        'keys': ['模板名称'],
+        'metrics': ['发起流程数', '完成流程数', '平均运行时长_分钟', '未结束流程数', '超期未结束流程数'],
+    },
+    'personnel': {
+        'table': '人员历史',
+        'keys': ['人员名称', '部门名称'],
+        'metrics': ['处理数', '平均处理时长_分钟', '超期处理数', '未处理流程数'],
+    },
+}
+
+
+def validate_period(period):
+    """期间格式为 YYYY-MM"""
+    try:
+        datetime.strptime(period, '%Y-%m')
+    except ValueError:
+        raise ValueError(f"期间格式应为 YYYY-MM: {period}")
+    return period
+
+
+def shift_period(period, months):
+    """期间加减月数：shift_period('2025-01', -1) -> '2024-12'"""
+    year, month = map(int, validate_period(period).split('-'))
+    total = year * 12 + (month - 1) + months
+    return f'{total // 12:04d}-{total % 12 + 1:02d}'
+
+
+def change_ratio(current, previous):
+    """变化比例，上期为空或为0时返回 None"""
+    if current is None or previous is None or previous == 0:
+        return None
+    return (current - previous) / previous
+
+
+def format_ratio(ratio):
+    """比例格式化为导出文件中的写法，如 "+8%"、"-20%"；无法计算时为 "-\""""
+    if ratio is None:
+        return '-'
+    return f'{ratio * 100:+.0f}%'
+
+
+class HistoryStore:
+    """
+    SQLite 历史数据存储
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ingested(self, kind, period):
+        """返回已入库记录（文件哈希等），未入库时返回 None"""
+        return self.conn.execute(
+            'SELECT * FROM 入库记录 WHERE 数据类型 = ? AND 期间 = ?', (kind, period)).fetchone()
+
+    def periods(self, kind):
+        """已入库的期间列表"""
+        rows = self.conn.execute('SELECT 期间 FROM 入库记录 WHERE 数据类型 = ? ORDER BY 期间', (kind,))
+        return [row['期间'] for row in rows]
+
+    def _ingest(self, kind, period, source_sha, rows, replace):
+        period = validate_period(period)
+        existing = self.ingested(kind, period)
+        if existing is not None:
+            if existing['文件哈希'] == source_sha:
+                return False
+            if not replace:
+                raise ValueError(f"{period} 的{kind}数据已入库（来自另一个文件），如需覆盖请使用 replace=True")
+
+        table = KINDS[kind]['table']
+        columns = list(rows[0].keys()) if rows else []
+        with self.conn:
+            self.conn.execute(f'DELETE FROM {table} WHERE 期间 = ?', (period,))
+            if rows:
+                placeholders = ', '.join('?' for _ in columns)
+                self.conn.executemany(
+                    f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})',
+                    [tuple(row[c] for c in columns) for row in rows])
+            self.conn.execute(
+                'INSERT OR REPLACE INTO 入库记录 (数据类型, 期间, 文件哈希, 入库时间) VALUES (?, ?, ?, ?)',
+                (kind, period, source_sha, datetime.now().isoformat()))
+        return True
+
+    def ingest_flow(self, period, df_flow, source_sha, replace=False):
+        """
+        写入一期流程效率数据
+
+        参数:
+        period: 期间，如 '2025-06'
+        df_flow: process_data.load_flow_frame 返回的 DataFrame
+        source_sha: 源文件哈希，同一文件重复入库会被跳过
+
+        返回:
+        是否实际写入
+        """
+        # 同名模板只保留第一行，与主键一致
+        df = df_flow.drop_duplicates(subset=['模板名称'])
+        minutes, valid = parse_duration_minutes(df['平均运行时长'])
+        # 两列在导出中是可选的（见 excel_schema.FLOW_SCHEMA），没有时按0入库
+        unfinished = df['未结束流程数'].fillna(0) if '未结束流程数' in df.columns else [0] * len(df)
+        overdue = df['超期未结束流程数'].fillna(0) if '超期未结束流程数' in df.columns else [0] * len(df)
+        rows = [
+            {
+                '模板名称': name,
+                '期间': period,
+                '发起流程数': int(initiated),
+                '完成流程数': int(completed),
+                '平均运行时长_分钟': float(m) if ok else None,
+                '未结束流程数': int(u),
+                '超期未结束流程数': int(o),
+            }
+            for name, initiated, completed, u, o, m, ok in zip(
+                df['模板名称'], df['发起流程数'], df['完成流程数'],
+                unfinished, overdue, minutes, valid)
+        ]
+        return self._ingest('flow', period, source_sha, rows, replace)
+
+    def ingest_personnel(self, period, df_personnel, source_sha, replace=False):
+        """
+        写入一期人员效率数据（df_personnel 为 load_personnel_data 返回的 DataFrame）
+        """
+        df = df_personnel.assign(部门名称=df_personnel['部门名称'].fillna('')) \
+            .drop_duplicates(subset=['人员名称', '部门名称'])
+        minutes, valid = parse_duration_minutes(df['平均处理时长'])
+        unit = df['单位名称'] if '单位名称' in df.columns else [None] * len(df)
+        overdue = df['超期处理数'].fillna(0) if '超期处理数' in df.columns else [0] * len(df)
+        rows = [
+            {
+                '人员名称': name,
+                '部门名称': department,
+                '期间': period,
+                '单位名称': None if pd.isna(u) else u,
+                '处理数': 0 if pd.isna(handled) else int(handled),
+                '平均处理时长_分钟': float(m) if ok else None,
+                '超期处理数': int(o),
+                '未处理流程数': 0 if pd.isna(unhandled) else int(unhandled),
+            }
+            for name, department, u, handled, m, ok, o, unhandled in zip(
+                df['人员名称'], df['部门名称'], unit, df['处理数'], minutes, valid,
+                overdue, df['未处理流程数'])
+        ]
+        return self._ingest('personnel', period, source_sha, rows, replace)
+
+    def deltas(self, kind, period):
+        """
+        计算某一期各模板/人员的环比和同比
+
+        返回:
+        记录列表，每个指标附带 上期值、去年同期值、环比、同比（比例，无法计算时为 None）
+        """
+        spec = KINDS[kind]
+        table = spec['table']
+        join = ' AND '.join(f'{{alias}}.{key} = cur.{key}' for key in spec['keys'])
+        select = [f'cur.{key}' for key in spec['keys']]
+        for metric in spec['metrics']:
+            select += [f'cur.{metric}', f'prev.{metric} AS "{metric}_上期"',
+                       f'last_year.{metric} AS "{metric}_去年同期"']
+
+        sql = (
+            f'SELECT {", ".join(select)} FROM {table} cur '
+            f'LEFT JOIN {table} prev ON {join.format(alias="prev")} AND prev.期间 = ? '
+            f'LEFT JOIN {table} last_year ON {join.format(alias="last_year")} AND last_year.期间 = ? '
+            f'WHERE cur.期间 = ?'
+        )
+        rows = self.conn.execute(sql, (shift_period(period, -1), shift_period(period, -12), period))
+
+        result = []
+        for row in rows:
+            record = dict(row)
+            for metric in spec['metrics']:
+                record[f'{metric}_环比'] = change_ratio(record[metric], record[f'{metric}_上期'])
+                record[f'{metric}_同比'] = change_ratio(record[metric], record[f'{metric}_去年同期'])
+            result.append(record)
+        return result
+
+    def trend(self, kind, **keys):
+        """
+        查询某个模板或人员的历史趋势，按期间排序
+        例如：trend('flow', 模板名称='用印申请')、trend('personnel', 人员名称='张三')
+        """
+        spec = KINDS[kind]
+        unknown = [key for key in keys if key not in spec['keys']]
+        if unknown:
+            raise ValueError(f"不支持按这些列查询: {', '.join(unknown)}")
+        where = ' AND '.join(f'{key} = ?' for key in keys) or '1 = 1'
+        rows = self.conn.execute(
+            f'SELECT * FROM {spec["table"]} WHERE {where} ORDER BY 期间', tuple(keys.values()))
+        return [dict(row) for row in rows]
+
+
+def ingest_files(store, period, flow_file=None, personnel_file=None, replace=False):
+    """读取导出文件并入库，返回 {数据类型: 是否实际写入}"""
+    # 延迟导入，只查询时不需要加载解析相关模块
+    import generate_personnel_rankings
+    import process_data
+
+    written = {}
+    if flow_file:
+        sha256, _ = source_fingerprint(flow_file)
+        df = cached_frame(flow_file, process_data.load_flow_frame, 'flow')
+        written['flow'] = store.ingest_flow(period, df, sha256, replace=replace)
+    if personnel_file:
+        sha256, _ = source_fingerprint(personnel_file)
+        df = generate_personnel_rankings.load_personnel_data(personnel_file)
+        written['personnel'] = store.ingest_personnel(period, df, sha256, replace=replace)
+    return written
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='多期历史数据存储')
+    parser.add_argument('--db', default='history.db', help='SQLite 数据库文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help='导入一期数据')
+    ingest.add_argument('--period', required=True, help='期间，如 2025-06')
+    ingest.add_argument('--flow-file', help='流程效率明细文件')
+    ingest.add_argument('--personnel-file', help='人员效率明细文件')
+    ingest.add_argument('--replace', action='store_true', help='覆盖该期间已入库的数据')
+
+    deltas = subparsers.add_parser('deltas', help='计算某一期的环比/同比')
+    deltas.add_argument('--period', required=True)
+    deltas.add_argument('--kind', choices=sorted(KINDS), default='flow')
+
+    trend = subparsers.add_parser('trend', help='查询模板或人员的历史趋势')
+    trend.add_argument('--template', help='模板名称')
+    trend.add_argument('--person', help='人员名称')
+
+    args = parser.parse_args(argv)
+
+    with HistoryStore(args.db) as store:
+        if args.command == 'ingest':
+            written = ingest_files(store, args.period, args.flow_file, args.personnel_file, args.replace)
+            for kind, done in written.items():
+                print(f"{kind} {args.period}: {'已入库' if done else '文件未变化，跳过'}")
+        elif args.command == 'deltas':
+            metric = KINDS[args.kind]['metrics'][0]
+            for record in store.deltas(args.kind, args.period):
+                name = ' / '.join(str(record[key]) for key in KINDS[args.kind]['keys'])
+                print(f"{name}: {metric} {record[metric]} "
+                      f"环比 {format_ratio(record[f'{metric}_环比'])} 同比 {format_ratio(record[f'{metric}_同比'])}")
+        elif args.command == 'trend':
+            if args.template:
+                rows = store.trend('flow', 模板名称=args.template)
+            elif args.person:
+                rows = store.trend('personnel', 人员名称=args.person)
+            else:
+                parser.error('trend 需要 --template 或 --person')
+            for row in rows:
+                print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+步骤计时和内存统计
+用 stage() 包住每个处理步骤（读取Excel、解析时长、生成排名、序列化等），记录：
+墙钟时间、CPU时间、进程峰值RSS、tracemalloc 峰值（可选）、输入/输出行数。
+每个步骤结束时写出一行 JSON（JSON lines），运行结束时可写出 Prometheus 文本文件
+（供 node exporter 的 textfile collector 采集）；--profile 时每个步骤单独输出 cProfile 统计。
+
+没有调用 configure() 时 stage() 不做任何记录，开销可以忽略，
+所以各模块可以直接在内部埋点，只有命令行打开相应选项时才会输出
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# Prometheus 指标名前缀
+METRIC_PREFIX = 'lcjx'
+
+# (指标名, 记录中的键, 说明, 同名步骤多次执行时的合并方式)
+PROMETHEUS_METRICS = [
+    ('stage_wall_seconds', 'wall_seconds', '步骤墙钟时间（秒）', sum),
+    ('stage_cpu_seconds', 'cpu_seconds', '步骤CPU时间（秒）', sum),
+    ('stage_rows_in', 'rows_in', '步骤输入行数', sum),
+    ('stage_rows_out', 'rows_out', '步骤输出行数', sum),
+    ('stage_max_rss_bytes', 'max_rss_bytes', '步骤结束时进程的峰值RSS（字节）', max),
+    ('stage_traced_peak_bytes', 'traced_peak_bytes', '步骤内 tracemalloc 峰值增量（字节）', max),
+    ('stage_runs', None, '步骤执行次数', len),
+]
+
+# 当前的记录器；None 时 stage() 不做任何记录
+_recorder = None
+
+
+def max_rss_bytes():
+    """进程启动以来的峰值RSS（字节），无法获取时返回 None"""
+    if resource is None:
+        return None
+    value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KB，macOS 上是字节
+    return value if sys.platform == 'darwin' else value * 1024
+
+
+def count_rows(value):
+    """结果的行数（记录数）：DataFrame、列表、数组取长度，字典取 data 部分，无法判断时返回 None"""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, dict):
+        for key in ['data', 'raw_data', 'personal_process_ranking']:
+            if key in value and hasattr(value[key], '__len__'):
+                return count_rows(value[key])
+        return None
+    if isinstance(value, (str, bytes)):
+        return None
+    return len(value) if hasattr(value, '__len__') else None
+
+
+def _label(value):
+    """Prometheus 标签值转义"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _slug(name):
+    """步骤名称用作文件名"""
+    return re.sub(r'[^\w.-]+', '_', name)
+
+
+class Recorder:
+    """
+    一次运行的步骤记录器
+
+    参数:
+    job: 任务名称（如 process_data），写入每条记录和 Prometheus 标签
+    metrics_file: JSON lines 输出路径（追加写入），'-' 表示标准错误
+    prometheus_file: Prometheus 文本文件路径，运行结束时整体替换
+    profile_dir: cProfile 统计输出目录，None 表示不采集
+    trace_memory: 是否用 tracemalloc 统计每个步骤的 Python 内存峰值（会明显拖慢运行）
+    """
+
+    def __init__(self, job, metrics_file=None, prometheus_file=None, profile_dir=None, trace_memory=False):
+        self.job = job
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.pid = os.getpid()
+        self.run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{self.pid}"
+        self.records = []
+        self.stack = []
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self.seq = 0
+
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        self.started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def emit(self, record):
+        """写出一行 JSON"""
+        if not self.metrics_file:
+            return
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        if self.metrics_file == '-':
+            sys.stderr.write(line)
+            sys.stderr.flush()
+            return
+        # 一次 write 写出整行，并行的子进程追加到同一文件时不会交错
+        with open(self.metrics_file, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def enter(self, name, rows_in, fields):
+        """步骤开始：记下起始计数；嵌套的步骤暂停上层步骤的 profile"""
+        self.seq += 1
+        parent = self.stack[-1] if self.stack else None
+        frame = {
+            'record': {
+                'job': self.job,
+                'run_id': self.run_id,
+                'pid': os.getpid(),
+                'seq': self.seq,
+                'stage': name,
+                'parent': parent['record']['stage'] if parent else None,
+                'started_at': datetime.now().isoformat(timespec='milliseconds'),
+                'rows_in': rows_in,
+                'rows_out': None,
+                **fields,
+            },
+            'wall': time.perf_counter(),
+            'cpu': time.process_time(),
+            'rss': max_rss_bytes(),
+            'profiler': None,
+        }
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # 重置峰值前把到目前为止的峰值记到上层步骤上
+            if parent is not None:
+                parent['traced_peak'] = max(parent['traced_peak'], peak)
+            tracemalloc.reset_peak()
+            frame['traced_start'] = current
+            frame['traced_peak'] = current
+
+        if self.profile_dir:
+            if parent is not None and parent['profiler'] is not None:
+                parent['profiler'].disable()
+            frame['profiler'] = cProfile.Profile()
+            frame['profiler'].enable()
+
+        self.stack.append(frame)
+        return frame['record']
+
+    def exit(self, error=None):
+        """步骤结束：计算各项指标并写出记录"""
+        frame = self.stack.pop()
+        parent = self.stack[-1] if self.stack else None
+        record = frame['record']
+
+        if frame['profiler'] is not None:
+            frame['profiler'].disable()
+            # 进程池中 fork 出的子进程沿用同一个 run_id 和序号，文件名再加上子进程号
+            worker = '' if record['pid'] == self.pid else f"-{record['pid']}"
+            path = os.path.join(self.profile_dir,
+                                f"{self.run_id}{worker}-{record['seq']:03d}-{_slug(record['stage'])}.prof")
+            frame['profiler'].dump_stats(path)
+            record['profile'] = path
+            if parent is not None and parent['profiler'] is not None:
+                parent['profiler'].enable()
+
+        record['wall_seconds'] = time.perf_counter() - frame['wall']
+        record['cpu_seconds'] = time.process_time() - frame['cpu']
+        rss = max_rss_bytes()
+        record['max_rss_bytes'] = rss
+        record['max_rss_growth_bytes'] = rss - frame['rss'] if rss is not None else None
+
+        if 'traced_start' in frame and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            frame['traced_peak'] = max(frame['traced_peak'], peak)
+            record['traced_peak_bytes'] = frame['traced_peak'] - frame['traced_start']
+            if parent is not None:
+                parent['traced_peak'] = max(parent['traced_peak'], frame['traced_peak'])
+
+        record['status'] = 'ok' if error is None else 'error'
+        if error is not None:
+            record['error'] = f'{type(error).__name__}: {error}'
+
+        self.records.append(record)
+        self.emit(record)
+
+    def prometheus_text(self, status='ok'):
+        """按步骤名称汇总本次运行的记录，生成 Prometheus 文本格式"""
+        by_stage = {}
+        for record in self.records:
+            by_stage.setdefault(record['stage'], []).append(record)
+
+        lines = []
+        for metric, key, help_text, combine in PROMETHEUS_METRICS:
+            name = f'{METRIC_PREFIX}_{metric}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for stage_name, records in by_stage.items():
+                if key is None:
+                    value = combine(records)
+                else:
+                    values = [r[key] for r in records if r.get(key) is not None]
+                    if not values:
+                        continue
+                    value = combine(values)
+                lines.append(f'{name}{{job="{_label(self.job)}",stage="{_label(stage_name)}"}} {value}')
+
+        job = f'{{job="{_label(self.job)}"}}'
+        lines += [
+            f'# HELP {METRIC_PREFIX}_run_wall_seconds 整次运行的墙钟时间（秒）',
+            f'# TYPE {METRIC_PREFIX}_run_wall_seconds gauge',
+            f'{METRIC_PREFIX}_run_wall_seconds{job} {time.perf_counter() - self.started}',
+            f'# HELP {METRIC_PREFIX}_run_success 最近一次运行是否成功',
+            f'# TYPE {METRIC_PREFIX}_run_success gauge',
+            f'{METRIC_PREFIX}_run_success{job} {1 if status == "ok" else 0}',
+            f'# HELP {METRIC_PREFIX}_run_timestamp_seconds 最近一次运行结束的时间',
+            f'# TYPE {METRIC_PREFIX}_run_timestamp_seconds gauge',
+            f'{METRIC_PREFIX}_run_timestamp_seconds{job} {time.time():.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, status='ok'):
+        """写出 Prometheus 文本文件（先写临时文件再改名，采集时不会读到一半的内容）"""
+        directory = os.path.dirname(os.path.abspath(self.prometheus_file))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.prometheus_file}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text(status))
+        os.replace(tmp_path, self.prometheus_file)
+
+    def finish(self, status=None):
+        """
+        运行结束：写出整次运行的汇总记录和 Prometheus 文件
+        status 未指定时，有顶层步骤出错即视为运行失败（出错后被调用方捕获的情况）
+        """
+        if status is None:
+            failed = any(r['status'] == 'error' and r['parent'] is None for r in self.records)
+            status = 'error' if failed else 'ok'
+        self.emit({
+            'job': self.job,
+            'run_id': self.run_id,
+            'pid': self.pid,
+            'stage': None,
+            'event': 'run',
+            'status': status,
+            'stages': len(self.records),
+            'wall_seconds': time.perf_counter() - self.started,
+            'cpu_seconds': time.process_time() - self.started_cpu,
+            'max_rss_bytes': max_rss_bytes(),
+        })
+        # fork 出的子进程继承了记录器，只由发起运行的进程写 Prometheus 文件
+        if self.prometheus_file and os.getpid() == self.pid:
+            self.write_prometheus(status)
+        if self.started_tracing:
+            tracemalloc.stop()
+
+
+def configure(job, metrics_file=None, prometheus_file=None, profile_dir=None, trace_memory=False):
+    """
+    开始记录；四个选项都未设置时不记录（stage() 保持空操作）
+
+    返回:
+    Recorder，或 None
+    """
+    global _recorder
+    if not (metrics_file or prometheus_file or profile_dir or trace_memory):
+        _recorder = None
+        return None
+    _recorder = Recorder(job, metrics_file, prometheus_file, profile_dir, trace_memory)
+    return _recorder
+
+
+def finish(status=None):
+    """结束记录并写出汇总（status 见 Recorder.finish）"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.finish(status)
+    return recorder
+
+
+@contextmanager
+def stage(name, rows_in=None, **fields):
+    """
+    记录一个步骤
+
+    用法:
+    with stage('load_flow', rows_in=n) as record:
+        df = ...
+        record['rows_out'] = len(df)
+
+    fields 中的额外字段会原样写入记录；未开始记录时 record 是一个不会被使用的字典
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield {}
+        return
+
+    record = recorder.enter(name, rows_in, fields)
+    try:
+        yield record
+    except BaseException as e:
+        recorder.exit(e)
+        raise
+    recorder.exit()
+
+
+def instrumented(name=None):
+    """
+    装饰器形式的 stage()：输出行数由返回值自动统计（见 count_rows）
+
+    用法:
+    @instrumented('flow_rankings')
+    def build_flow_rankings(...): ...
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = count_rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def add_arguments(parser):
+    """为命令行加入 --metrics / --prometheus / --profile / --trace-memory 选项"""
+    group = parser.add_argument_group('性能记录')
+    group.add_argument('--metrics', metavar='FILE',
+                       help='逐个步骤追加写出耗时和内存（JSON lines），- 表示输出到标准错误')
+    group.add_argument('--prometheus', metavar='FILE',
+                       help='运行结束时写出 Prometheus 文本文件（node exporter textfile collector）')
+    group.add_argument('--profile', metavar='DIR',
+                       help='每个步骤单独输出 cProfile 统计（.prof 文件）到该目录')
+    group.add_argument('--trace-memory', action='store_true',
+                       help='用 tracemalloc 统计每个步骤的内存峰值（运行会变慢）')
+    return parser
+
+
+@contextmanager
+def recording(args, job):
+    """
+    按命令行选项开始记录，退出时写出汇总；未打开任何选项时什么也不做
+
+    用法:
+    with recording(args, 'process_data'):
+        raise SystemExit(main())
+
+    以非0退出码退出时记为运行失败
+    """
+    configure(job, args.metrics, args.prometheus, args.profile, args.trace_memory)
+    try:
+        yield _recorder
+    except SystemExit as e:
+        finish('ok' if e.code in (0, None) else 'error')
+        raise
+    except BaseException:
+        finish('error')
+        raise
+    finish()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一命令行入口
+各子命令的模块在执行该子命令时才导入：只列工作表名称（sheets）不会加载 pandas/NumPy，
+其他子命令也只导入自己用到的模块。
+常驻进程（worker_daemon）在运行时，可转交的子命令直接交给它执行，省去解释器启动和导入时间；
+常驻进程没有运行时在本进程执行，结果相同。
+
+用法:
+python lcjx.py sheets 基本信息.xlsx
+python lcjx.py pipeline --data-dir <数据目录>
+python lcjx.py daemon start --data-dir <数据目录>    # 另开一个进程常驻
+"""
+
+import argparse
+import importlib
+import os
+
+# 子命令 -> (模块, 入口函数, 说明)；入口函数接受 argv 列表，返回退出码
+COMMANDS = {
+    'sheets': ('excel_sheets', 'main', '列出工作簿中的工作表名称（不加载 pandas）'),
+    'pipeline': ('pipeline', 'main', '生成完整的 chart_data.json'),
+    'process': ('process_data', 'cli', '生成流程排名数据（process_data.py）'),
+    'personnel': ('generate_personnel_rankings', 'cli', '生成人员排名数据（generate_personnel_rankings.py）'),
+    'refresh': ('diff_refresh', 'main', '增量刷新 chart_data.json 并生成增量文件'),
+    'history': ('history_store', 'main', '多期历史数据的导入和查询'),
+    'batch': ('batch_runner', 'main', '按清单为多个业务单元/期间批量生成'),
+    'query': ('query_engine', 'main', '用 SQL 交互查询流程和人员数据'),
+    'serve': ('ranking_server', 'main', '启动本地排名服务'),
+    'daemon': ('worker_daemon', 'main', '启动/停止常驻工作进程'),
+}
+
+# 可以转交给常驻进程执行的子命令（sheets 本身就很快；query 需要交互输入；serve、daemon 是常驻服务）
+DAEMON_COMMANDS = ['pipeline', 'process', 'personnel', 'refresh', 'history', 'batch']
+
+# 常驻进程启动时预先导入的子命令模块
+WARM_COMMANDS = DAEMON_COMMANDS
+
+
+def run_local(argv):
+    """在本进程中执行子命令：argv[0] 为子命令，其余为它的参数"""
+    module_name, function_name, _ = COMMANDS[argv[0]]
+    function = getattr(importlib.import_module(module_name), function_name)
+    code = function(argv[1:])
+    return 0 if code is None else code
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='营销平台流程绩效分析平台命令行',
+        epilog='\n'.join(f'  {name:<10} {description}' for name, (_, _, description) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--socket', help='常驻进程的 socket 路径（默认 $LCJX_SOCKET 或运行时目录下的 lcjx-<uid>.sock）')
+    parser.add_argument('--no-daemon', action='store_true', help='不使用常驻进程，始终在本进程执行')
+    parser.add_argument('command', choices=sorted(COMMANDS), metavar='command', help='子命令，见下方列表')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='子命令的参数')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    command = [args.command] + args.args
+
+    use_daemon = (args.command in DAEMON_COMMANDS and not args.no_daemon
+                  and not os.environ.get('LCJX_NO_DAEMON'))
+    if use_daemon and hasattr(os, 'getuid'):
+        # 只导入标准库，连接不上时返回 None
+        import worker_daemon
+        code = worker_daemon.request(command, args.socket)
+        if code is not None:
+            return code
+
+    return run_local(command)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员姓名规范化和索引
+两份表格中的姓名写法不完全一致（全角空格、全角字母、夹在中间的空格、零宽字符等），
+直接比较字符串会漏掉匹配。这里先把姓名规范化（NFKC + 去除所有空白），
+可选地按别名表换成标准姓名，再建立 规范化姓名 -> 行号 的哈希索引；
+各负责人排名用同一份行号数组取数，不再各自 isin 过滤并复制整张表
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from excel_ingest import read_sheet, sheet_names
+
+# 基本信息.xlsx 中可选的别名表：第一列为别名，第二列为标准姓名
+ALIAS_SHEET = '姓名别名'
+
+# 空白字符（NFKC 之后全角空格已变为普通空格）和零宽字符
+_SPACES = re.compile(r'[\s\u200b\u200c\u200d\u2060\ufeff]+')
+
+
+def normalize_name(name):
+    """规范化单个姓名；空值返回 None"""
+    if name is None or (not isinstance(name, str) and pd.isna(name)):
+        return None
+    text = _SPACES.sub('', unicodedata.normalize('NFKC', str(name)))
+    return text or None
+
+
+def normalize_names(values):
+    """按列规范化姓名（向量化），返回 object 类型的 Series"""
+    series = pd.Series(values, copy=False).astype('object')
+    text = series.where(series.isna(), series.astype(str))
+    text = text.str.normalize('NFKC').str.replace(_SPACES, '', regex=True)
+    return text.where(text != '', None)
+
+
+def load_name_aliases(file_path):
+    """
+    读取基本信息.xlsx 中的别名表，返回 {规范化别名: 规范化标准姓名}
+    工作簿中没有别名表时返回空字典
+    """
+    if ALIAS_SHEET not in sheet_names(file_path):
+        return {}
+    df = read_sheet(file_path, ALIAS_SHEET, header=None)
+    aliases = {}
+    for alias, name in zip(df.iloc[:, 0], df.iloc[:, 1]):
+        alias, name = normalize_name(alias), normalize_name(name)
+        if alias and name and alias != name:
+            aliases[alias] = name
+    return aliases
+
+
+class NameIndex:
+    """
+    规范化姓名 -> 行号 的索引
+
+    参数:
+    names: 每行的姓名（如人员效率明细的 人员名称 列）
+    aliases: {别名: 标准姓名}，两边都会先规范化
+    """
+
+    def __init__(self, names, aliases=None):
+        self.aliases = {normalize_name(alias): normalize_name(name) for alias, name in (aliases or {}).items()}
+        normalized = normalize_names(names)
+        if self.aliases:
+            normalized = normalized.map(lambda name: self.aliases.get(name, name))
+
+        codes, uniques = pd.factorize(normalized, use_na_sentinel=True)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self.rows = {name: order[bounds[i]:bounds[i + 1]] for i, name in enumerate(uniques)}
+        self.size = len(codes)
+
+    def canonical(self, name):
+        """姓名的规范写法（经过别名换算）"""
+        name = normalize_name(name)
+        return self.aliases.get(name, name)
+
+    def lookup(self, names):
+        """
+        取一组姓名对应的行号，按行号从小到大排列（与原表顺序一致）
+
+        返回:
+        (行号数组, 没有匹配到的姓名列表)
+        """
+        found = []
+        missing = []
+        seen = set()
+        for name in names:
+            key = self.canonical(name)
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            if key in self.rows:
+                found.append(self.rows[key])
+            else:
+                missing.append(name)
+        rows = np.sort(np.concatenate(found)) if found else np.empty(0, dtype='int64')
+        return rows, missing
+
+    def mask(self, names):
+        """一组姓名对应的布尔数组"""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.lookup(names)[0]] = True
+        return mask
+
+
+def main_person_rows(df_personnel, main_persons, aliases=None):
+    """
+    主要负责人在人员效率明细中的行号数组
+
+    参数:
+    df_personnel: load_personnel_data 的结果
+    main_persons: 主要负责人姓名列表
+    aliases: 可选的别名表
+    """
+    rows, _ = NameIndex(df_personnel['人员名称'], aliases).lookup(main_persons)
+    return rows
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+超期分析
+流程效率明细和人员效率明细中的超期相关列（超期结束比例、平均超期时长、超期未结束流程数、
+超期处理数、超期处理比例）以前只是原样读入。这里把百分比文本和时长文本整列解析为数值数组
+（每个不同的文本只解析一次），再基于同一组数组一次算出：
+- 模板超期排名：按超期结束流程数、超期结束比例排序
+- 人员超期排名：按超期处理数、超期处理比例排序
+- 积压风险排名：按 超期未结束占比 和 未结束流程数（对数刻度）加权得到的风险分排序
+排名记录按列构建（serialization.build_records），不逐行 apply
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from duration_parser import parse_duration_minutes
+from ranking import top_k_indices
+from serialization import COUNT, LABEL, NUMBER, TEXT, build_records
+
+# 百分比文本（先做 NFKC，全角数字和全角百分号统一为半角）："12%"、"+8.5%"、"-3%"；
+# 不带百分号的数字视为比例本身（单元格为百分比格式的数值时读出 0.12）
+PERCENT_PATTERN = re.compile(r'^\s*(?P<value>[+-]?\d+(?:\.\d+)?)\s*(?P<percent>%)?\s*$')
+
+# 积压风险分的权重：两项都换算到 0-1 后加权求和，再换算为 0-100 分
+# - 超期未结束占比：超期未结束流程数 / 未结束流程数
+# - 未结束流程数：按对数刻度换算，达到 BACKLOG_OPEN_SCALE 时记满
+# 只用本行的数据计算，不随表中其他行变化
+BACKLOG_RISK_WEIGHTS = {
+    '超期未结束占比': 0.6,
+    '未结束流程数': 0.4,
+}
+
+# 未结束流程数项记满分的数量
+BACKLOG_OPEN_SCALE = 10000
+
+# 排名记录的字段：(输出键名, 列名, 输出方式)，源文件中没有的列不输出
+TEMPLATE_OVERDUE_FIELDS = [
+    ('模板名称', '模板名称', TEXT),
+    ('完成流程数', '完成流程数', COUNT),
+    ('超期结束流程数', '超期结束流程数', COUNT),
+    ('超期结束比例', '超期结束比例', LABEL),
+    ('超期结束比例_数值', '超期结束比例_数值', NUMBER),
+    ('平均超期时长', '平均超期时长', LABEL),
+    ('平均超期时长_分钟', '平均超期时长_分钟', NUMBER),
+]
+
+BACKLOG_RISK_FIELDS = [
+    ('模板名称', '模板名称', TEXT),
+    ('未结束流程数', '未结束流程数', COUNT),
+    ('超期未结束流程数', '超期未结束流程数', COUNT),
+    ('超期未结束占比', '超期未结束占比', NUMBER),
+    ('积压风险分', '积压风险分', NUMBER),
+]
+
+PERSON_OVERDUE_FIELDS = [
+    ('人员名称', '人员名称', TEXT),
+    ('部门名称', '部门名称', LABEL),
+    ('单位名称', '单位名称', LABEL),
+    ('处理数', '处理数', COUNT),
+    ('超期处理数', '超期处理数', COUNT),
+    ('超期处理比例', '超期处理比例', LABEL),
+    ('超期处理比例_数值', '超期处理比例_数值', NUMBER),
+    ('平均超期时长', '平均超期时长', LABEL),
+    ('平均超期时长_分钟', '平均超期时长_分钟', NUMBER),
+]
+
+# 写入 chart_data.json 顶层的表
+OUTPUT_KEYS = ['template_overdue_ranking', 'backlog_risk_ranking', 'person_overdue_ranking']
+
+
+def parse_percent(values):
+    """
+    整列解析百分比文本
+
+    参数:
+    values: 百分比列（Series、列表或数组），空值、"-"等无法解析的视为无效
+
+    返回:
+    (ratios, valid) - float64 比例数组（"12%" -> 0.12，无效位置为 0.0）和布尔有效性掩码
+    """
+    series = pd.Series(values, dtype='object')
+    if len(series) == 0:
+        return np.empty(0, dtype='float64'), np.empty(0, dtype=bool)
+
+    # 先去重，每个不同的文本只解析一次
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    literals = pd.Series([str(value) for value in uniques], dtype='object').str.normalize('NFKC')
+    parts = literals.str.extract(PERCENT_PATTERN)
+    numbers = pd.to_numeric(parts['value'], errors='coerce').to_numpy(dtype='float64')
+    numbers = np.where(parts['percent'].notna().to_numpy(), numbers / 100, numbers)
+
+    # 空值（code = -1）映射到末尾追加的 NaN 上
+    ratios = np.append(numbers, np.nan)[codes]
+    valid = ~np.isnan(ratios)
+    ratios[~valid] = 0.0
+    return ratios, valid
+
+
+def _counts(df, column):
+    """计数列的 float64 数组，缺失值和缺失的列按0处理"""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype='float64')
+    return pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype='float64')
+
+
+def _text(df, column):
+    """文本列；源文件中没有这一列时返回全为空的列"""
+    if column not in df.columns:
+        return pd.Series([None] * len(df), dtype='object')
+    return df[column]
+
+
+def _ratio(df, column, numerator, denominator):
+    """解析比例列；比例列缺失或无法解析的行按 分子 / 分母 计算（分母为0时为 NaN）"""
+    ratios, valid = parse_percent(_text(df, column))
+    derived = np.divide(numerator, denominator, out=np.full(len(df), np.nan), where=denominator > 0)
+    return np.where(valid, ratios, derived)
+
+
+def _minutes(df, column):
+    """解析时长列为分钟数，无效位置为 NaN"""
+    minutes, valid = parse_duration_minutes(_text(df, column))
+    return np.where(valid, minutes, np.nan)
+
+
+def backlog_risk_scores(open_counts, overdue_open_counts, weights=None):
+    """
+    积压风险分（0-100）
+
+    参数:
+    open_counts: 未结束流程数数组
+    overdue_open_counts: 超期未结束流程数数组
+    weights: {项: 权重}，默认 BACKLOG_RISK_WEIGHTS
+
+    没有未结束流程的行为 0 分
+    """
+    weights = BACKLOG_RISK_WEIGHTS if weights is None else weights
+    terms = {
+        '超期未结束占比': np.divide(overdue_open_counts, open_counts, out=np.zeros(len(open_counts)),
+                                    where=open_counts > 0),
+        '未结束流程数': np.minimum(np.log1p(open_counts) / np.log1p(BACKLOG_OPEN_SCALE), 1.0),
+    }
+    score = np.zeros(len(open_counts), dtype='float64')
+    for term, weight in weights.items():
+        score += weight * terms[term]
+    return np.round(score * 100, 1)
+
+
+def flow_overdue_arrays(df_flow):
+    """流程效率明细中与超期相关的各列，一次解析为数值数组"""
+    finished = _counts(df_flow, '完成流程数')
+    overdue = _counts(df_flow, '超期结束流程数')
+    open_counts = _counts(df_flow, '未结束流程数')
+    overdue_open = _counts(df_flow, '超期未结束流程数')
+    return {
+        '超期结束流程数_计数': overdue,
+        '超期结束比例_数值': _ratio(df_flow, '超期结束比例', overdue, finished),
+        '平均超期时长_分钟': _minutes(df_flow, '平均超期时长'),
+        '超期未结束流程数_计数': overdue_open,
+        '超期未结束占比': np.divide(overdue_open, open_counts, out=np.full(len(df_flow), np.nan),
+                                    where=open_counts > 0),
+        '积压风险分': backlog_risk_scores(open_counts, overdue_open),
+    }
+
+
+def personnel_overdue_arrays(df_personnel):
+    """人员效率明细中与超期相关的各列，一次解析为数值数组"""
+    handled = _counts(df_personnel, '处理数')
+    overdue = _counts(df_personnel, '超期处理数')
+    return {
+        '超期处理数_计数': overdue,
+        '超期处理比例_数值': _ratio(df_personnel, '超期处理比例', overdue, handled),
+        '平均超期时长_分钟': _minutes(df_personnel, '平均超期时长'),
+    }
+
+
+def _records(df, arrays, rows, fields):
+    """取出排名所在的行，附上解析出的数值列，按列构建记录"""
+    frame = df.iloc[rows].assign(**{name: values[rows] for name, values in arrays.items()})
+    return build_records(frame, [field for field in fields if field[1] in frame.columns])
+
+
+def template_overdue_analytics(df_flow, k=10):
+    """
+    模板超期排名和积压风险排名
+
+    参数:
+    df_flow: 流程效率明细（process_data.load_flow_frame 的结果）
+    k: 取前几名，None 表示全部
+
+    返回:
+    {'template_overdue_ranking': [...], 'backlog_risk_ranking': [...]}
+    """
+    arrays = flow_overdue_arrays(df_flow)
+    overdue = arrays['超期结束流程数_计数']
+    overdue_rows = top_k_indices([overdue, arrays['超期结束比例_数值']], k, mask=overdue > 0)
+
+    risk = arrays['积压风险分']
+    risk_rows = top_k_indices([risk, arrays['超期未结束流程数_计数']], k, mask=risk > 0)
+
+    return {
+        'template_overdue_ranking': _records(df_flow, arrays, overdue_rows, TEMPLATE_OVERDUE_FIELDS),
+        'backlog_risk_ranking': _records(df_flow, arrays, risk_rows, BACKLOG_RISK_FIELDS),
+    }
+
+
+def person_overdue_analytics(df_personnel, k=20):
+    """
+    人员超期排名
+
+    参数:
+    df_personnel: 人员效率明细（generate_personnel_rankings.load_personnel_data 的结果）
+    k: 取前几名，None 表示全部
+
+    返回:
+    {'person_overdue_ranking': [...]}
+    """
+    arrays = personnel_overdue_arrays(df_personnel)
+    overdue = arrays['超期处理数_计数']
+    rows = top_k_indices([overdue, arrays['超期处理比例_数值']], k, mask=overdue > 0)
+    return {'person_overdue_ranking': _records(df_personnel, arrays, rows, PERSON_OVERDUE_FIELDS)}
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行读取模块
+xlrd/openpyxl 解析工作簿是纯 CPU 计算，互不相关的工作簿放进进程池同时解析，
+结果（类型化的 DataFrame / 列表）经 pickle 传回主进程；
+进程池不可用（如受限环境不能创建子进程）或只有一个任务时退回串行执行
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def default_workers():
+    """默认进程数：CPU 核数，至少为1"""
+    return max(1, os.cpu_count() or 1)
+
+
+def run_serial(jobs):
+    """
+    串行执行任务
+
+    参数:
+    jobs: {任务名: (函数, 参数元组)}
+
+    返回:
+    {任务名: 结果}
+    """
+    return {name: func(*args) for name, (func, args) in jobs.items()}
+
+
+def run_jobs(jobs, workers=None):
+    """
+    在进程池中并行执行任务，函数和参数必须能被 pickle（模块级函数）
+
+    参数:
+    jobs: {任务名: (函数, 参数元组)}
+    workers: 进程数，None 为 CPU 核数；<= 1 时串行执行
+
+    返回:
+    {任务名: 结果}；任一任务出错时抛出该任务的异常
+    """
+    workers = default_workers() if workers is None else workers
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return run_serial(jobs)
+
+    # 只有创建进程池、启动子进程时的错误才退回串行；任务本身抛出的异常（包括读取文件的 OSError）原样抛出
+    pool = None
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = {name: pool.submit(func, *args) for name, (func, args) in jobs.items()}
+    except (OSError, NotImplementedError) as e:
+        # 无法使用子进程时退回串行
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        print(f"进程池不可用，改为串行读取: {e}")
+        return run_serial(jobs)
+
+    with pool:
+        try:
+            return {name: future.result() for name, future in futures.items()}
+        except BrokenProcessPool as e:
+            # 工作进程异常退出（如被系统终止）
+            print(f"进程池异常退出，改为串行读取: {e}")
+    return run_serial(jobs)
+
+
+def load_many(loader, sources, workers=None):
+    """
+    用同一个读取函数并行读取多个文件（如各业务单元的导出）
+
+    返回:
+    {文件路径: 结果}，顺序与 sources 一致
+    """
+    return run_jobs({source: (loader, (source,)) for source in sources}, workers=workers)
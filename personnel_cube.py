@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员效率汇总立方体（单位 → 部门 → 人员）
+载入人员效率明细后一次性算好各层级的人数、各指标的合计和平均值，
+单位、部门用分类编码存储，指标存成 NumPy 数组；
+各层级、各指标的排序在第一次查询时计算并缓存，之后取前K名只需截取排好序的下标
+"""
+
+import numpy as np
+import pandas as pd
+
+from duration_parser import parse_duration_minutes
+
+# 层级（由粗到细）
+LEVELS = ['unit', 'department', 'person']
+
+LEVEL_NAMES = {'unit': '单位', 'department': '部门', 'person': '人员'}
+
+# 汇总的指标：人员效率明细中的列（平均处理时长解析为分钟数）
+MEASURES = ['处理数', '处理时长_分钟', '超期处理数', '未处理流程数']
+
+# 缺少单位名称或部门名称时使用的名称
+UNKNOWN = '未知'
+
+
+def _codes(values):
+    """文字列 -> (分类编码, 分类取值)，缺失值归入 UNKNOWN"""
+    codes, uniques = pd.factorize(values.fillna(UNKNOWN), sort=False)
+    return codes.astype('int32'), list(uniques)
+
+
+class PersonnelCube:
+    """
+    人员效率汇总立方体
+
+    每个层级保存：
+    keys: 各分组的名称（单位名称 / (单位名称, 部门名称) / 人员所在行）
+    parent: 各分组所属上一层级分组的编号（单位层级为 -1）
+    人数、时长有效数: 各分组的人数和有有效处理时长的人数
+    sums[指标]、means[指标]: 各分组指标的合计和平均值（处理时长只对有效时长求平均）
+    """
+
+    def __init__(self, df):
+        count = len(df)
+        units = df['单位名称'] if '单位名称' in df.columns else pd.Series([UNKNOWN] * count, index=df.index)
+        unit_codes, unit_names = _codes(units)
+        department_codes, department_keys = _codes(
+            pd.Series(list(zip(units.fillna(UNKNOWN), df['部门名称'].fillna(UNKNOWN))), index=df.index))
+
+        minutes, valid = parse_duration_minutes(df['平均处理时长'])
+        values = {
+            '处理数': df['处理数'].fillna(0).to_numpy(dtype='float64'),
+            '处理时长_分钟': np.where(valid, minutes, 0.0),
+            '超期处理数': (df['超期处理数'].fillna(0).to_numpy(dtype='float64')
+                       if '超期处理数' in df.columns else np.zeros(count)),
+            '未处理流程数': df['未处理流程数'].fillna(0).to_numpy(dtype='float64'),
+        }
+        valid = valid.astype('float64')
+
+        # 每个部门所属的单位
+        department_unit = np.full(len(department_keys), -1, dtype='int32')
+        department_unit[department_codes] = unit_codes
+
+        self.names = {
+            'unit': unit_names,
+            'department': [department[1] for department in department_keys],
+            'person': df['人员名称'].tolist(),
+        }
+        self.units_of_department = [department[0] for department in department_keys]
+        self.parent = {
+            'unit': np.full(len(unit_names), -1, dtype='int32'),
+            'department': department_unit,
+            'person': department_codes,
+        }
+
+        self.levels = {}
+        for level, codes, size in [('unit', unit_codes, len(unit_names)),
+                                   ('department', department_codes, len(department_keys)),
+                                   ('person', np.arange(count, dtype='int32'), count)]:
+            people = np.bincount(codes, minlength=size).astype('float64')
+            valid_people = np.bincount(codes, weights=valid, minlength=size)
+            sums = {name: np.bincount(codes, weights=column, minlength=size) for name, column in values.items()}
+            means = {}
+            for name, total in sums.items():
+                divisor = valid_people if name == '处理时长_分钟' else people
+                means[name] = np.divide(total, divisor, out=np.zeros(size), where=divisor > 0)
+            self.levels[level] = {'人数': people, '时长有效数': valid_people, 'sums': sums, 'means': means}
+
+        # (层级, 指标, 统计方式, 是否升序) -> 排好序的分组编号
+        self._orders = {}
+
+    def metric_values(self, level, measure, stat='sum'):
+        """取某层级某指标的数组，stat 为 'sum'、'mean' 或 'count'（人数）"""
+        data = self.levels[level]
+        if stat == 'count':
+            return data['人数']
+        if measure not in MEASURES:
+            raise KeyError(f"未知的指标: {measure}")
+        if stat == 'sum':
+            return data['sums'][measure]
+        if stat == 'mean':
+            return data['means'][measure]
+        raise KeyError(f"未知的统计方式: {stat}")
+
+    def _order(self, level, measure, stat, ascending=False):
+        key = (level, measure, stat, ascending)
+        if key not in self._orders:
+            values = self.metric_values(level, measure, stat)
+            # 稳定排序：取值相同时保持原有先后顺序（升序不能直接倒转降序的结果，否则并列的分组顺序会反过来）
+            self._orders[key] = np.argsort(values if ascending else -values, kind='stable')
+        return self._orders[key]
+
+    def _record(self, level, i):
+        data = self.levels[level]
+        record = {'名称': self.names[level][i], '人数': int(data['人数'][i])}
+        if level == 'department':
+            record['单位名称'] = self.units_of_department[i]
+        elif level == 'person':
+            department = self.parent['person'][i]
+            record['部门名称'] = self.names['department'][department]
+            record['单位名称'] = self.units_of_department[department]
+        for name in MEASURES:
+            record[f'{name}_合计'] = round(float(data['sums'][name][i]), 2)
+            record[f'{name}_平均'] = round(float(data['means'][name][i]), 2)
+        return record
+
+    def top_k(self, level, measure='处理数', stat='sum', k=10, ascending=False, unit=None, department=None):
+        """
+        取某层级按某指标排序的前K名
+
+        参数:
+        level: 'unit' / 'department' / 'person'
+        measure: 指标，见 MEASURES
+        stat: 'sum' / 'mean' / 'count'
+        k: 取前几名，0 表示全部
+        ascending: 是否从小到大排
+        unit / department: 只看某个单位 / 部门下的分组
+
+        返回:
+        记录列表，带 '排名'
+        """
+        if level not in self.levels:
+            raise KeyError(f"未知的层级: {level}")
+        order = self._order(level, measure, stat, ascending)
+
+        if unit is not None or department is not None:
+            mask = np.ones(len(order), dtype=bool)
+            if unit is not None:
+                mask &= self._unit_mask(level, unit)[order]
+            if department is not None:
+                if level == 'unit':
+                    raise ValueError("单位层级不能按部门过滤")
+                names = np.array(self.names['department'], dtype=object)
+                department_mask = names == department
+                if level == 'person':
+                    department_mask = department_mask[self.parent['person']]
+                mask &= department_mask[order]
+            order = order[mask]
+
+        selected = order if k == 0 else order[:k]
+        return [{'排名': rank, **self._record(level, int(i))} for rank, i in enumerate(selected, 1)]
+
+    def _unit_mask(self, level, unit):
+        unit_mask = np.array([name == unit for name in self.names['unit']], dtype=bool)
+        if level == 'unit':
+            return unit_mask
+        department_mask = unit_mask[self.parent['department']]
+        if level == 'department':
+            return department_mask
+        return department_mask[self.parent['person']]
+
+
+def build_personnel_cube(df_personnel):
+    """由 load_personnel_data 的结果构建汇总立方体"""
+    return PersonnelCube(df_personnel)
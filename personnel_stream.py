@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员效率明细流式读取模块
+按行分块读取超大的人员效率导出，每块转成紧凑的类型化列
+（部门名称/单位名称用 category，计数用 int32，时长用 float32），
+边读边更新各排名的前K名和汇总统计。
+.xlsx 逐行读取，整张表不会一次性载入内存；.xls（xlrd）只能整张工作表载入后再逐行转换，
+省下的是 DataFrame 的内存，原始单元格仍全部在内存中
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from duration_parser import parse_duration_minutes
+from excel_sheets import is_xlsx
+from excel_schema import HEADER_SCAN_ROWS, PERSONNEL_SCHEMA, check_required, find_header_row
+from name_index import normalize_name, normalize_names
+from ranking import top_k_indices
+
+# 每块的行数
+DEFAULT_CHUNK_SIZE = 50000
+
+# 流式模式下使用的列
+TEXT_COLUMNS = ['人员名称', '平均处理时长']
+CATEGORY_COLUMNS = ['部门名称', '单位名称']
+COUNT_COLUMNS = ['处理数', '超期处理数', '未处理流程数', '超期未处理流程数']
+
+# 排名取前几名，与 generate_personnel_rankings 中的排名一致
+PERSONAL_TOP_K = 20
+MAIN_PERSON_TOP_K = 15
+
+
+def iter_sheet_rows(file_path, sheet_index=0):
+    """
+    逐行读取工作表，返回每行单元格值的元组
+    格式按文件内容判断（见 excel_sheets.is_xlsx），与扩展名无关：
+    .xlsx 使用 openpyxl 只读模式流式读取；.xls 由 xlrd 整张工作表载入后逐行取值（xlrd 不支持流式读取）
+    """
+    if not is_xlsx(file_path):
+        import xlrd
+        book = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet = book.sheet_by_index(sheet_index)
+            for row_index in range(sheet.nrows):
+                yield tuple(sheet.row_values(row_index))
+        finally:
+            book.release_resources()
+    else:
+        import openpyxl
+        # 传文件对象而不是路径：openpyxl 按扩展名拒绝 .xls 文件名
+        with open(file_path, 'rb') as f:
+            book = openpyxl.load_workbook(f, read_only=True, data_only=True)
+            try:
+                sheet = book.worksheets[sheet_index]
+                for row in sheet.iter_rows(values_only=True):
+                    yield row
+            finally:
+                book.close()
+
+
+def _to_chunk(rows, positions):
+    """把一批原始行转成类型化的 DataFrame"""
+    columns = {}
+    for name in TEXT_COLUMNS + CATEGORY_COLUMNS + COUNT_COLUMNS:
+        if name not in positions:
+            continue
+        position = positions[name]
+        columns[name] = [row[position] if position < len(row) else None for row in rows]
+
+    chunk = pd.DataFrame(columns)
+    for name in TEXT_COLUMNS:
+        if name in chunk.columns:
+            chunk[name] = chunk[name].map(lambda v: None if v is None or v == '' else str(v).strip())
+    for name in CATEGORY_COLUMNS:
+        if name in chunk.columns:
+            chunk[name] = chunk[name].astype('category')
+    for name in COUNT_COLUMNS:
+        if name in chunk.columns:
+            chunk[name] = pd.to_numeric(chunk[name], errors='coerce').fillna(0).astype('int32')
+
+    # 清理数据：去掉空行和合计行
+    chunk = chunk[chunk['人员名称'].notna() & (chunk['人员名称'] != '合计')].reset_index(drop=True)
+
+    minutes, valid = parse_duration_minutes(chunk['平均处理时长'])
+    chunk['处理时长_分钟'] = minutes.astype('float32')
+    chunk['处理时长_有效'] = valid
+    return chunk
+
+
+def iter_personnel_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    分块读取人员效率明细
+
+    参数:
+    file_path: 人员效率明细文件路径（.xls 或 .xlsx）
+    chunk_size: 每块的行数
+
+    返回:
+    逐块产出类型化的 DataFrame
+    """
+    rows = iter_sheet_rows(file_path)
+
+    # 先读表头区域，按表头文字找到各字段的列位置
+    header_rows = []
+    for row in rows:
+        header_rows.append(row)
+        if len(header_rows) >= HEADER_SCAN_ROWS:
+            break
+    header_row, positions = find_header_row(pd.DataFrame(header_rows), PERSONNEL_SCHEMA)
+    check_required(positions, PERSONNEL_SCHEMA)
+
+    # 表头区域中表头之后的行已经是数据
+    batch = list(header_rows[header_row + 1:])
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield _to_chunk(batch, positions)
+            batch = []
+    if batch:
+        yield _to_chunk(batch, positions)
+
+
+class RunningTopK:
+    """
+    维护前K名的小顶堆；取值相同时先出现的行排在前面
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+        self.seq = 0
+
+    def push(self, value, record):
+        # 堆顶是当前最"弱"的记录：值最小、同值中最晚出现
+        entry = (value, -self.seq, record)
+        self.seq += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def threshold(self):
+        """堆满后新记录至少要达到的值"""
+        return self.heap[0][0] if len(self.heap) >= self.k else None
+
+    def items(self):
+        """按名次返回记录"""
+        return [entry[2] for entry in sorted(self.heap, key=lambda e: (-e[0], -e[1]))]
+
+
+class PersonnelStreamAggregator:
+    """
+    边读边计算人员排名和汇总统计
+    """
+
+    def __init__(self, main_persons=(), personal_k=PERSONAL_TOP_K, main_k=MAIN_PERSON_TOP_K, aliases=None):
+        # 姓名规范化后再比较（见 name_index），别名换算为标准姓名
+        self.aliases = {normalize_name(alias): normalize_name(name) for alias, name in (aliases or {}).items()}
+        self.main_persons = {self.aliases.get(normalize_name(name), normalize_name(name)) for name in main_persons}
+        self.personal = RunningTopK(personal_k)
+        self.main_process = RunningTopK(main_k)
+        self.main_duration = RunningTopK(main_k)
+        self.totals = {'人员数': 0, '处理数': 0, '未处理流程数': 0, '超期处理数': 0}
+        # (单位名称, 部门名称) -> 汇总
+        self.departments = {}
+
+    def _push_top(self, top, chunk, values, mask, make_record):
+        """先在块内取前K名，再与全局堆合并，避免逐行入堆"""
+        threshold = top.threshold()
+        if threshold is not None:
+            mask = mask & (values >= threshold)
+        for i in top_k_indices([values], top.k, mask=mask):
+            top.push(float(values[i]), make_record(chunk, i))
+
+    def update(self, chunk):
+        """用一块数据更新排名和汇总"""
+        counts = chunk['处理数'].to_numpy(dtype='float64')
+        minutes = chunk['处理时长_分钟'].to_numpy(dtype='float64')
+        names = normalize_names(chunk['人员名称'])
+        if self.aliases:
+            names = names.map(lambda name: self.aliases.get(name, name))
+        is_main = names.isin(self.main_persons).to_numpy()
+
+        self._push_top(self.personal, chunk, counts, counts > 0, _personal_record)
+        self._push_top(self.main_process, chunk, counts, is_main & (counts > 0), _main_process_record)
+        self._push_top(self.main_duration, chunk, minutes, is_main & (minutes > 0), _main_duration_record)
+
+        self.totals['人员数'] += len(chunk)
+        for name in ['处理数', '未处理流程数', '超期处理数']:
+            if name in chunk.columns:
+                self.totals[name] += int(chunk[name].sum())
+
+        group_keys = [c for c in ['单位名称', '部门名称'] if c in chunk.columns]
+        grouped = chunk.assign(时长有效数=chunk['处理时长_有效'].astype('int32'),
+                               时长合计=np.where(chunk['处理时长_有效'], minutes, 0.0)) \
+            .groupby(group_keys, observed=True)
+        sums = grouped[['处理数', '未处理流程数', '时长有效数', '时长合计']].sum()
+        sizes = grouped.size()
+        for key, row in sums.iterrows():
+            key = key if isinstance(key, tuple) else (key,)
+            summary = self.departments.setdefault(
+                key, {'人员数': 0, '处理数': 0, '未处理流程数': 0, '时长有效数': 0, '时长合计': 0.0})
+            summary['人员数'] += int(sizes[key if len(key) > 1 else key[0]])
+            summary['处理数'] += int(row['处理数'])
+            summary['未处理流程数'] += int(row['未处理流程数'])
+            summary['时长有效数'] += int(row['时长有效数'])
+            summary['时长合计'] += float(row['时长合计'])
+
+    def rankings(self):
+        """返回三个排名，格式与 generate_personnel_rankings 中的排名一致"""
+        def numbered(records):
+            return [{'排名': i, **record} for i, record in enumerate(records, 1)]
+
+        return {
+            'personal_process_ranking': numbered(self.personal.items()),
+            'main_person_process_ranking': numbered(self.main_process.items()),
+            'main_person_duration_ranking': numbered(self.main_duration.items()),
+        }
+
+    def department_summary(self):
+        """各部门汇总，平均处理时长为有效时长的平均分钟数"""
+        summary = []
+        for key, values in self.departments.items():
+            valid = values['时长有效数']
+            summary.append({
+                '单位名称': key[0] if len(key) > 1 else None,
+                '部门名称': key[-1],
+                '人员数': values['人员数'],
+                '处理数': values['处理数'],
+                '未处理流程数': values['未处理流程数'],
+                '平均处理时长_分钟': values['时长合计'] / valid if valid else 0.0,
+            })
+        return summary
+
+
+def _text(value, default='-'):
+    return default if value is None or pd.isna(value) else value
+
+
+def _personal_record(chunk, i):
+    row = chunk.iloc[i]
+    return {
+        '人员名称': row['人员名称'],
+        '部门名称': _text(row['部门名称'], None),
+        '处理数': int(row['处理数']),
+        '平均处理时长': _text(row['平均处理时长']),
+        '未处理流程数': int(row['未处理流程数']),
+    }
+
+
+def _main_process_record(chunk, i):
+    record = _personal_record(chunk, i)
+    return {'负责人姓名': record.pop('人员名称'), **record}
+
+
+def _main_duration_record(chunk, i):
+    row = chunk.iloc[i]
+    return {
+        '负责人姓名': row['人员名称'],
+        '部门名称': _text(row['部门名称'], None),
+        '平均处理时长': row['平均处理时长'],
+        '处理数': int(row['处理数']),
+        '未处理流程数': int(row['未处理流程数']),
+    }
+
+
+def stream_personnel_rankings(file_path, main_persons, chunk_size=DEFAULT_CHUNK_SIZE, aliases=None):
+    """
+    流式计算人员排名
+    aliases: 可选的姓名别名表 {别名: 标准姓名}
+
+    返回:
+    {'personal_process_ranking': [...], 'main_person_process_ranking': [...],
+     'main_person_duration_ranking': [...], 'totals': {...}, 'department_summary': [...]}
+    """
+    aggregator = PersonnelStreamAggregator(main_persons, aliases=aliases)
+    for chunk in iter_personnel_chunks(file_path, chunk_size=chunk_size):
+        aggregator.update(chunk)
+
+    result = aggregator.rankings()
+    result['totals'] = aggregator.totals
+    result['department_summary'] = aggregator.department_summary()
+    return result
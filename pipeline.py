@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一的数据生成入口 - 一个进程内生成完整的 chart_data.json
+各步骤按依赖关系组织：加载流程数据、加载人员数据、加载分类和主要负责人，再生成各项排名。
+每个步骤都有指纹（输入文件哈希 + 上游步骤指纹），指纹不变的步骤直接复用上次的结果，
+最终文档只写一次，不再由两个脚本先后读写同一个 JSON
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+from datetime import datetime
+
+from chart_format import atomic_write, write_chart_data
+from frame_cache import source_fingerprint
+import generate_personnel_rankings as personnel
+import instrumentation
+from name_index import load_name_aliases, main_person_rows
+from overdue_analytics import OUTPUT_KEYS as OVERDUE_KEYS, person_overdue_analytics, template_overdue_analytics
+import process_data
+from parallel_loader import run_jobs
+from personnel_stream import stream_personnel_rankings
+from query_engine import BACKENDS as QUERY_BACKENDS, QueryEngine, resolve_backend
+from settings import data_dir, default_paths
+
+# 步骤逻辑变化时递增，所有步骤的旧结果随之失效
+PIPELINE_VERSION = 2
+
+
+def _run_flow_data(paths, inputs):
+    result = process_data.process_flow_efficiency_data(paths['flow'])
+    if not result['success']:
+        raise RuntimeError(f"流程效率数据处理失败: {result['error']}")
+    return result['data']
+
+
+def _run_categories(paths, inputs):
+    result = process_data.process_flow_categories(paths['basic'])
+    if not result['success']:
+        raise RuntimeError(f"流程分类数据处理失败: {result['error']}")
+    return result['categories']
+
+
+def _run_personnel_data(paths, inputs):
+    return personnel.load_personnel_data(paths['personnel'])
+
+
+def _run_main_persons(paths, inputs):
+    return personnel.load_main_responsible_persons(paths['basic'])
+
+
+def _run_main_person_rows(paths, inputs):
+    aliases = load_name_aliases(paths['basic'])
+    return main_person_rows(inputs['personnel_data'], inputs['main_persons'], aliases)
+
+
+def _run_personnel_stream_rankings(paths, inputs):
+    return stream_personnel_rankings(paths['personnel'], inputs['main_persons'],
+                                     aliases=load_name_aliases(paths['basic']))
+
+
+def _run_flow_rankings(paths, inputs):
+    return process_data.build_flow_rankings(inputs['flow_data'], inputs['categories'], engine=inputs.get('engine'))
+
+
+def _run_personal_process_ranking(paths, inputs):
+    return personnel.generate_personal_process_ranking(inputs['personnel_data'], engine=inputs.get('engine'))
+
+
+def _run_main_person_process_ranking(paths, inputs):
+    return personnel.generate_main_person_process_ranking(inputs['personnel_data'], None, inputs['main_person_rows'],
+                                                          engine=inputs.get('engine'))
+
+
+def _run_main_person_duration_ranking(paths, inputs):
+    return personnel.generate_main_person_duration_ranking(inputs['personnel_data'], None, inputs['main_person_rows'],
+                                                           engine=inputs.get('engine'))
+
+
+def _run_flow_overdue(paths, inputs):
+    # flow_data 之后执行，读取它留下的解析缓存，不再重新解析 .xls
+    return template_overdue_analytics(process_data.load_flow_data(paths['flow']))
+
+
+def _run_personnel_overdue(paths, inputs):
+    return person_overdue_analytics(inputs['personnel_data'])
+
+
+# 步骤定义
+# files: 直接依赖的输入文件；deps: 依赖的上游步骤；run: 执行函数 run(paths, inputs)
+# query: 指定了查询后端（--engine）时，inputs 中附带 'engine'，排名由 SQL 查询计算
+STAGES = {
+    'flow_data': {'files': ['flow'], 'deps': [], 'run': _run_flow_data},
+    'categories': {'files': ['basic'], 'deps': [], 'run': _run_categories},
+    'personnel_data': {'files': ['personnel'], 'deps': [], 'run': _run_personnel_data},
+    'main_persons': {'files': ['basic'], 'deps': [], 'run': _run_main_persons},
+    'flow_rankings': {'files': [], 'deps': ['flow_data', 'categories'], 'run': _run_flow_rankings, 'query': True},
+    'personal_process_ranking': {
+        'files': [], 'deps': ['personnel_data'], 'run': _run_personal_process_ranking, 'query': True},
+    # 主要负责人所在的行号（按规范化姓名和别名表查找），两个负责人排名共用
+    'main_person_rows': {
+        'files': ['basic'], 'deps': ['personnel_data', 'main_persons'], 'run': _run_main_person_rows},
+    'main_person_process_ranking': {
+        'files': [], 'deps': ['personnel_data', 'main_person_rows'], 'run': _run_main_person_process_ranking,
+        'query': True},
+    'main_person_duration_ranking': {
+        'files': [], 'deps': ['personnel_data', 'main_person_rows'], 'run': _run_main_person_duration_ranking,
+        'query': True},
+    # 模板超期排名、积压风险排名；人员超期排名
+    'flow_overdue': {'files': ['flow'], 'deps': ['flow_data'], 'run': _run_flow_overdue},
+    'personnel_overdue': {'files': [], 'deps': ['personnel_data'], 'run': _run_personnel_overdue},
+    # 流式模式：分块读取人员效率明细，一次得到三个人员排名，不载入整张表
+    'personnel_stream_rankings': {
+        'files': ['personnel', 'basic'], 'deps': ['main_persons'], 'run': _run_personnel_stream_rankings},
+}
+
+# 写入最终文档的步骤
+OUTPUT_STAGES = [
+    'flow_rankings',
+    'personal_process_ranking',
+    'main_person_process_ranking',
+    'main_person_duration_ranking',
+    'flow_overdue',
+    'personnel_overdue',
+]
+
+
+class Pipeline:
+    """
+    按依赖关系执行各步骤，并按指纹复用上次的结果
+    """
+
+    def __init__(self, paths, cache_dir=None, force=False, stream_personnel=False, workers=1, engine=None):
+        self.paths = paths
+        self.stream_personnel = stream_personnel
+        # 并行读取输入文件的进程数，1 为串行
+        self.workers = workers
+        # 查询后端（见 query_engine），None 表示排名由 NumPy 计算
+        self.engine = resolve_backend(engine) if engine else None
+        self._query_engine = None
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(paths['output'])),
+                                                   '.cache', 'stages')
+        self.force = force
+        self.fingerprints = {}
+        self.results = {}
+        # 每个步骤的执行情况：'cached' 或 'computed'
+        self.status = {}
+
+    def fingerprint(self, name):
+        """步骤指纹：步骤名、版本、输入文件内容哈希和上游步骤指纹"""
+        if name not in self.fingerprints:
+            stage = STAGES[name]
+            digest = hashlib.sha256(f'{name}:v{PIPELINE_VERSION}'.encode('utf-8'))
+            for file_key in stage['files']:
+                path = self.paths[file_key]
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"找不到输入文件: {path}")
+                sha256, _ = source_fingerprint(path)
+                digest.update(f'{file_key}={sha256}'.encode('utf-8'))
+            for dep in stage['deps']:
+                digest.update(f'{dep}={self.fingerprint(dep)}'.encode('utf-8'))
+            if self.engine and stage.get('query'):
+                digest.update(f'engine={self.engine}'.encode('utf-8'))
+            self.fingerprints[name] = digest.hexdigest()
+        return self.fingerprints[name]
+
+    def _result_path(self, name):
+        return os.path.join(self.cache_dir, f'{name}-{self.fingerprint(name)[:16]}.pkl')
+
+    def _load_result(self, name):
+        path = self._result_path(name)
+        if self.force or not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                self.results[name] = pickle.load(f)
+        except Exception:
+            return False
+        return True
+
+    def _save_result(self, name):
+        # 同一缓存目录可能有多个进程同时写（batch_runner 的任务共用输入时）：
+        # 各自写唯一的临时文件再改名；写不进去不影响本次结果
+        path = self._result_path(name)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write(pickle.dumps(self.results[name], protocol=pickle.HIGHEST_PROTOCOL), path)
+        except OSError as e:
+            print(f"步骤结果缓存写入失败: {path} ({e})")
+            return
+
+        # 删除这个步骤旧指纹的结果（可能已被其他进程删除）
+        for old_path in glob.glob(os.path.join(self.cache_dir, f'{name}-*.pkl')):
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    def _has_result(self, name):
+        return not self.force and os.path.exists(self._result_path(name))
+
+    def query_engine(self):
+        """各排名步骤共用的查询引擎（第一次使用时创建），表按输入对象只注册一次"""
+        if self._query_engine is None:
+            self._query_engine = QueryEngine(self.engine)
+        return self._query_engine
+
+    def stages_to_compute(self, targets):
+        """
+        找出生成 targets 需要重新计算的步骤：有上次结果的步骤不再向上游展开
+        """
+        pending = []
+
+        def visit(name):
+            if name in pending or name in self.results or self._has_result(name):
+                return
+            for dep in STAGES[name]['deps']:
+                visit(dep)
+            pending.append(name)
+
+        for target in targets:
+            visit(target)
+        return pending
+
+    def prefetch(self, targets):
+        """
+        需要重新计算的读取步骤（没有上游依赖的步骤）互不相关，在进程池中同时执行
+        """
+        loads = [name for name in self.stages_to_compute(targets) if not STAGES[name]['deps']]
+        if self.workers <= 1 or len(loads) <= 1:
+            return
+
+        with instrumentation.stage('prefetch', stages=loads, workers=self.workers):
+            results = run_jobs({name: (STAGES[name]['run'], (self.paths, {})) for name in loads},
+                               workers=self.workers)
+        for name, result in results.items():
+            self.results[name] = result
+            self.status[name] = 'computed'
+            self._save_result(name)
+
+    def run_stage(self, name):
+        """
+        取得步骤结果：指纹未变时读取上次结果，否则先取得上游结果再执行
+        上游步骤只在确实需要重新计算时才会被加载
+        """
+        if name in self.results:
+            return self.results[name]
+
+        if self._load_result(name):
+            self.status[name] = 'cached'
+            return self.results[name]
+
+        stage = STAGES[name]
+        inputs = {dep: self.run_stage(dep) for dep in stage['deps']}
+        rows_in = [n for n in map(instrumentation.count_rows, inputs.values()) if n is not None]
+        if self.engine and stage.get('query'):
+            inputs['engine'] = self.query_engine()
+        with instrumentation.stage(name, rows_in=sum(rows_in) if rows_in else None) as record:
+            self.results[name] = stage['run'](self.paths, inputs)
+            record['rows_out'] = instrumentation.count_rows(self.results[name])
+        self.status[name] = 'computed'
+        self._save_result(name)
+        return self.results[name]
+
+    def build_document(self):
+        """执行所有输出步骤，组装 chart_data.json 的完整内容"""
+        # 流式模式不载入整张人员表，没有人员超期排名
+        stream_targets = ['personnel_stream_rankings', 'flow_rankings', 'flow_overdue']
+        targets = stream_targets if self.stream_personnel else OUTPUT_STAGES
+        self.prefetch(targets)
+
+        if self.stream_personnel:
+            outputs = dict(self.run_stage('personnel_stream_rankings'))
+            outputs['flow_rankings'] = self.run_stage('flow_rankings')
+            outputs.update(self.run_stage('flow_overdue'))
+        else:
+            outputs = {name: self.run_stage(name) for name in OUTPUT_STAGES}
+            outputs.update(outputs.pop('flow_overdue'))
+            outputs.update(outputs.pop('personnel_overdue'))
+        document = {
+            'success': True,
+            'data': outputs['flow_rankings'],
+            'generated_at': datetime.now().isoformat(),
+            'personal_process_ranking': outputs['personal_process_ranking'],
+            'main_person_process_ranking': outputs['main_person_process_ranking'],
+            'main_person_duration_ranking': outputs['main_person_duration_ranking'],
+        }
+        for key in OVERDUE_KEYS:
+            if key in outputs:
+                document[key] = outputs[key]
+        return document
+
+
+def write_document(document, output_file):
+    """原子地写出最终文档（v2紧凑格式，附带预压缩文件；整体替换，文档已包含全部键）"""
+    write_chart_data(document, output_file)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='生成仪表盘使用的 chart_data.json')
+    parser.add_argument('--data-dir', help='输入文件所在目录（默认取环境变量 LCJX_DATA_DIR，见 settings）')
+    parser.add_argument('--flow-file', help='流程效率明细.xls 路径')
+    parser.add_argument('--personnel-file', help='人员效率明细.xls 路径')
+    parser.add_argument('--basic-file', help='基本信息.xlsx 路径')
+    parser.add_argument('--output', help='输出的 chart_data.json 路径')
+    parser.add_argument('--cache-dir', help='步骤结果缓存目录')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重新计算所有步骤')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='并行读取输入文件的进程数（默认1，串行）')
+    parser.add_argument('--stream-personnel', action='store_true',
+                        help='分块读取人员效率明细（适合超大的导出文件；.xlsx 逐行读取，.xls 仍整表载入）')
+    parser.add_argument('--engine', choices=['auto'] + QUERY_BACKENDS,
+                        help='用 SQL 查询后端计算排名（见 query_engine.py，auto 为已安装的第一个），默认用 NumPy 计算')
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    paths = default_paths(args.data_dir or data_dir())
+    for key, value in [('flow', args.flow_file), ('personnel', args.personnel_file),
+                       ('basic', args.basic_file), ('output', args.output)]:
+        if value:
+            paths[key] = value
+
+    with instrumentation.recording(args, 'pipeline'):
+        return run(args, paths)
+
+
+def run(args, paths):
+    """按命令行选项生成并写出 chart_data.json"""
+    print("开始生成图表数据...")
+    try:
+        pipeline = Pipeline(paths, cache_dir=args.cache_dir, force=args.force,
+                            stream_personnel=args.stream_personnel, workers=args.workers, engine=args.engine)
+    except ImportError as e:
+        print(e)
+        return 1
+
+    try:
+        with instrumentation.stage('build_document'):
+            document = pipeline.build_document()
+    except Exception as e:
+        print(f"数据处理失败: {e}")
+        return 1
+
+    with instrumentation.stage('write_chart_data'):
+        write_document(document, paths['output'])
+
+    for name, status in pipeline.status.items():
+        print(f"  {name}: {'复用缓存' if status == 'cached' else '重新计算'}")
+    print(f"输出文件: {paths['output']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
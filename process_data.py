@@ -5,64 +5,72 @@
 这个脚本读取Excel文件并生成可视化网页所需的JSON数据
 """
 
-import pandas as pd
-import json
-import os
+import argparse
 from datetime import datetime
 
+from chart_format import merge_chart_data
+from duration_parser import duration_to_minutes, parse_duration_hours
+from excel_ingest import read_sheets
+from excel_schema import FLOW_SCHEMA, bind_columns, load_with_schema
+from frame_cache import cached_frame
+from instrumentation import add_arguments, recording, stage
+import query_engine
+from ranking import compute_flow_rankings
+from serialization import frame_records
+from settings import data_path
+
 def clean_column_names(df):
     """
     清理DataFrame的列名
-    将Unnamed列替换为更有意义的名称
-    """
-    # 根据分析结果，流程效率明细的列应该是：
-    expected_columns = [
-        '模板名称', '发起流程数', '环比', '同比', '完成流程数', 
-        '完成环比', '平均运行时长', '运行时长环比', '超期结束比例', 
-        '平均超期时长', '未结束流程数', '超期未结束流程数', '备注'
-    ]
+    按表头文字（而不是列的个数和位置）把列绑定到流程效率明细的字段上，
+    返回去掉表头行后的数据
+    """
+    return bind_columns(df, FLOW_SCHEMA)
+
+def load_flow_frame(file_path):
+    """
+    解析并清理流程效率明细，返回带类型的 DataFrame
+    """
+    # 按表头文字绑定列，只加载需要的列
+    with stage('read_flow_excel') as record:
+        df = load_with_schema(file_path, FLOW_SCHEMA)
+        record['rows_out'] = len(df)
     
-    # 如果列数匹配，就使用预期的列名
-    if len(df.columns) == len(expected_columns):
-        df.columns = expected_columns
+    # 删除"合计"行
+    df = df[df['模板名称'] != '合计'].reset_index(drop=True)
+    
+    # 清理数据，移除空值行
+    df = df.dropna(subset=['模板名称']).reset_index(drop=True)
+    
+    # 计数列缺失值按0处理
+    numeric_columns = ['发起流程数', '完成流程数', '超期结束流程数', '未结束流程数', '超期未结束流程数']
+    for col in numeric_columns:
+        if col in df.columns:
+            df[col] = df[col].fillna(0).astype('int64')
+    
+    # 处理平均运行时长（可能包含"天"、"小时"等单位）
+    if '平均运行时长' in df.columns:
+        with stage('parse_duration', rows_in=len(df)) as record:
+            df['平均运行时长_数值'], _ = parse_duration_hours(df['平均运行时长'])
+            record['rows_out'] = len(df)
     
     return df
 
-def process_flow_efficiency_data():
+def load_flow_data(file_path=None):
+    """加载流程效率明细 DataFrame（源文件没有变化时直接读取缓存），默认读取数据目录下的文件"""
+    return cached_frame(file_path or data_path('flow'), load_flow_frame, 'flow')
+
+def process_flow_efficiency_data(file_path=None):
     """
-    处理流程效率明细数据
+    处理流程效率明细数据（默认读取数据目录下的文件，见 settings）
     返回处理后的数据字典
     """
-    file_path = "/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台/流程效率明细.xls"
-    
     try:
-        # 读取Excel文件
-        df = pd.read_excel(file_path, engine='xlrd')
+        # 源文件没有变化时直接读取缓存，不再重新解析 .xls
+        df = load_flow_data(file_path)
         
-        # 清理列名
-        df = clean_column_names(df)
-        
-        # 删除前两行（标题行）和最后的汇总行
-        df = df.iloc[2:].reset_index(drop=True)
-        
-        # 删除"合计"行
-        df = df[df['模板名称'] != '合计'].reset_index(drop=True)
-        
-        # 清理数据，移除空值行
-        df = df.dropna(subset=['模板名称'])
-        
-        # 转换数值列
-        numeric_columns = ['发起流程数', '完成流程数', '未结束流程数', '超期未结束流程数']
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # 处理平均运行时长（可能包含"天"、"小时"等单位）
-        if '平均运行时长' in df.columns:
-            df['平均运行时长_数值'] = df['平均运行时长'].apply(parse_duration)
-        
-        # 转换为字典格式
-        data = df.to_dict('records')
+        # 按列转换为字典格式（缺失值输出为 null）
+        data = frame_records(df)
         
         return {
             'success': True,
@@ -80,57 +88,27 @@ def process_flow_efficiency_data():
 def parse_duration(duration_str):
     """
     解析时长字符串，转换为小时数
-    例如："2天3小时" -> 51小时
+    例如："2天3小时30分" -> 51.5小时
+    整列解析请使用 duration_parser.parse_duration_hours
     """
-    if pd.isna(duration_str) or duration_str == '-':
-        return 0
-    
-    try:
-        duration_str = str(duration_str)
-        hours = 0
-        
-        # 提取天数
-        if '天' in duration_str:
-            days_part = duration_str.split('天')[0]
-            if days_part.isdigit():
-                hours += int(days_part) * 24
-        
-        # 提取小时数
-        if '小时' in duration_str:
-            if '天' in duration_str:
-                hours_part = duration_str.split('天')[1].split('小时')[0]
-            else:
-                hours_part = duration_str.split('小时')[0]
-            
-            if hours_part.isdigit():
-                hours += int(hours_part)
-        
-        # 如果只是数字，假设是小时
-        elif duration_str.replace('.', '').isdigit():
-            hours = float(duration_str)
-        
-        return hours
-        
-    except:
-        return 0
+    return duration_to_minutes(duration_str) / 60
 
-def process_flow_categories():
+def process_flow_categories(file_path=None):
     """
-    处理流程分类数据
+    处理流程分类数据（默认读取数据目录下的基本信息.xlsx）
     返回各类流程的列表
     """
-    file_path = "/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台/基本信息.xlsx"
-    
     try:
         categories = {}
+        file_path = file_path or data_path('basic')
         
-        # 读取各个工作表
+        # 各个工作表从同一个工作簿句柄读取，工作簿只解析一次
         sheet_names = ['销售类流程', '采购类流程', '项目&产品管理类流程']
+        sheets = read_sheets(file_path, sheet_names, header=None)
         
         for sheet_name in sheet_names:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            # 获取第一列的所有非空值
-            flow_list = df.iloc[:, 0].dropna().tolist()
+            # 工作表没有表头，第一列的所有非空值就是流程名称
+            flow_list = sheets[sheet_name].iloc[:, 0].dropna().tolist()
             categories[sheet_name] = flow_list
         
         return {
@@ -150,8 +128,12 @@ def generate_chart_data():
     生成图表所需的数据
     """
     # 获取流程效率数据
-    efficiency_result = process_flow_efficiency_data()
-    categories_result = process_flow_categories()
+    with stage('load_flow') as record:
+        efficiency_result = process_flow_efficiency_data()
+        record['rows_out'] = len(efficiency_result.get('data', []))
+    with stage('load_categories') as record:
+        categories_result = process_flow_categories()
+        record['rows_out'] = sum(len(names) for names in categories_result.get('categories', {}).values())
     
     if not efficiency_result['success'] or not categories_result['success']:
         return {
@@ -162,39 +144,39 @@ def generate_chart_data():
     data = efficiency_result['data']
     categories = categories_result['categories']
     
-    # 1. 发起流程数及完成数排名
-    flow_ranking = sorted(data, key=lambda x: x.get('发起流程数', 0), reverse=True)[:10]
-    
-    # 2. 流程运行时长排名
-    duration_ranking = sorted(
-        [item for item in data if item.get('平均运行时长_数值', 0) > 0], 
-        key=lambda x: x.get('平均运行时长_数值', 0), 
-        reverse=True
-    )[:10]
-    
-    # 3-5. 各类流程的平均运行时长排名
-    category_rankings = {}
-    for category_name, flow_list in categories.items():
-        category_data = [item for item in data if item.get('模板名称') in flow_list]
-        category_ranking = sorted(
-            [item for item in category_data if item.get('平均运行时长_数值', 0) > 0],
-            key=lambda x: x.get('平均运行时长_数值', 0),
-            reverse=True
-        )[:10]
-        category_rankings[category_name] = category_ranking
+    with stage('flow_rankings', rows_in=len(data)) as record:
+        rankings = build_flow_rankings(data, categories)
+        record['rows_out'] = len(rankings['flow_ranking']) + len(rankings['duration_ranking'])
     
     return {
         'success': True,
-        'data': {
-            'flow_ranking': flow_ranking,
-            'duration_ranking': duration_ranking,
-            'category_rankings': category_rankings,
-            'categories': categories,
-            'raw_data': data
-        },
+        'data': rankings,
         'generated_at': datetime.now().isoformat()
     }
 
+def build_flow_rankings(data, categories, specs=None, category_spec=None, engine=None):
+    """
+    根据流程记录和流程分类生成各项排名
+    排名定义（取前几名、排序列）见 ranking.FLOW_RANKING_SPECS / CATEGORY_RANKING_SPEC
+    engine: query_engine.QueryEngine，给出时排名由 SQL 查询计算（结果相同）
+    返回 chart_data.json 中 data 部分的字典
+    """
+    # 1-2. 发起流程数排名、流程运行时长排名；3-5. 各类流程的平均运行时长排名
+    if engine is not None:
+        rankings, category_indices = query_engine.flow_ranking_rows(engine, data, categories, specs, category_spec)
+    else:
+        rankings, category_indices = compute_flow_rankings(data, categories, specs, category_spec)
+    
+    result = {name: [data[i] for i in indices] for name, indices in rankings.items()}
+    result['category_rankings'] = {
+        category_name: [data[i] for i in indices]
+        for category_name, indices in category_indices.items()
+    }
+    result['categories'] = categories
+    result['raw_data'] = data
+    
+    return result
+
 def main():
     """
     主函数 - 生成JSON数据文件
@@ -205,11 +187,12 @@ def main():
     result = generate_chart_data()
     
     if result['success']:
-        # 保存为JSON文件
-        output_file = "/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台/chart_data.json"
+        # 保存为JSON文件（v2紧凑格式，附带预压缩文件）；
+        # 只合并本脚本生成的键，generate_personnel_rankings 写入的人员排名保留
+        output_file = data_path('output')
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        with stage('write_chart_data'):
+            merge_chart_data(result, output_file)
         
         print(f"数据处理完成！")
         print(f"输出文件: {output_file}")
@@ -218,9 +201,21 @@ def main():
         
         for category, ranking in result['data']['category_rankings'].items():
             print(f"{category}排名: {len(ranking)} 条记录")
+        return 0
             
     else:
         print(f"数据处理失败: {result.get('error', '未知错误')}")
+        return 1
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='将流程效率明细和基本信息转换为 chart_data.json')
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+def cli(argv=None):
+    """命令行入口（lcjx.py process 也调用这里）"""
+    with recording(parse_args(argv), 'process_data'):
+        raise SystemExit(main())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
\ No newline at end of file
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询引擎 - 把清理后的流程表、人员表载入进程内的 SQL 引擎，用 SQL 计算排名、分类排名和汇总
+后端按以下顺序选择（都是可选依赖，没有安装时依次退回）：
+- duckdb：多线程执行，直接扫描 pandas DataFrame，不复制数据
+- polars：表注册为 LazyFrame，SQL 编译为惰性查询，过滤条件下推到扫描
+- sqlite：标准库自带，单线程，数据逐行写入内存数据库
+
+排名查询只返回行号（_row 列），记录仍由原来的函数（build_records 等）按行号生成，
+取值相同的行按行号先后排列，与 ranking.top_k_indices 的结果一致。
+
+已注册的表:
+flow              流程效率明细（process_data.load_flow_frame 的列，另有 _row）
+categories        流程分类：分类名称、模板名称
+personnel         人员效率明细（load_personnel_data 的列，另有 _row、平均处理时长_分钟）
+main_person_rows  主要负责人在 personnel 中的行号：_row
+
+用法:
+python query_engine.py --data-dir <数据目录>                    # 交互式 SQL
+python query_engine.py -c 'SELECT 部门名称, SUM(处理数) FROM personnel GROUP BY 1 ORDER BY 2 DESC LIMIT 5'
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from duration_parser import parse_duration_minutes
+from personnel_cube import LEVELS, MEASURES, UNKNOWN
+from ranking import CATEGORY_RANKING_SPEC, FLOW_RANKING_SPECS
+
+# 可选的后端，按优先顺序
+BACKENDS = ['duckdb', 'polars', 'sqlite']
+
+# 交互模式下最多显示的行数
+MAX_DISPLAY_ROWS = 50
+
+# 行号列
+ROW_COLUMN = '_row'
+
+
+def available_backends():
+    """当前环境中可用的后端"""
+    return [name for name in BACKENDS if name == 'sqlite' or importlib.util.find_spec(name) is not None]
+
+
+def resolve_backend(name=None):
+    """None 或 'auto' 取第一个可用的后端；指定的后端没有安装时抛出 ImportError"""
+    if name in (None, 'auto'):
+        return available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"未知的查询后端: {name}（可选 {', '.join(BACKENDS)}）")
+    if name not in available_backends():
+        raise ImportError(f"没有安装 {name}，可用的后端: {', '.join(available_backends())}")
+    return name
+
+
+def quote(identifier):
+    """SQL 标识符加双引号（列名多为中文）"""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def literal(value):
+    """SQL 字符串字面量"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sqlite_column(series):
+    """一列转为 sqlite3 可以绑定的 Python 值列表，缺失值为 None"""
+    kind = series.dtype.kind
+    if kind in 'iub':
+        return series.tolist()
+    if kind == 'f':
+        return [None if value != value else value for value in series.tolist()]
+    if kind == 'M':
+        return [None if pd.isna(value) else value.isoformat() for value in series]
+    return [None if value is None or (not isinstance(value, str) and pd.isna(value))
+            else value if isinstance(value, (str, int, float, bytes)) else str(value)
+            for value in series.tolist()]
+
+
+class _DuckDBBackend:
+
+    def __init__(self, threads=None):
+        duckdb = importlib.import_module('duckdb')
+        self.conn = duckdb.connect(':memory:', config={'threads': threads} if threads else {})
+
+    def register(self, name, frame):
+        # 浮点列转为可空类型，NaN 作为 NULL 参与比较和排序
+        floats = [column for column in frame.columns if frame[column].dtype.kind == 'f']
+        if floats:
+            frame = frame.astype({column: 'Float64' for column in floats})
+        self.conn.register(name, frame)
+
+    def query(self, sql):
+        return self.conn.execute(sql).df()
+
+    def close(self):
+        self.conn.close()
+
+
+class _PolarsBackend:
+
+    def __init__(self, threads=None):
+        # polars 的线程池大小只能在导入前由环境变量 POLARS_MAX_THREADS 指定
+        self.pl = importlib.import_module('polars')
+        self.context = self.pl.SQLContext()
+
+    def register(self, name, frame):
+        columns = []
+        for column in frame.columns:
+            series = frame[column]
+            if series.dtype.kind in 'iufb':
+                columns.append(self.pl.Series(str(column), series.to_numpy(), nan_to_null=True))
+            else:
+                columns.append(self.pl.Series(str(column), _sqlite_column(series)))
+        self.context.register(name, self.pl.DataFrame(columns).lazy())
+
+    def query(self, sql):
+        result = self.context.execute(sql).collect()
+        return pd.DataFrame(result.to_dict(as_series=False), columns=result.columns)
+
+    def close(self):
+        pass
+
+
+class _SQLiteBackend:
+
+    def __init__(self, threads=None):
+        self.conn = sqlite3.connect(':memory:')
+
+    def register(self, name, frame):
+        table = quote(name)
+        self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+        self.conn.execute(f'CREATE TABLE {table} ({", ".join(quote(column) for column in frame.columns)})')
+        rows = zip(*[_sqlite_column(frame[column]) for column in frame.columns])
+        placeholders = ', '.join('?' * len(frame.columns))
+        self.conn.executemany(f'INSERT INTO {table} VALUES ({placeholders})', rows)
+        if ROW_COLUMN in frame.columns:
+            self.conn.execute(f'CREATE INDEX {quote(name + "_row")} ON {table} ({quote(ROW_COLUMN)})')
+
+    def query(self, sql):
+        cursor = self.conn.execute(sql)
+        columns = [description[0] for description in cursor.description or []]
+        return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def close(self):
+        self.conn.close()
+
+
+_BACKEND_CLASSES = {'duckdb': _DuckDBBackend, 'polars': _PolarsBackend, 'sqlite': _SQLiteBackend}
+
+
+class QueryEngine:
+    """
+    进程内 SQL 查询引擎
+
+    参数:
+    backend: 'duckdb' / 'polars' / 'sqlite'，None 或 'auto' 自动选择
+    threads: duckdb 使用的线程数，默认为CPU核数
+    """
+
+    def __init__(self, backend=None, threads=None):
+        self.backend = resolve_backend(backend)
+        self._impl = _BACKEND_CLASSES[self.backend](threads)
+        # 表名 -> 列名列表；表名 -> 注册时的源对象（同一对象再次注册时跳过）
+        self.tables = {}
+        self._sources = {}
+
+    def close(self):
+        self._impl.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def registered(self, name, *sources):
+        """表是否已经由同一组源对象注册过"""
+        previous = self._sources.get(name)
+        return previous is not None and len(previous) == len(sources) and all(
+            a is b for a, b in zip(previous, sources))
+
+    def register(self, name, frame, sources=()):
+        """
+        注册（或替换）一张表
+
+        参数:
+        frame: pandas DataFrame
+        sources: 生成该表的源对象，同一组对象再次注册时直接跳过
+        """
+        if sources and self.registered(name, *sources):
+            return
+        self._impl.register(name, frame)
+        self.tables[name] = [str(column) for column in frame.columns]
+        self._sources[name] = tuple(sources)
+
+    def query(self, sql):
+        """执行 SQL，返回 pandas DataFrame"""
+        return self._impl.query(sql)
+
+    def rows(self, sql):
+        """执行返回行号的 SQL，返回 int64 数组"""
+        result = self.query(sql)
+        return result.iloc[:, 0].to_numpy(dtype='int64') if len(result) else np.empty(0, dtype='int64')
+
+
+def ranking_sql(table, spec, conditions=()):
+    """
+    排名查询：按 spec 的排序列取前K名的行号
+
+    参数:
+    table: 表名
+    spec: 排名定义（见 ranking.FLOW_RANKING_SPECS），keys / k / positive_only / ascending
+    conditions: 附加的 WHERE 条件
+    """
+    keys = [quote(key) for key in spec['keys']]
+    direction = 'ASC' if spec.get('ascending') else 'DESC'
+    where = [f'{keys[0]} IS NOT NULL']
+    if spec.get('positive_only'):
+        where.append(f'{keys[0]} > 0')
+    where.extend(conditions)
+    # 主排序列已排除空值；次要排序列的空值排在最后，与 np.lexsort 对 NaN 的处理一致
+    order = [f'{keys[0]} {direction}'] + [f'{key} {direction} NULLS LAST' for key in keys[1:]]
+    order.append(quote(ROW_COLUMN))
+    sql = f'SELECT {quote(ROW_COLUMN)} FROM {quote(table)} WHERE {" AND ".join(where)} ORDER BY {", ".join(order)}'
+    if spec.get('k') is not None:
+        sql += f' LIMIT {int(spec["k"])}'
+    return sql
+
+
+def _with_rows(frame):
+    return frame.reset_index(drop=True).assign(**{ROW_COLUMN: np.arange(len(frame), dtype='int64')})
+
+
+def register_flow(engine, data, categories=None):
+    """
+    注册 flow 表（和 categories 表）
+
+    参数:
+    data: 流程记录列表或流程效率明细 DataFrame，行号与记录列表一致
+    categories: {分类名称: [模板名称, ...]}
+    """
+    if not engine.registered('flow', data):
+        frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame.from_records(data)
+        # 记录为空或缺少排序列时补上空列，查询结果为空而不是报错
+        key_columns = {key for spec in FLOW_RANKING_SPECS + [CATEGORY_RANKING_SPEC] for key in spec['keys']}
+        for column in ['模板名称'] + sorted(key_columns):
+            if column not in frame.columns:
+                frame = frame.assign(**{column: np.nan if column != '模板名称' else None})
+        engine.register('flow', _with_rows(frame), sources=(data,))
+    if categories is not None and not engine.registered('categories', categories):
+        pairs = [(category, template) for category, templates in categories.items() for template in templates]
+        frame = pd.DataFrame(pairs, columns=['分类名称', '模板名称']).drop_duplicates()
+        engine.register('categories', frame, sources=(categories,))
+
+
+def flow_ranking_rows(engine, data, categories, specs=None, category_spec=None):
+    """
+    用 SQL 计算所有流程排名，返回值与 ranking.compute_flow_rankings 相同
+
+    返回:
+    ({排名名称: 行号列表}, {分类名称: 行号列表})
+    """
+    specs = FLOW_RANKING_SPECS if specs is None else specs
+    category_spec = CATEGORY_RANKING_SPEC if category_spec is None else category_spec
+    register_flow(engine, data, categories)
+
+    rankings = {spec['name']: engine.rows(ranking_sql('flow', spec)).tolist() for spec in specs}
+    category_rankings = {}
+    for category_name in categories:
+        member = (f'{quote("模板名称")} IN (SELECT {quote("模板名称")} FROM {quote("categories")} '
+                  f'WHERE {quote("分类名称")} = {literal(category_name)})')
+        category_rankings[category_name] = engine.rows(ranking_sql('flow', category_spec, [member])).tolist()
+    return rankings, category_rankings
+
+
+def register_personnel(engine, df_personnel, main_rows=None):
+    """
+    注册 personnel 表（附加解析后的 平均处理时长_分钟，无效时长为空）和 main_person_rows 表
+
+    参数:
+    df_personnel: load_personnel_data 的结果
+    main_rows: 主要负责人所在的行号数组（见 name_index.main_person_rows）
+    """
+    if not engine.registered('personnel', df_personnel):
+        minutes, valid = parse_duration_minutes(df_personnel['平均处理时长'])
+        frame = df_personnel.assign(平均处理时长_分钟=np.where(valid, minutes, np.nan))
+        engine.register('personnel', _with_rows(frame), sources=(df_personnel,))
+    if main_rows is not None:
+        engine.register('main_person_rows', pd.DataFrame({ROW_COLUMN: np.asarray(main_rows, dtype='int64')}),
+                        sources=(main_rows,))
+
+
+# 主要负责人过滤条件
+_MAIN_PERSON_CONDITION = (f'{quote(ROW_COLUMN)} IN '
+                          f'(SELECT {quote(ROW_COLUMN)} FROM {quote("main_person_rows")})')
+
+
+def personal_process_rows(engine, df_personnel, k=20):
+    """个人流程处理数排名的行号（处理数大于0，从多到少）"""
+    register_personnel(engine, df_personnel)
+    spec = {'keys': ['处理数_数值'], 'k': k, 'positive_only': True}
+    return engine.rows(ranking_sql('personnel', spec))
+
+
+def main_person_process_rows(engine, df_personnel, main_rows, k=15):
+    """主要负责人流程数排名的行号"""
+    register_personnel(engine, df_personnel, main_rows)
+    spec = {'keys': ['处理数_数值'], 'k': k, 'positive_only': True}
+    return engine.rows(ranking_sql('personnel', spec, [_MAIN_PERSON_CONDITION]))
+
+
+def main_person_duration_rows(engine, df_personnel, main_rows, k=15):
+    """主要负责人处理时长排名的行号（有效时长大于0，从长到短）"""
+    register_personnel(engine, df_personnel, main_rows)
+    spec = {'keys': ['平均处理时长_分钟'], 'k': k, 'positive_only': True}
+    return engine.rows(ranking_sql('personnel', spec, [_MAIN_PERSON_CONDITION]))
+
+
+def rollup_sql(level, measure='处理数', stat='sum', k=10, ascending=False, columns=None):
+    """
+    单位 / 部门 / 人员汇总排名的 SQL，排序与 personnel_cube.PersonnelCube.top_k 一致
+    （取值相同时按分组在表中首次出现的先后排列，升序、降序都是如此）
+
+    参数:
+    columns: personnel 表的列名；源文件中没有的单位名称、计数列按 未知 / 0 处理
+    """
+    if level not in LEVELS:
+        raise KeyError(f"未知的层级: {level}")
+    if stat != 'count' and measure not in MEASURES:
+        raise KeyError(f"未知的指标: {measure}")
+    if stat not in ('sum', 'mean', 'count'):
+        raise KeyError(f"未知的统计方式: {stat}")
+
+    def column(name, default):
+        if columns is not None and name not in columns:
+            return default
+        return f'COALESCE({quote(name)}, {default})'
+
+    unit = column('单位名称', literal(UNKNOWN))
+    department = column('部门名称', literal(UNKNOWN))
+    minutes = quote('平均处理时长_分钟')
+    measures = {
+        '处理数': column('处理数', '0'),
+        '处理时长_分钟': f'COALESCE({minutes}, 0)',
+        '超期处理数': column('超期处理数', '0'),
+        '未处理流程数': column('未处理流程数', '0'),
+    }
+    groups = {
+        'unit': ([unit], [f'{unit} AS {quote("名称")}']),
+        'department': ([unit, department], [f'{department} AS {quote("名称")}', f'{unit} AS {quote("单位名称")}']),
+        'person': ([quote(ROW_COLUMN)], [f'MIN({quote("人员名称")}) AS {quote("名称")}',
+                                         f'MIN({department}) AS {quote("部门名称")}',
+                                         f'MIN({unit}) AS {quote("单位名称")}']),
+    }
+    group_by, labels = groups[level]
+
+    people = 'COUNT(*)'
+    valid_people = f'SUM(CASE WHEN {minutes} IS NULL THEN 0 ELSE 1 END)'
+    select = labels + [f'{people} AS {quote("人数")}']
+    values = {}
+    for name, value in measures.items():
+        divisor = valid_people if name == '处理时长_分钟' else people
+        values[(name, 'sum')] = f'SUM({value})'
+        values[(name, 'mean')] = f'CASE WHEN {divisor} > 0 THEN SUM({value}) * 1.0 / {divisor} ELSE 0 END'
+        select.append(f'{values[(name, "sum")]} AS {quote(name + "_合计")}')
+        select.append(f'{values[(name, "mean")]} AS {quote(name + "_平均")}')
+    select.append(f'MIN({quote(ROW_COLUMN)}) AS {quote("_first")}')
+
+    sort_value = people if stat == 'count' else values[(measure, stat)]
+    order = f'{sort_value} {"ASC" if ascending else "DESC"}, {quote("_first")} ASC'
+    sql = (f'SELECT {", ".join(select)} FROM {quote("personnel")} '
+           f'GROUP BY {", ".join(group_by)} ORDER BY {order}')
+    if k:
+        sql += f' LIMIT {int(k)}'
+    return sql
+
+
+def rollup(engine, df_personnel, level, measure='处理数', stat='sum', k=10, ascending=False):
+    """
+    用 SQL 计算汇总排名，返回与 PersonnelCube.top_k 相同结构的记录列表（带 '排名'）
+    """
+    register_personnel(engine, df_personnel)
+    sql = rollup_sql(level, measure, stat, k, ascending, columns=engine.tables['personnel'])
+    result = engine.query(sql).drop(columns=['_first'])
+    records = []
+    for rank, row in enumerate(result.to_dict('records'), 1):
+        record = {'排名': rank, '名称': row['名称'], '人数': int(row['人数'])}
+        for key in ('部门名称', '单位名称'):
+            if key in row:
+                record[key] = row[key]
+        for name in MEASURES:
+            record[f'{name}_合计'] = round(float(row[f'{name}_合计']), 2)
+            record[f'{name}_平均'] = round(float(row[f'{name}_平均']), 2)
+        records.append(record)
+    return records
+
+
+def load_tables(engine, paths):
+    """
+    从输入文件载入所有表（交互查询用），缺少的输入文件跳过
+
+    参数:
+    paths: {'flow', 'personnel', 'basic'} 路径（见 settings.default_paths）
+
+    返回:
+    跳过的输入文件列表
+    """
+    # 这几个模块本身会导入 query_engine，在函数内导入避免循环
+    import generate_personnel_rankings as personnel
+    import process_data
+    from name_index import load_name_aliases, main_person_rows
+
+    skipped = [path for path in (paths['flow'], paths['personnel'], paths['basic']) if not os.path.exists(path)]
+    categories = None
+    if os.path.exists(paths['basic']):
+        result = process_data.process_flow_categories(paths['basic'])
+        categories = result['categories'] if result['success'] else None
+    if os.path.exists(paths['flow']):
+        register_flow(engine, process_data.load_flow_data(paths['flow']), categories)
+    if os.path.exists(paths['personnel']):
+        df_personnel = personnel.load_personnel_data(paths['personnel'])
+        main_rows = None
+        if os.path.exists(paths['basic']):
+            main_rows = main_person_rows(df_personnel, personnel.load_main_responsible_persons(paths['basic']),
+                                         load_name_aliases(paths['basic']))
+        register_personnel(engine, df_personnel, main_rows)
+    return skipped
+
+
+def _print_result(engine, sql, output=None):
+    output = output or sys.stdout
+    started = time.perf_counter()
+    result = engine.query(sql)
+    seconds = time.perf_counter() - started
+    if len(result.columns):
+        print(result.to_string(index=False, max_rows=MAX_DISPLAY_ROWS), file=output)
+    print(f"({len(result)} 行, {seconds:.3f}s)", file=output)
+
+
+def _dot_command(engine, line):
+    """交互模式的 . 命令，返回 False 表示退出"""
+    parts = line.split()
+    if parts[0] in ('.quit', '.exit'):
+        return False
+    if parts[0] == '.tables':
+        for name, columns in engine.tables.items():
+            print(f"{name}: {', '.join(columns)}")
+    elif parts[0] == '.schema' and len(parts) > 1 and parts[1] in engine.tables:
+        print('\n'.join(engine.tables[parts[1]]))
+    else:
+        print("可用命令: .tables  .schema <表名>  .quit")
+    return True
+
+
+def repl(engine):
+    """交互式 SQL：以分号结束一条语句"""
+    try:
+        import readline  # noqa: F401  上下键历史
+    except ImportError:
+        pass
+    print(f"查询后端: {engine.backend}；.tables 列出表，.quit 退出，语句以 ; 结束")
+    buffer = []
+    while True:
+        try:
+            line = input('...> ' if buffer else 'sql> ')
+        except EOFError:
+            print()
+            break
+        except KeyboardInterrupt:
+            print()
+            buffer = []
+            continue
+        if not buffer and line.strip().startswith('.'):
+            if not _dot_command(engine, line.strip()):
+                break
+            continue
+        buffer.append(line)
+        if line.rstrip().endswith(';'):
+            sql = '\n'.join(buffer).strip().rstrip(';')
+            buffer = []
+            try:
+                _print_result(engine, sql)
+            except Exception as e:
+                print(f"查询失败: {type(e).__name__}: {e}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='在进程内 SQL 引擎中查询流程和人员数据')
+    parser.add_argument('--data-dir', help='输入文件所在目录（默认取环境变量 LCJX_DATA_DIR，见 settings）')
+    parser.add_argument('--flow-file', help='流程效率明细.xls 路径')
+    parser.add_argument('--personnel-file', help='人员效率明细.xls 路径')
+    parser.add_argument('--basic-file', help='基本信息.xlsx 路径')
+    parser.add_argument('--engine', choices=['auto'] + BACKENDS, default='auto', help='查询后端（默认自动选择）')
+    parser.add_argument('--threads', type=int, help='duckdb 使用的线程数')
+    parser.add_argument('-c', '--command', action='append', metavar='SQL', help='执行 SQL 后退出（可重复）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    from settings import data_dir, default_paths
+
+    args = parse_args(argv)
+    paths = default_paths(args.data_dir or data_dir())
+    for key, value in [('flow', args.flow_file), ('personnel', args.personnel_file), ('basic', args.basic_file)]:
+        if value:
+            paths[key] = value
+
+    try:
+        engine = QueryEngine(args.engine, args.threads)
+    except ImportError as e:
+        print(e)
+        return 1
+    with engine:
+        for path in load_tables(engine, paths):
+            print(f"找不到输入文件，跳过: {path}", file=sys.stderr)
+        if not args.command:
+            repl(engine)
+            return 0
+        for sql in args.command:
+            try:
+                _print_result(engine, sql)
+            except Exception as e:
+                print(f"查询失败: {type(e).__name__}: {e}")
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
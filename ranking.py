@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排名计算模块
+先把排序列取成 NumPy 数组、用"模板名称 -> 流程分类"哈希索引一次性算出每行所属分类，
+再用 np.partition 找到第K名的取值、只对候选行排序，
+不再对整张表做全量排序，也不再为每个分类扫描一遍全部数据
+"""
+
+import numpy as np
+
+# 流程排名定义
+# name: 输出键名；keys: 排序列（按先后顺序比较）；k: 取前几名；
+# positive_only: 只保留第一个排序列大于0的记录；ascending: 是否从小到大排
+FLOW_RANKING_SPECS = [
+    {'name': 'flow_ranking', 'keys': ['发起流程数'], 'k': 10, 'positive_only': False, 'ascending': False},
+    {'name': 'duration_ranking', 'keys': ['平均运行时长_数值'], 'k': 10, 'positive_only': True, 'ascending': False},
+]
+
+# 各流程分类内部的排名定义（每个分类各取前K名）
+CATEGORY_RANKING_SPEC = {'keys': ['平均运行时长_数值'], 'k': 10, 'positive_only': True, 'ascending': False}
+
+
+def build_category_index(categories):
+    """
+    构建 模板名称 -> [所属分类, ...] 的哈希索引
+
+    参数:
+    categories: {分类名称: [模板名称, ...]}
+    """
+    index = {}
+    for category_name, flow_list in categories.items():
+        for template in flow_list:
+            members = index.setdefault(template, [])
+            if category_name not in members:
+                members.append(category_name)
+    return index
+
+
+def column_array(data, column):
+    """从记录列表中取出一列，转为 float64 数组（缺失或非数值记为 NaN）"""
+    values = np.empty(len(data), dtype='float64')
+    for i, item in enumerate(data):
+        value = item.get(column)
+        try:
+            values[i] = float(value) if value is not None else np.nan
+        except (TypeError, ValueError):
+            values[i] = np.nan
+    return values
+
+
+def top_k_indices(columns, k, mask=None, ascending=False):
+    """
+    在 mask 选中的行中取排序前K名的行号
+
+    参数:
+    columns: 排序列数组的列表，按先后顺序比较
+    k: 取前几名，None 表示全部
+    mask: 布尔数组，None 表示全部行参与
+    ascending: 是否从小到大排
+
+    返回:
+    行号数组；取值相同的行保持原有先后顺序（与 sorted 的稳定排序一致）
+    """
+    primary = columns[0] if not ascending else -columns[0]
+    valid = ~np.isnan(primary)
+    if mask is not None:
+        valid &= mask
+    candidates = np.flatnonzero(valid)
+
+    if k is not None and k < len(candidates):
+        if k <= 0:
+            return candidates[:0]
+        # np.partition 找出第K大的值，所有不小于它的行都进入候选（保证并列时结果确定）
+        kth_value = np.partition(primary[candidates], len(candidates) - k)[len(candidates) - k]
+        candidates = candidates[primary[candidates] >= kth_value]
+
+    # 对候选行做多列排序：np.lexsort 以最后一个键为主键，行号作为最次要的键保证稳定
+    sort_keys = [candidates]
+    for values in reversed(columns):
+        key = values[candidates]
+        sort_keys.append(key if ascending else -key)
+    order = np.lexsort(sort_keys)
+
+    ranked = candidates[order]
+    return ranked if k is None else ranked[:k]
+
+
+def _ranking_mask(spec, arrays):
+    if spec.get('positive_only'):
+        return arrays[spec['keys'][0]] > 0
+    return None
+
+
+def compute_flow_rankings(data, categories, specs=None, category_spec=None):
+    """
+    一次性计算所有流程排名
+
+    参数:
+    data: 流程记录列表
+    categories: {分类名称: [模板名称, ...]}
+    specs: 整体排名定义，默认 FLOW_RANKING_SPECS
+    category_spec: 分类排名定义，默认 CATEGORY_RANKING_SPEC
+
+    返回:
+    ({排名名称: 行号列表}, {分类名称: 行号列表})
+    """
+    specs = FLOW_RANKING_SPECS if specs is None else specs
+    category_spec = CATEGORY_RANKING_SPEC if category_spec is None else category_spec
+
+    # 每个排序列只取一次
+    key_columns = {key for spec in specs + [category_spec] for key in spec['keys']}
+    arrays = {column: column_array(data, column) for column in key_columns}
+
+    rankings = {}
+    for spec in specs:
+        indices = top_k_indices([arrays[key] for key in spec['keys']], spec['k'],
+                                mask=_ranking_mask(spec, arrays), ascending=spec.get('ascending', False))
+        rankings[spec['name']] = indices.tolist()
+
+    # 扫描一遍数据，得到每个分类包含的行
+    category_index = build_category_index(categories)
+    members = {category_name: np.zeros(len(data), dtype=bool) for category_name in categories}
+    for i, item in enumerate(data):
+        for category_name in category_index.get(item.get('模板名称'), ()):
+            members[category_name][i] = True
+
+    base_mask = _ranking_mask(category_spec, arrays)
+    category_rankings = {}
+    for category_name, member_mask in members.items():
+        mask = member_mask if base_mask is None else member_mask & base_mask
+        indices = top_k_indices([arrays[key] for key in category_spec['keys']], category_spec['k'],
+                                mask=mask, ascending=category_spec.get('ascending', False))
+        category_rankings[category_name] = indices.tolist()
+
+    return rankings, category_rankings
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排名查询服务 - 基于 asyncio 的本地 HTTP 服务
+启动时把清理后的流程数据和人员数据载入内存，并为每种排名预先算好完整的排序下标；
+查询 /rankings/{kind}?k=&dept=&category= 时只需按条件过滤排序下标、取前K名，
+不必为了"前50名""某个部门""某个分类"重新运行生成脚本。
+响应带 ETag（支持 304）并按 Accept-Encoding 压缩，同时提供仪表盘的静态文件；
+仪表盘上传的 Excel 文件也由这里交给 pipeline 处理（见 upload_handler）
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from chart_format import DATASET_DIR_SUFFIX
+from duration_parser import parse_duration_minutes
+import generate_personnel_rankings as personnel
+from name_index import NameIndex, load_name_aliases
+import process_data
+from personnel_cube import LEVELS, build_personnel_cube
+from ranking import build_category_index, column_array, top_k_indices
+from serialization import build_records, json_dumps
+from settings import data_dir, default_paths
+from upload_handler import MAX_UPLOAD_SIZE, UploadError, process_upload, receive_upload
+
+# 排名定义
+# dataset: 数据集（flow/personnel）；key: 排序列；positive_only: 只保留排序列大于0的记录；
+# main_only: 只统计主要负责人；default_k: 未指定 k 时取前几名（与 chart_data.json 一致）
+RANKING_KINDS = {
+    'flow': {'dataset': 'flow', 'key': '发起流程数', 'positive_only': False, 'default_k': 10},
+    'duration': {'dataset': 'flow', 'key': '平均运行时长_数值', 'positive_only': True, 'default_k': 10},
+    'personal_process': {
+        'dataset': 'personnel', 'key': '处理数_数值', 'positive_only': True, 'default_k': 20},
+    'main_person_process': {
+        'dataset': 'personnel', 'key': '处理数_数值', 'positive_only': True, 'main_only': True, 'default_k': 15},
+    'main_person_duration': {
+        'dataset': 'personnel', 'key': '处理时长_分钟', 'positive_only': True, 'main_only': True, 'default_k': 15},
+}
+
+# 人员排名记录的字段，与 generate_personnel_rankings 中的排名一致
+PERSONNEL_FIELDS = {
+    'personal_process': personnel.PERSONAL_RANKING_FIELDS,
+    'main_person_process': personnel.MAIN_PERSON_PROCESS_FIELDS,
+    'main_person_duration': personnel.MAIN_PERSON_DURATION_FIELDS,
+}
+
+# 压缩的最小响应大小（字节），更小的响应压缩收益不大
+GZIP_MIN_SIZE = 512
+
+# 缓存的查询响应个数
+RESPONSE_CACHE_SIZE = 256
+
+STATUS_TEXT = {
+    200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class RankingState:
+    """
+    某一版输入文件对应的内存数据：流程记录、人员数据和各排名的完整排序下标
+    创建后不再修改；重新载入时整体换成新的对象，查询过程中看到的始终是同一版数据
+    """
+
+    def __init__(self, paths, signature):
+        flow_result = process_data.process_flow_efficiency_data(paths['flow'])
+        if not flow_result['success']:
+            raise RuntimeError(f"流程效率数据处理失败: {flow_result['error']}")
+        category_result = process_data.process_flow_categories(paths['basic'])
+        if not category_result['success']:
+            raise RuntimeError(f"流程分类数据处理失败: {category_result['error']}")
+
+        self.flow_data = flow_result['data']
+        self.categories = category_result['categories']
+        self.main_persons = personnel.load_main_responsible_persons(paths['basic'])
+
+        df = personnel.load_personnel_data(paths['personnel']).copy()
+        df['处理时长_分钟'], _ = parse_duration_minutes(df['平均处理时长'])
+        self.personnel = df
+
+        # 各数据集的排序列
+        self.arrays = {
+            'flow': {spec['key']: column_array(self.flow_data, spec['key'])
+                     for spec in RANKING_KINDS.values() if spec['dataset'] == 'flow'},
+            'personnel': {spec['key']: df[spec['key']].to_numpy(dtype='float64')
+                          for spec in RANKING_KINDS.values() if spec['dataset'] == 'personnel'},
+        }
+
+        # 过滤条件：流程按分类、人员按部门
+        category_index = build_category_index(self.categories)
+        self.category_members = {name: np.zeros(len(self.flow_data), dtype=bool) for name in self.categories}
+        for i, item in enumerate(self.flow_data):
+            for category_name in category_index.get(item.get('模板名称'), ()):
+                self.category_members[category_name][i] = True
+        self.departments = df['部门名称'].astype(object).where(df['部门名称'].notna(), None).to_numpy()
+        aliases = load_name_aliases(paths['basic'])
+        self.is_main = NameIndex(df['人员名称'], aliases).mask(self.main_persons)
+
+        # 单位 → 部门 → 人员 汇总立方体
+        self.cube = build_personnel_cube(df)
+
+        # 每种排名的完整排序（从大到小，取值相同时保持原有先后顺序）
+        self.orders = {}
+        for kind, spec in RANKING_KINDS.items():
+            values = self.arrays[spec['dataset']][spec['key']]
+            mask = values > 0 if spec['positive_only'] else np.ones(len(values), dtype=bool)
+            if spec.get('main_only'):
+                mask &= self.is_main
+            self.orders[kind] = top_k_indices([values], None, mask=mask)
+
+        self.signature = signature
+        self.version = hashlib.sha256(repr(signature).encode('utf-8')).hexdigest()[:16]
+        self.loaded_at = datetime.now().isoformat()
+
+    def filter_options(self):
+        """可用的过滤条件"""
+        departments = sorted({d for d in self.departments if d is not None})
+        return {'categories': list(self.categories), 'departments': departments}
+
+    def ranking(self, kind, k=None, dept=None, category=None):
+        """
+        查询排名
+
+        参数:
+        kind: 排名类型，见 RANKING_KINDS
+        k: 取前几名，None 使用默认值，0 表示全部
+        dept: 只看某个部门（人员排名）
+        category: 只看某个流程分类（流程排名）
+
+        返回:
+        {'kind', 'k', 'total', 'data'}；total 为满足条件的记录总数
+        """
+        spec = RANKING_KINDS[kind]
+        order = self.orders[kind]
+
+        if category is not None:
+            if spec['dataset'] != 'flow':
+                raise ValueError(f"{kind} 排名不支持按流程分类过滤")
+            if category not in self.category_members:
+                raise KeyError(f"未知的流程分类: {category}")
+            order = order[self.category_members[category][order]]
+        if dept is not None:
+            if spec['dataset'] != 'personnel':
+                raise ValueError(f"{kind} 排名不支持按部门过滤")
+            order = order[self.departments[order] == dept]
+
+        k = spec['default_k'] if k is None else k
+        selected = order if k == 0 else order[:k]
+
+        if spec['dataset'] == 'flow':
+            data = [self.flow_data[i] for i in selected]
+        else:
+            data = build_records(self.personnel.iloc[selected], PERSONNEL_FIELDS[kind])
+        return {'kind': kind, 'k': k, 'total': int(len(order)), 'data': data}
+
+
+class RankingData:
+    """
+    当前使用的排名数据（RankingState）
+    输入文件变化（修改时间或大小不同）时在后台重新载入，载入完成后一次性替换
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+        # 同一时间只进行一次重新载入，载入期间到达的请求等待它完成后直接使用新数据
+        self._lock = threading.Lock()
+        self.state = None
+        self.load()
+
+    def _signature(self):
+        signature = []
+        for key in ['flow', 'personnel', 'basic']:
+            stat = os.stat(self.paths[key])
+            signature.append((key, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def load(self):
+        """载入数据并预先计算排序下标"""
+        self.state = RankingState(self.paths, self._signature())
+
+    def refresh_if_changed(self):
+        """输入文件变化时重新载入，返回是否重新载入"""
+        if self._signature() == self.state.signature:
+            return False
+        with self._lock:
+            # 等锁期间其他请求可能已经载入了新数据
+            if self._signature() == self.state.signature:
+                return False
+            self.load()
+        return True
+
+
+class Request:
+    """
+    解析后的 HTTP 请求
+    请求体不预先读入内存，由处理函数按需从 reader 流式读取
+    """
+
+    def __init__(self, method, target, headers, reader=None):
+        self.method = method
+        parts = urlsplit(target)
+        self.path = unquote(parts.path)
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.reader = reader
+        self.content_length = int(headers['content-length']) if 'content-length' in headers else None
+        # 处理函数读取了请求体后置为 True；未读取时连接不能继续复用
+        self.body_consumed = not self.content_length
+
+
+class Response:
+    """HTTP 响应"""
+
+    def __init__(self, status=200, body=b'', content_type='application/json; charset=utf-8', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = {'Content-Type': content_type}
+        self.headers.update(headers or {})
+
+
+def json_response(payload, status=200, headers=None):
+    body = json_dumps(payload)
+    return Response(status, body, headers=headers)
+
+
+def error_response(status, message):
+    return json_response({'success': False, 'error': message}, status=status)
+
+
+def _accepts_gzip(request):
+    return 'gzip' in request.headers.get('accept-encoding', '')
+
+
+def _etag_matches(request, etag):
+    candidates = [tag.strip() for tag in request.headers.get('if-none-match', '').split(',')]
+    return etag in candidates or '*' in candidates
+
+
+class RankingServer:
+    """
+    路由：
+    GET /rankings              可用的排名类型和过滤条件
+    GET /rankings/{kind}       排名查询，参数 k / dept / category
+    GET /rollups/{level}       单位/部门/人员汇总排名，参数 measure / stat / k / order / unit / dept
+    GET /health                服务状态
+    POST /upload               上传三个 Excel 文件，返回与 chart_data.json 相同格式的排名数据
+    其他 GET 请求              静态文件（index.html、chart_data.json 等）
+    """
+
+    def __init__(self, data, static_dir, upload_cache_dir=None):
+        self.data = data
+        self.static_dir = os.path.abspath(static_dir)
+        # 上传文件的 pipeline 步骤缓存，内容相同的文件再次上传时直接复用结果
+        self.upload_cache_dir = upload_cache_dir or os.path.join(self.static_dir, '.cache', 'uploads')
+        # 查询响应缓存：(数据版本, 请求参数) -> (ETag, 原始内容, 压缩内容)
+        self.responses = OrderedDict()
+        self.routes = {'GET': self.handle_get, 'POST': self.handle_post}
+
+    async def handle(self, request):
+        handler = self.routes.get(request.method)
+        if handler is None:
+            return error_response(405, f"不支持的请求方法: {request.method}")
+        try:
+            return await handler(request)
+        except Exception as e:
+            return error_response(500, str(e))
+
+    async def handle_get(self, request):
+        if request.path == '/health':
+            state = self.data.state
+            return json_response({'success': True, 'version': state.version, 'loaded_at': state.loaded_at})
+        if request.path.rstrip('/') == '/rankings':
+            return json_response({'success': True, 'kinds': list(RANKING_KINDS), **self.data.state.filter_options()})
+        if request.path.startswith('/rankings/'):
+            return await self.handle_ranking(request, request.path[len('/rankings/'):])
+        if request.path.startswith('/rollups/'):
+            return await self.handle_rollup(request, request.path[len('/rollups/'):])
+        return self.handle_static(request)
+
+    async def handle_post(self, request):
+        if request.path != '/upload':
+            return error_response(404, f"找不到接口: {request.path}")
+
+        # 请求体边接收边写入临时文件，解析和排名计算放到线程中执行
+        try:
+            parts = await receive_upload(request.reader, request.headers.get('content-type', ''),
+                                         request.content_length)
+        except UploadError as e:
+            status = 413 if request.content_length and request.content_length > MAX_UPLOAD_SIZE else 400
+            return error_response(status, str(e))
+        request.body_consumed = True
+        try:
+            body = await asyncio.to_thread(process_upload, parts, self.upload_cache_dir)
+        except UploadError as e:
+            return error_response(400, str(e))
+        except Exception as e:
+            return error_response(500, f"数据处理失败: {e}")
+        finally:
+            for part in parts.values():
+                part['file'].close()
+
+        headers = {'Cache-Control': 'no-store', 'Vary': 'Accept-Encoding'}
+        if len(body) >= GZIP_MIN_SIZE and _accepts_gzip(request):
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(200, body, headers=headers)
+
+    async def handle_ranking(self, request, kind):
+        if kind not in RANKING_KINDS:
+            return error_response(404, f"未知的排名类型: {kind}")
+
+        k = request.query.get('k')
+        if k is not None:
+            if not k.isdigit():
+                return error_response(400, f"k 必须是非负整数: {k}")
+            k = int(k)
+        dept = request.query.get('dept') or None
+        category = request.query.get('category') or None
+
+        return await self.cached_query(
+            request, ('rankings', kind, k, dept, category),
+            lambda state: state.ranking(kind, k=k, dept=dept, category=category))
+
+    async def handle_rollup(self, request, level):
+        if level not in LEVELS:
+            return error_response(404, f"未知的汇总层级: {level}")
+
+        k = request.query.get('k', '10')
+        if not k.isdigit():
+            return error_response(400, f"k 必须是非负整数: {k}")
+        k = int(k)
+        measure = request.query.get('measure', '处理数')
+        stat = request.query.get('stat', 'sum')
+        ascending = request.query.get('order', 'desc') == 'asc'
+        unit = request.query.get('unit') or None
+        dept = request.query.get('dept') or None
+
+        def query(state):
+            data = state.cube.top_k(level, measure, stat, k=k, ascending=ascending, unit=unit, department=dept)
+            return {'level': level, 'measure': measure, 'stat': stat, 'k': k, 'data': data}
+
+        return await self.cached_query(request, ('rollups', level, measure, stat, k, ascending, unit, dept), query)
+
+    async def cached_query(self, request, params, compute):
+        """
+        执行查询并缓存序列化、压缩后的响应；查询结果不变时返回 304
+        compute 接收当前的 RankingState，抛出 KeyError 时返回 404，ValueError 时返回 400
+        """
+        # 数据文件更新后重新载入（放到线程中执行，避免阻塞其他请求）
+        if await asyncio.to_thread(self.data.refresh_if_changed):
+            self.responses.clear()
+
+        # 整个查询使用同一版数据，即使期间其他请求换上了新数据
+        state = self.data.state
+        cache_key = (state.version,) + params
+        cached = self.responses.get(cache_key)
+        if cached is None:
+            try:
+                result = compute(state)
+            except KeyError as e:
+                return error_response(404, e.args[0])
+            except ValueError as e:
+                return error_response(400, str(e))
+            body = json_dumps({'success': True, **result})
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+            cached = (etag, body, compressed)
+            self.responses[cache_key] = cached
+            if len(self.responses) > RESPONSE_CACHE_SIZE:
+                self.responses.popitem(last=False)
+        else:
+            self.responses.move_to_end(cache_key)
+
+        etag, body, compressed = cached
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if _etag_matches(request, etag):
+            return Response(304, headers=headers)
+        if compressed is not None and _accepts_gzip(request):
+            headers['Content-Encoding'] = 'gzip'
+            body = compressed
+        return Response(200, body, headers=headers)
+
+    def handle_static(self, request):
+        relative = request.path.lstrip('/') or 'index.html'
+        path = os.path.abspath(os.path.join(self.static_dir, relative))
+        # 隐藏文件（.snapshots、.cache、写出中的临时文件）不对外提供
+        hidden = any(part.startswith('.') for part in relative.split('/'))
+        if hidden or os.path.commonpath([path, self.static_dir]) != self.static_dir or not os.path.isfile(path):
+            return error_response(404, f"找不到文件: {request.path}")
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/json', 'application/javascript'):
+            content_type += '; charset=utf-8'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        # 清单引用的数据集文件按内容哈希命名，内容不会变，浏览器可以一直使用缓存
+        if os.path.basename(os.path.dirname(path)).endswith(DATASET_DIR_SUFFIX):
+            headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        if _etag_matches(request, etag):
+            return Response(304, content_type=content_type, headers=headers)
+
+        # 优先使用预压缩文件（chart_data.json.gz 由 chart_format.write_chart_data 生成）
+        gz_path = path + '.gz'
+        if _accepts_gzip(request) and os.path.isfile(gz_path) and os.stat(gz_path).st_mtime_ns >= stat.st_mtime_ns:
+            path = gz_path
+            headers['Content-Encoding'] = 'gzip'
+        with open(path, 'rb') as f:
+            body = f.read()
+        return Response(200, body, content_type=content_type, headers=headers)
+
+
+async def read_request(reader):
+    """读取一个 HTTP/1.1 请求的请求行和头部，连接关闭时返回 None"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise ValueError("无效的请求行")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if not headers.get('content-length', '0').isdigit():
+        raise ValueError("无效的 Content-Length")
+    return Request(method.upper(), target, headers, reader)
+
+
+async def write_response(writer, response, keep_alive):
+    status_text = STATUS_TEXT.get(response.status, '')
+    lines = [f'HTTP/1.1 {response.status} {status_text}']
+    headers = dict(response.headers)
+    headers['Content-Length'] = str(len(response.body))
+    headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+    lines.extend(f'{name}: {value}' for name, value in headers.items())
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    if response.body and response.status != 304:
+        writer.write(response.body)
+    await writer.drain()
+
+
+def make_connection_handler(server):
+    """返回 asyncio.start_server 使用的连接处理函数（支持 keep-alive）"""
+
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    await write_response(writer, error_response(400, str(e)), keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                response = await server.handle(request)
+                keep_alive = request.body_consumed and request.headers.get('connection', '').lower() != 'close'
+                await write_response(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+async def serve(data, host='127.0.0.1', port=8000, static_dir=None):
+    """启动服务，直到进程被中断"""
+    server = RankingServer(data, static_dir or os.path.dirname(os.path.abspath(__file__)))
+    tcp_server = await asyncio.start_server(make_connection_handler(server), host, port)
+    print(f"排名服务已启动: http://{host}:{port}/")
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='从内存数据提供排名查询的本地 HTTP 服务')
+    parser.add_argument('--data-dir', help='输入文件所在目录（默认取环境变量 LCJX_DATA_DIR，见 settings）')
+    parser.add_argument('--flow-file', help='流程效率明细.xls 路径')
+    parser.add_argument('--personnel-file', help='人员效率明细.xls 路径')
+    parser.add_argument('--basic-file', help='基本信息.xlsx 路径')
+    parser.add_argument('--static-dir', help='静态文件目录（默认为本脚本所在目录）')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    paths = default_paths(args.data_dir or data_dir())
+    for key, value in [('flow', args.flow_file), ('personnel', args.personnel_file), ('basic', args.basic_file)]:
+        if value:
+            paths[key] = value
+
+    print("载入数据...")
+    try:
+        data = RankingData(paths)
+    except Exception as e:
+        print(f"数据载入失败: {e}")
+        return 1
+    print(f"   流程数据 {len(data.state.flow_data)} 条，人员数据 {len(data.state.personnel)} 条")
+
+    try:
+        asyncio.run(serve(data, args.host, args.port, args.static_dir))
+    except KeyboardInterrupt:
+        print("服务已停止")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
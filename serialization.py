@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按列构建输出记录
+整列做缺失值填充和类型转换（tolist 一次得到 Python 原生类型），排名序号用 np.arange 生成，
+最后把各列 zip 成记录；不再逐行 iterrows、逐个单元格调用 pd.notna/int()，
+输出全部记录（不只前20名）时也不会被逐行开销拖慢。
+JSON 序列化在安装了 orjson 时使用 orjson，否则使用标准库 json
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 列的输出方式
+TEXT = 'text'      # 文字，缺失为 None
+LABEL = 'label'    # 显示用文字，缺失为 '-'
+COUNT = 'count'    # 计数，缺失为 0，输出整数
+NUMBER = 'number'  # 数值，缺失为 None，输出浮点数
+
+
+def column_values(series, kind):
+    """整列转换为 Python 原生值的列表"""
+    if kind == COUNT:
+        return pd.to_numeric(series, errors='coerce').fillna(0).to_numpy(dtype='int64').tolist()
+    if kind == NUMBER:
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64')
+        column = values.tolist()
+        for i in np.flatnonzero(np.isnan(values)):
+            column[i] = None
+        return column
+    values = series.astype(object)
+    missing = series.isna().to_numpy()
+    if not missing.any():
+        return values.tolist()
+    return values.where(~missing, '-' if kind == LABEL else None).tolist()
+
+
+def build_records(df, fields, rank_key='排名', start=1):
+    """
+    按列构建记录列表
+
+    参数:
+    df: 已按名次排好的数据
+    fields: [(输出键名, 列名, 输出方式), ...]，输出方式见 TEXT / LABEL / COUNT / NUMBER
+    rank_key: 排名序号的键名，None 表示不输出序号
+    start: 第一条记录的序号
+
+    返回:
+    记录列表，键的顺序与 fields 一致（排名序号在最前）
+    """
+    keys = [key for key, _, _ in fields]
+    columns = [column_values(df[column], kind) for _, column, kind in fields]
+    if rank_key is not None:
+        keys.insert(0, rank_key)
+        columns.insert(0, np.arange(start, start + len(df)).tolist())
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+def frame_records(df):
+    """
+    DataFrame -> 记录列表（代替 to_dict('records')）
+    整数列输出 int，浮点列的 NaN 输出 None，其他列缺失值输出 None，结果可以直接写成合法的 JSON
+    """
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_integer_dtype(series.dtype) and not series.hasnans:
+            columns.append(series.to_numpy(dtype='int64').tolist())
+        elif pd.api.types.is_float_dtype(series.dtype):
+            columns.append(column_values(series, NUMBER))
+        else:
+            columns.append(column_values(series, TEXT))
+    keys = list(df.columns)
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+def _default(value):
+    """标准库 json 不认识的 NumPy 类型"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def json_dumps(document):
+    """序列化为不带缩进的 UTF-8 JSON 字节串"""
+    if orjson is not None:
+        return orjson.dumps(document, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据目录和文件路径设置
+各脚本不再各自写死数据目录，统一从这里取：
+数据目录优先取环境变量 LCJX_DATA_DIR，没有设置时使用原来的默认目录；
+目录下各文件的名称见 FILE_NAMES。
+路径在调用时才计算，常驻进程转交的环境变量、批量运行时切换的目录都能生效
+"""
+
+import os
+
+# 没有设置 LCJX_DATA_DIR 时的默认数据目录
+DEFAULT_DATA_DIR = "/Users/kangyiyuan/Desktop/AI编程项目/营销平台流程绩效分析平台"
+
+# 指定数据目录的环境变量
+DATA_DIR_ENV = 'LCJX_DATA_DIR'
+
+# 数据目录下的文件名
+FILE_NAMES = {
+    'flow': '流程效率明细.xls',
+    'personnel': '人员效率明细.xls',
+    'basic': '基本信息.xlsx',
+    'output': 'chart_data.json',
+}
+
+# 输入文件
+INPUT_KEYS = ['flow', 'personnel', 'basic']
+
+
+def data_dir():
+    """当前的数据目录"""
+    return os.environ.get(DATA_DIR_ENV) or DEFAULT_DATA_DIR
+
+
+def data_path(key, directory=None):
+    """
+    数据目录下某个文件的路径
+
+    参数:
+    key: 'flow' / 'personnel' / 'basic' / 'output'
+    directory: 数据目录，默认为 data_dir()
+    """
+    return os.path.join(directory or data_dir(), FILE_NAMES[key])
+
+
+def default_paths(directory=None):
+    """数据目录下各输入文件和输出文件的路径：{'flow', 'personnel', 'basic', 'output'}"""
+    return {key: data_path(key, directory) for key in FILE_NAMES}
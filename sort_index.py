@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+明细表排序索引
+为每个数据集的每个可排序列预先算好升序排列的行号（置换数组），写入 chart_data.json 的 sort_indexes；
+前端点击表头时按置换数组取行即可，降序直接反转，不再在浏览器里逐行比较排序
+
+文字列按中文排序规则（拼音顺序，与浏览器的 localeCompare('zh-CN') 一致）比较：
+安装了 PyICU 时使用 ICU 的 zh_CN 排序规则；否则使用随代码提供的排序表 zh_collation.txt
+（由 zh_collation.js 用 ICU 生成，见该文件）；排序表也没有时尝试系统的 zh_CN.UTF-8 locale。
+都不可用时不生成文字列的索引并给出提示，前端对这些列退回 localeCompare 排序
+"""
+
+import locale
+import os
+import threading
+
+import numpy as np
+
+from duration_parser import parse_duration_minutes
+
+# 各数据集的可排序列（与 index.html 明细表的可排序表头一致）
+SORT_COLUMNS = {
+    'raw_data': ['模板名称', '发起流程数', '完成流程数', '平均运行时长_数值'],
+    'personal_process_ranking': ['人员名称', '部门名称', '处理数'],
+    'main_person_process_ranking': ['负责人姓名', '部门名称', '处理数'],
+    'main_person_duration_ranking': ['负责人姓名', '部门名称', '平均处理时长', '处理数'],
+}
+
+# 按文字排序的列
+TEXT_COLUMNS = ['模板名称', '人员名称', '负责人姓名', '部门名称']
+
+# 按解析后的时长排序的列（原值是"1天2小时"这样的文字）
+DURATION_COLUMNS = ['平均处理时长']
+
+# 系统 locale 的候选名称
+ZH_LOCALES = ['zh_CN.UTF-8', 'zh_CN.utf8', 'zh_CN']
+
+# 没有 PyICU 时使用的中文排序表
+COLLATION_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zh_collation.txt')
+
+_collation_keys = False
+
+# setlocale 修改的是进程全局设置，切换、计算、恢复都在锁内进行（ranking_server 在多个线程中生成文档）
+_locale_lock = threading.Lock()
+
+
+def collation_keys():
+    """
+    返回把一列文字转成中文排序键的函数（参数和返回值都是列表），没有可用的中文排序规则时返回 None
+    """
+    global _collation_keys
+    if _collation_keys is False:
+        try:
+            import icu
+            collator = icu.Collator.createInstance(icu.Locale('zh_CN'))
+
+            def keys(texts):
+                return [collator.getSortKey(text) for text in texts]
+
+            _collation_keys = keys
+        except ImportError:
+            _collation_keys = _table_collation_keys() or _locale_collation_keys()
+        if _collation_keys is None:
+            print(f"没有可用的中文排序规则（PyICU、{os.path.basename(COLLATION_TABLE)}、zh_CN locale），"
+                  f"不生成文字列 {'、'.join(TEXT_COLUMNS)} 的排序索引")
+    return _collation_keys
+
+
+def _table_collation_keys():
+    """
+    使用排序表：先比较整串的一级权重（拼音、字母、数字），相同时再比较完整顺序（大小写、全半角等）；
+    Ⅱ、⑴ 这类字符一级比较时按展开后的字符（II、(1)）比较，声调符号这类字符只参与完整顺序的比较，
+    "重庆"这类多音字的特殊读法按排序表中的规则排在指定的字之后；
+    排序表中没有的字符排在所有字符之后，按码位排序。
+    汉字、字母、数字和常用标点组成的文字与 ICU 的顺序相同；少见符号混排时二级、三级的先后可能略有差别。
+    排序表不存在时返回 None
+    """
+    try:
+        with open(COLLATION_TABLE, 'r', encoding='utf-8', newline='') as f:
+            lines = f.read().split('\n')
+    except OSError:
+        return None
+
+    ignorable = set(lines[0])
+    expansions = {item[0]: item[1:] for item in lines[1].split('\t') if item}
+    weights = {}
+    for character in lines[3]:
+        weights[character] = (0, len(weights) + 1)
+    for group, line in enumerate(filter(None, lines[4:]), start=1):
+        for character in line:
+            weights[character] = (group, len(weights) + 1)
+    unknown = (len(lines), len(weights) + 1)
+    # 两个字 -> 第一个字的权重：紧跟在指定的字之后
+    contractions = {item[:2]: tuple(w + 0.5 for w in weights[item[2]]) for item in lines[2].split('\t') if item}
+
+    def weight(character):
+        return weights.get(character) or (unknown[0] + ord(character), unknown[1] + ord(character))
+
+    def key(text):
+        primary, full = [], []
+        for i, character in enumerate(text):
+            if character in ignorable:
+                continue
+            if text[i:i + 2] in contractions:
+                first = contractions[text[i:i + 2]]
+                primary.append(first[0])
+                full.append(first[1])
+                continue
+            primary.extend(weight(e)[0] for e in expansions.get(character, character))
+            full.append(weight(character)[1])
+        return tuple(w for w in primary if w), tuple(full)
+
+    def keys(texts):
+        return [key(text) for text in texts]
+
+    return keys
+
+
+def _locale_collation_keys():
+    """使用系统 zh_CN locale 的 strxfrm：每一列只切换一次 locale，算完整列的排序键后恢复；系统没有该 locale 时返回 None"""
+    with _locale_lock:
+        previous = locale.setlocale(locale.LC_COLLATE)
+        try:
+            for name in ZH_LOCALES:
+                try:
+                    locale.setlocale(locale.LC_COLLATE, name)
+                    break
+                except locale.Error:
+                    continue
+            else:
+                return None
+        finally:
+            locale.setlocale(locale.LC_COLLATE, previous)
+
+    def keys(texts, name=name):
+        with _locale_lock:
+            current = locale.setlocale(locale.LC_COLLATE)
+            locale.setlocale(locale.LC_COLLATE, name)
+            try:
+                return list(map(locale.strxfrm, texts))
+            finally:
+                locale.setlocale(locale.LC_COLLATE, current)
+
+    return keys
+
+
+def sort_permutation(values, column):
+    """
+    返回按升序排列的行号列表（取值相同的行保持原有先后顺序）
+    缺失值与前端一致：数字按0、文字按空字符串处理
+    """
+    if column in TEXT_COLUMNS:
+        keys = collation_keys()(['' if value is None else str(value) for value in values])
+        return sorted(range(len(keys)), key=keys.__getitem__)
+
+    if column in DURATION_COLUMNS:
+        numbers, _ = parse_duration_minutes(values)
+    else:
+        numbers = np.array([value if isinstance(value, (int, float)) else np.nan for value in values],
+                           dtype='float64')
+    numbers = np.nan_to_num(numbers, nan=0.0)
+    return np.argsort(numbers, kind='stable').tolist()
+
+
+def build_sort_indexes(document):
+    """
+    为 v1 结构的文档生成各数据集的排序索引
+
+    返回:
+    {数据集名称: {列名: 升序行号列表}}，只包含文档中存在的数据集
+    """
+    tables = {'raw_data': (document.get('data') or {}).get('raw_data')}
+    for name in SORT_COLUMNS:
+        if name != 'raw_data':
+            tables[name] = document.get(name)
+
+    indexes = {}
+    for name, records in tables.items():
+        if not records:
+            continue
+        indexes[name] = {
+            column: sort_permutation([record.get(column) for record in records], column)
+            for column in SORT_COLUMNS[name]
+            if any(column in record for record in records)
+            and (column not in TEXT_COLUMNS or collation_keys() is not None)
+        }
+    return indexes
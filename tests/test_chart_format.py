@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""chart_data.json 的写出：清单拆分后能还原完整文档"""
+
+import json
+import os
+
+from chart_format import manifest_path, write_chart_data
+from pipeline import Pipeline
+
+
+def _merge(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+def test_manifest_reassembles_document(paths):
+    write_chart_data(Pipeline(paths).build_document(), paths['output'])
+    with open(manifest_path(paths['output']), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert 'sort_indexes' not in manifest['meta']
+    assert set(manifest['datasets']) == {'flow', 'personnel', 'overdue'}
+
+    document = json.loads(json.dumps(manifest['meta']))
+    base = os.path.dirname(paths['output'])
+    for entry in manifest['datasets'].values():
+        with open(os.path.join(base, entry['path']), encoding='utf-8') as f:
+            _merge(document, json.load(f))
+    with open(paths['output'], encoding='utf-8') as f:
+        assert document == json.load(f)
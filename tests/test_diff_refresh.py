@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+增量刷新：每种输入变化之后
+- 增量刷新的结果与 pipeline 整体重新生成的相同（generated_at、generation 除外）
+- 在上一代快照上应用写出的 JSON Patch 得到这一代快照
+"""
+
+import copy
+import json
+import os
+
+import openpyxl
+import pytest
+
+from chart_format import delta_path, read_chart_data, snapshot_paths, write_chart_data
+from diff_refresh import RANKING_KEYS, _rankings_at, record_key, refresh
+from pipeline import Pipeline
+
+# 模拟导出中数据行的起始行（标题行、分组表头行、字段表头行、合计行之后）
+FIRST_DATA_ROW = 5
+
+# 不参与比较的顶层键
+VOLATILE_KEYS = ['generated_at', 'generation']
+
+
+def apply_patch(document, operations):
+    """应用 JSON Patch（add / remove / replace），返回新文档；数组下标越界时报错（RFC 6902）"""
+    document = copy.deepcopy(document)
+    for operation in operations:
+        parts = [part.replace('~1', '/').replace('~0', '~') for part in operation['path'].split('/')[1:]]
+        parent = document
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        last = parts[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == '-' else int(last)
+            limit = len(parent) if operation['op'] == 'add' else len(parent) - 1
+            assert 0 <= index <= limit, operation['path']
+            if operation['op'] == 'add':
+                parent.insert(index, operation['value'])
+            elif operation['op'] == 'remove':
+                del parent[index]
+            else:
+                parent[index] = operation['value']
+        elif operation['op'] == 'remove':
+            del parent[last]
+        else:
+            parent[last] = operation['value']
+    return document
+
+
+def ranked_keys(paths, dataset):
+    """当前输出中进入各项排名的行的主键"""
+    document = read_chart_data(paths['output'])
+    keys = set()
+    for path, fields in RANKING_KEYS[dataset]:
+        for ranking in _rankings_at(document, path) or []:
+            keys.update(record_key(record, fields) for record in ranking)
+    return keys
+
+
+def edit_sheet(path, edit):
+    book = openpyxl.load_workbook(path)
+    edit(book.active)
+    book.save(path)
+
+
+def data_rows(sheet):
+    return range(FIRST_DATA_ROW, sheet.max_row + 1)
+
+
+def modify_unranked_flow(paths):
+    ranked = ranked_keys(paths, 'flow')
+
+    def edit(sheet):
+        row = next(row for row in data_rows(sheet) if (sheet.cell(row, 1).value,) not in ranked)
+        sheet.cell(row, 2).value += 1
+    edit_sheet(paths['flow'], edit)
+
+
+def backlog_unranked_flow(paths):
+    """不在任何排名中的行积压大量超期流程，进入积压风险排名"""
+    ranked = ranked_keys(paths, 'flow')
+
+    def edit(sheet):
+        row = next(row for row in data_rows(sheet) if (sheet.cell(row, 1).value,) not in ranked)
+        # 第12、13列：未结束流程数、超期未结束流程数
+        sheet.cell(row, 12).value = sheet.cell(row, 13).value = 50000
+    edit_sheet(paths['flow'], edit)
+
+
+def modify_top_flow(paths):
+    def edit(sheet):
+        row = max(data_rows(sheet), key=lambda row: sheet.cell(row, 2).value)
+        sheet.cell(row, 2).value = 0
+    edit_sheet(paths['flow'], edit)
+
+
+def add_top_flow(paths):
+    def edit(sheet):
+        values = [cell.value for cell in sheet[sheet.max_row]]
+        values[0], values[1] = '新增模板', 999999
+        sheet.append(values)
+    edit_sheet(paths['flow'], edit)
+
+
+def remove_unranked_flow(paths):
+    ranked = ranked_keys(paths, 'flow')
+
+    def edit(sheet):
+        rows = [row for row in data_rows(sheet) if (sheet.cell(row, 1).value,) not in ranked]
+        sheet.delete_rows(rows[len(rows) // 2])
+    edit_sheet(paths['flow'], edit)
+
+
+def remove_top_flow(paths):
+    def edit(sheet):
+        sheet.delete_rows(max(data_rows(sheet), key=lambda row: sheet.cell(row, 2).value))
+    edit_sheet(paths['flow'], edit)
+
+
+def modify_unranked_personnel(paths):
+    ranked = ranked_keys(paths, 'personnel')
+
+    def edit(sheet):
+        row = next(row for row in data_rows(sheet)
+                   if (sheet.cell(row, 1).value, sheet.cell(row, 2).value) not in ranked)
+        sheet.cell(row, 4).value += 1
+    edit_sheet(paths['personnel'], edit)
+
+
+def modify_top_personnel(paths):
+    def edit(sheet):
+        row = max(data_rows(sheet), key=lambda row: sheet.cell(row, 4).value)
+        sheet.cell(row, 4).value = 0
+    edit_sheet(paths['personnel'], edit)
+
+
+# (说明, 修改输入, 预期的各数据集刷新方式)
+SCENARIOS = [
+    ('modify_unranked_flow', modify_unranked_flow, {'flow': 'incremental', 'personnel': 'unchanged'}),
+    ('backlog_unranked_flow', backlog_unranked_flow, {'flow': 'incremental', 'personnel': 'unchanged'}),
+    ('modify_top_flow', modify_top_flow, {'flow': 'full', 'personnel': 'unchanged'}),
+    ('add_top_flow', add_top_flow, {'flow': 'incremental', 'personnel': 'unchanged'}),
+    ('remove_unranked_flow', remove_unranked_flow, {'flow': 'incremental', 'personnel': 'unchanged'}),
+    ('remove_top_flow', remove_top_flow, {'flow': 'full', 'personnel': 'unchanged'}),
+    ('modify_unranked_personnel', modify_unranked_personnel, {'flow': 'unchanged', 'personnel': 'incremental'}),
+    ('modify_top_personnel', modify_top_personnel, {'flow': 'unchanged', 'personnel': 'full'}),
+]
+
+
+def full_build(paths, tmp_path):
+    """pipeline 整体重新生成并写出的文档（按 read_chart_data 读回）"""
+    reference = dict(paths, output=str(tmp_path / 'reference' / 'chart_data.json'))
+    document = Pipeline(reference, cache_dir=str(tmp_path / 'reference-cache'), force=True).build_document()
+    write_chart_data(document, reference['output'], sidecars=False, snapshots=0, manifest=False)
+    return read_chart_data(reference['output'])
+
+
+def stable(document):
+    return {key: value for key, value in document.items() if key not in VOLATILE_KEYS}
+
+
+def test_unchanged_inputs_do_not_rewrite(paths):
+    first = refresh(paths)
+    assert first['datasets'] == {'flow': 'full', 'personnel': 'full'}
+    mtime = os.stat(paths['output']).st_mtime_ns
+
+    second = refresh(paths)
+    assert second['datasets'] == {'flow': 'unchanged', 'personnel': 'unchanged'}
+    assert second['generation'] == first['generation']
+    assert os.stat(paths['output']).st_mtime_ns == mtime
+
+
+@pytest.mark.parametrize('name, change, expected', SCENARIOS, ids=[name for name, _, _ in SCENARIOS])
+def test_refresh_matches_pipeline(paths, tmp_path, name, change, expected):
+    refresh(paths)
+    change(paths)
+    result = refresh(paths)
+    assert result['datasets'] == expected
+
+    assert stable(read_chart_data(paths['output'])) == stable(full_build(paths, tmp_path))
+
+
+@pytest.mark.parametrize('name, change, expected', SCENARIOS, ids=[name for name, _, _ in SCENARIOS])
+def test_patch_reproduces_snapshot(paths, name, change, expected):
+    refresh(paths)
+    change(paths)
+    result = refresh(paths)
+
+    (previous_generation, previous_path), (generation, current_path) = snapshot_paths(paths['output'])[-2:]
+    with open(delta_path(paths['output']), encoding='utf-8') as f:
+        delta = json.load(f)
+    assert (delta['from_generation'], delta['to_generation']) == (previous_generation, generation)
+    assert delta['to_generation'] == result['generation']
+    assert len(delta['operations']) == result['operations']
+
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)
+    assert apply_patch(previous, delta['operations']) == current
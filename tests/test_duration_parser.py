@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""时长解析"""
+
+import numpy as np
+
+import duration_parser
+
+
+def test_parse():
+    minutes, valid = duration_parser.parse_duration_minutes(['13天2小时29分', '1.5', '-', None, '45分钟'])
+    assert minutes.tolist() == [18869.0, 90.0, 0.0, 0.0, 45.0]
+    assert valid.tolist() == [True, True, False, False, True]
+
+
+def test_cache_bound(monkeypatch):
+    monkeypatch.setattr(duration_parser, 'MAX_CACHED_DURATIONS', 50)
+    duration_parser.clear_cache()
+    for start in range(0, 300, 30):
+        values = [f'{i}分' for i in range(start, start + 30)]
+        minutes, _ = duration_parser.parse_duration_minutes(values)
+        assert np.array_equal(minutes, np.arange(start, start + 30, dtype='float64'))
+        assert len(duration_parser._duration_cache) <= 50
+    # 最近加入的保留在缓存中
+    assert '299分' in duration_parser._duration_cache
+    duration_parser.clear_cache()
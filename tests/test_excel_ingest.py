@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""工作簿句柄缓存"""
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import excel_ingest
+
+
+@pytest.fixture
+def workbooks(paths, tmp_path):
+    excel_ingest.close_workbooks()
+    copies = []
+    for i in range(excel_ingest.MAX_OPEN_WORKBOOKS + 3):
+        directory = tmp_path / f'dir{i % 2}'
+        directory.mkdir(exist_ok=True)
+        copy = str(directory / f'basic{i}.xlsx')
+        shutil.copy(paths['basic'], copy)
+        copies.append(copy)
+    yield copies
+    excel_ingest.close_workbooks()
+
+
+def test_lru_bound(workbooks):
+    handles = [excel_ingest.open_workbook(path) for path in workbooks]
+    assert len(excel_ingest._workbooks) == excel_ingest.MAX_OPEN_WORKBOOKS
+    # 最近使用的仍在缓存中，返回同一个句柄
+    assert excel_ingest.open_workbook(workbooks[-1]) is handles[-1]
+    assert excel_ingest.open_workbook(workbooks[0]) is not handles[0]
+
+
+def test_close_by_prefix(workbooks):
+    for path in workbooks[:4]:
+        excel_ingest.open_workbook(path)
+    directory = os.path.dirname(workbooks[0])
+    assert excel_ingest.close_workbooks(directory) == 2
+    assert all(not key[0].startswith(directory + os.sep) for key in excel_ingest._workbooks)
+    assert len(excel_ingest._workbooks) == 2
+
+
+def test_borrowed_handle_survives_eviction(workbooks):
+    with excel_ingest.borrow_workbook(workbooks[0]) as workbook:
+        for path in workbooks[1:]:
+            excel_ingest.open_workbook(path)
+        excel_ingest.close_workbooks()
+        assert id(workbook) in excel_ingest._retired
+        # 已移出缓存，但借用期间仍可读取
+        assert not workbook.parse(sheet_name=0).empty
+    assert excel_ingest._retired == {}
+    assert excel_ingest._borrowed == {}
+
+
+def test_concurrent_reads(workbooks, monkeypatch):
+    monkeypatch.setattr(excel_ingest, 'MAX_OPEN_WORKBOOKS', 2)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        frames = list(pool.map(lambda path: excel_ingest.read_sheet(path), workbooks * 3))
+    assert all(not frame.empty for frame in frames)
+    assert excel_ingest._borrowed == {}
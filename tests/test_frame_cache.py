@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""多个进程同时读写同一缓存目录"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import frame_cache
+
+
+def _build(source_path):
+    return pd.DataFrame({'source': [os.path.basename(source_path)] * 100, 'value': range(100)})
+
+
+def _load(source_path, cache_dir):
+    return len(frame_cache.cached_frame(source_path, _build, 'test', cache_dir))
+
+
+def test_concurrent_writers(tmp_path):
+    # 每个源文件第一次使用时都要写索引；不同文件的索引写入互相交错，同一文件的缓存写入也互相交错
+    sources = []
+    for i in range(32):
+        path = tmp_path / f'source{i}.txt'
+        path.write_text(str(i))
+        sources.append(str(path))
+    sources = sources * 3
+    cache_dir = str(tmp_path / 'cache')
+    with ProcessPoolExecutor(max_workers=8) as executor:
+        lengths = list(executor.map(_load, sources, [cache_dir] * len(sources)))
+
+    assert lengths == [100] * len(sources)
+    with open(os.path.join(cache_dir, 'index.json'), encoding='utf-8') as f:
+        index = json.load(f)
+    assert set(index) == set(sources)
+    assert not [name for name in os.listdir(cache_dir) if name.endswith('.tmp')]
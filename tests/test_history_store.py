@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""历史数据入库：导出中可选的列缺失时按0入库"""
+
+from history_store import HistoryStore
+from process_data import load_flow_frame
+
+OPTIONAL_FLOW_COLUMNS = ['未结束流程数', '超期未结束流程数']
+
+
+def test_ingest_flow_without_optional_columns(paths):
+    df = load_flow_frame(paths['flow'])
+    with HistoryStore(':memory:') as store:
+        assert store.ingest_flow('2025-05', df, 'full')
+        assert store.ingest_flow('2025-06', df.drop(columns=OPTIONAL_FLOW_COLUMNS), 'partial')
+        rows = store.conn.execute(
+            'SELECT 期间, SUM(发起流程数) AS 发起, SUM(未结束流程数) AS 未结束, SUM(超期未结束流程数) AS 超期 '
+            'FROM 流程历史 GROUP BY 期间 ORDER BY 期间').fetchall()
+    full, partial = [dict(row) for row in rows]
+    assert full['未结束'] > 0
+    assert partial['发起'] == full['发起']
+    assert (partial['未结束'], partial['超期']) == (0, 0)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""姓名规范化（NFKC、全角空格、零宽字符）和按别名匹配"""
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from name_index import ALIAS_SHEET, NameIndex, load_name_aliases, main_person_rows, normalize_name, normalize_names
+
+RAW_NAMES = ['张\u3000三', ' 李四 ', '王\u200b五', '\ufeff赵六', 'ＡＢＣ', 'Ｌｉ Ｍｉｎｇ', '', None, float('nan')]
+EXPECTED = ['张三', '李四', '王五', '赵六', 'ABC', 'LiMing', None, None, None]
+
+
+def test_normalize_name():
+    assert [normalize_name(name) for name in RAW_NAMES] == EXPECTED
+    assert normalize_name(123) == '123'
+
+
+def test_normalize_names_matches_scalar():
+    # 缺失值可能是 None 或 NaN，建索引时都按缺失处理
+    result = normalize_names(RAW_NAMES)
+    assert [None if pd.isna(value) else value for value in result.tolist()] == EXPECTED
+
+
+def test_lookup_normalized_names():
+    index = NameIndex(['张三', '李\u3000四', '王五', '张 三'])
+    rows, missing = index.lookup(['张\u200b三', '李四', '孙七', '张三'])
+    assert rows.tolist() == [0, 1, 3]
+    assert missing == ['孙七']
+    assert index.mask(['王五']).tolist() == [False, False, True, False]
+
+
+def test_lookup_with_aliases():
+    index = NameIndex(['张三', '小李', 'Ｌｉ Ｓｉ', '王五'], aliases={'小李': '李四', 'Li Si': '李\u3000四'})
+    assert index.canonical('小\u200b李') == '李四'
+    rows, missing = index.lookup(['李四'])
+    assert rows.tolist() == [1, 2]
+    assert missing == []
+    # 别名换算后本名不再单独出现
+    assert index.lookup(['小李'])[0].tolist() == [1, 2]
+
+
+def test_load_name_aliases(tmp_path):
+    path = str(tmp_path / '基本信息.xlsx')
+    book = openpyxl.Workbook()
+    book.active.title = '主要负责人'
+    book.active.append(['李四'])
+    sheet = book.create_sheet(ALIAS_SHEET)
+    for row in [['小李', '李\u3000四'], ['张三', '张三'], [None, '王五'], ['Ｌｉ Ｓｉ', '李四']]:
+        sheet.append(row)
+    book.save(path)
+
+    assert load_name_aliases(path) == {'小李': '李四', 'LiSi': '李四'}
+
+
+def test_load_name_aliases_without_sheet(tmp_path):
+    path = str(tmp_path / '基本信息.xlsx')
+    openpyxl.Workbook().save(path)
+    assert load_name_aliases(path) == {}
+
+
+def test_main_person_rows(paths):
+    import generate_personnel_rankings as personnel
+
+    df = personnel._load_personnel_frame(paths['personnel'])
+    main_persons = personnel.load_main_responsible_persons(paths['basic'])
+    rows = main_person_rows(df, main_persons)
+    expected = np.flatnonzero(normalize_names(df['人员名称']).isin([normalize_name(n) for n in main_persons]))
+    assert rows.tolist() == expected.tolist()
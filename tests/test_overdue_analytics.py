@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""积压风险分：只由本行的未结束流程数和超期未结束流程数决定"""
+
+import numpy as np
+import pandas as pd
+
+from overdue_analytics import BACKLOG_OPEN_SCALE, backlog_risk_scores, template_overdue_analytics
+
+
+def test_backlog_risk_scores():
+    open_counts = np.array([0, 55, 2812, 10, BACKLOG_OPEN_SCALE, 5 * BACKLOG_OPEN_SCALE], dtype='float64')
+    overdue = np.array([0, 1, 0, 10, BACKLOG_OPEN_SCALE, 0], dtype='float64')
+    scores = backlog_risk_scores(open_counts, overdue)
+    assert scores.tolist() == [0.0, 18.6, 34.5, 70.4, 100.0, 40.0]
+
+
+def test_backlog_risk_scale_stable():
+    # 新增一行很大的积压不改变其他行的分数
+    open_counts = np.array([55, 2812], dtype='float64')
+    overdue = np.array([1, 0], dtype='float64')
+    before = backlog_risk_scores(open_counts, overdue)
+    after = backlog_risk_scores(np.append(open_counts, 10 ** 6), np.append(overdue, 10 ** 6))
+    assert after[:2].tolist() == before.tolist()
+
+
+def test_backlog_risk_ranking():
+    df = pd.DataFrame({
+        '模板名称': ['少量超期', '大量积压', '无积压'],
+        '未结束流程数': [55, 2812, 0],
+        '超期未结束流程数': [1, 0, 0],
+    })
+    ranking = template_overdue_analytics(df)['backlog_risk_ranking']
+    assert [record['模板名称'] for record in ranking] == ['大量积压', '少量超期']
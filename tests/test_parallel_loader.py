@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""进程池执行：任务出错时抛出任务的异常，不退回串行重跑"""
+
+import os
+
+import pytest
+
+from parallel_loader import run_jobs
+
+
+def _square(x):
+    return x * x
+
+
+def _record_and_fail(marker_dir, name):
+    # 每执行一次留下一个文件，用来确认任务没有被重跑
+    with open(os.path.join(marker_dir, f'{name}-{os.getpid()}'), 'w'):
+        pass
+    raise FileNotFoundError(f'missing {name}')
+
+
+def test_results():
+    assert run_jobs({i: (_square, (i,)) for i in range(4)}, workers=2) == {0: 0, 1: 1, 2: 4, 3: 9}
+
+
+def test_job_oserror_propagates(tmp_path, capsys):
+    jobs = {'a': (_record_and_fail, (str(tmp_path), 'a')), 'b': (_square, (3,))}
+    with pytest.raises(FileNotFoundError, match='missing a'):
+        run_jobs(jobs, workers=2)
+    assert '串行' not in capsys.readouterr().out
+    assert len(os.listdir(tmp_path)) == 1
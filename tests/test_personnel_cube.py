@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""汇总立方体的排序：取值相同的分组在升序、降序中都保持文件中的先后顺序"""
+
+import pandas as pd
+
+from personnel_cube import PersonnelCube
+
+
+def _cube():
+    return PersonnelCube(pd.DataFrame({
+        '人员名称': ['甲', '乙', '丙', '丁', '戊'],
+        '部门名称': ['销售部', '销售部', '财务部', '财务部', '研发部'],
+        '单位名称': ['总公司'] * 5,
+        '处理数': [5, 3, 5, 1, 3],
+        '平均处理时长': ['1小时', '2小时', '', '30分钟', '1天'],
+        '超期处理数': [0, 1, 0, 0, 2],
+        '未处理流程数': [1, 0, 2, 0, 1],
+    }))
+
+
+def test_top_k_ties_keep_file_order():
+    cube = _cube()
+    names = lambda records: [record['名称'] for record in records]  # noqa: E731
+    assert names(cube.top_k('person', k=0)) == ['甲', '丙', '乙', '戊', '丁']
+    assert names(cube.top_k('person', k=0, ascending=True)) == ['丁', '乙', '戊', '甲', '丙']
+    assert names(cube.top_k('person', k=2, ascending=True)) == ['丁', '乙']
+
+
+def test_top_k_ascending_with_filter():
+    cube = _cube()
+    records = cube.top_k('person', k=0, ascending=True, department='销售部')
+    assert [(record['排名'], record['名称']) for record in records] == [(1, '乙'), (2, '甲')]
+    # 升序、降序的排序结果分别缓存，互不影响
+    assert [record['名称'] for record in cube.top_k('person', k=1)] == ['甲']
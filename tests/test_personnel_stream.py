@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""流式读取按文件内容选择读取方式"""
+
+import os
+import shutil
+
+from conftest import ROOT
+from personnel_stream import iter_sheet_rows
+
+
+def test_xlsx_named_xls(paths, tmp_path):
+    renamed = str(tmp_path / '人员效率明细.xls')
+    shutil.copy(paths['personnel'], renamed)
+    rows = list(iter_sheet_rows(renamed))
+    assert rows == list(iter_sheet_rows(paths['personnel']))
+    assert len(rows) > 300
+
+
+def test_real_xls():
+    # 仓库中的 流程效率明细.xls 是真实导出（OLE 复合文档），走 xlrd
+    rows = list(iter_sheet_rows(os.path.join(ROOT, '流程效率明细.xls')))
+    assert rows[2][0] == '模板名称'
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+SQL 排名与 NumPy 排名一致：sqlite 后端的 flow_ranking_rows、personal_process_rows、rollup
+分别与 ranking.top_k_indices / compute_flow_rankings、PersonnelCube.top_k 比较，包括并列和缺失值
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import query_engine
+from personnel_cube import LEVELS, MEASURES, PersonnelCube
+from ranking import compute_flow_rankings, top_k_indices
+
+nan = float('nan')
+
+# 并列（发起流程数 5、平均运行时长 30）、缺失值（None / NaN）、0 和负数
+FLOW_DATA = [
+    {'模板名称': 'A', '发起流程数': 5, '平均运行时长_数值': 30.0},
+    {'模板名称': 'B', '发起流程数': None, '平均运行时长_数值': 60.0},
+    {'模板名称': 'C', '发起流程数': 5, '平均运行时长_数值': nan},
+    {'模板名称': 'D', '发起流程数': 0, '平均运行时长_数值': 30.0},
+    {'模板名称': 'E', '发起流程数': 8, '平均运行时长_数值': 0.0},
+    {'模板名称': 'F', '发起流程数': 5, '平均运行时长_数值': 30.0},
+    {'模板名称': 'G', '发起流程数': -1, '平均运行时长_数值': None},
+    {'模板名称': 'A', '发起流程数': 2, '平均运行时长_数值': 45.0},
+]
+CATEGORIES = {'甲类': ['A', 'C', 'F', '不存在'], '乙类': ['B', 'D', 'E', 'G'], '空类': []}
+
+# 多列排序：次要排序列的缺失值排在最后
+MULTI_KEY_SPECS = [
+    {'name': 'desc', 'keys': ['发起流程数', '平均运行时长_数值'], 'k': 5, 'positive_only': False},
+    {'name': 'asc', 'keys': ['发起流程数', '平均运行时长_数值'], 'k': None, 'ascending': True},
+    {'name': 'positive', 'keys': ['平均运行时长_数值'], 'k': 3, 'positive_only': True},
+    {'name': 'none', 'keys': ['发起流程数'], 'k': 0},
+]
+
+
+@pytest.fixture
+def engine():
+    with query_engine.QueryEngine('sqlite') as engine:
+        yield engine
+
+
+def _personnel():
+    """处理数并列、缺失，单位 / 部门缺失，时长无效"""
+    return pd.DataFrame({
+        '人员名称': ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛'],
+        '部门名称': ['销售部', '销售部', '财务部', None, '研发部', '财务部', '销售部', '研发部'],
+        '单位名称': ['总公司', '总公司', '分公司', '分公司', None, '分公司', '总公司', None],
+        '处理数': [5, 3, 5, nan, 3, 0, 5, 2],
+        '处理数_数值': [5, 3, 5, nan, 3, 0, 5, 2],
+        '平均处理时长': ['1小时', '2小时', '', '30分钟', '1天', '-', '2小时', '1小时'],
+        '超期处理数': [0, 1, 0, 0, 2, nan, 1, 0],
+        '未处理流程数': [1, 0, 2, 0, 1, 0, 1, 1],
+    })
+
+
+@pytest.mark.parametrize('specs', [None, MULTI_KEY_SPECS], ids=['default', 'multi_key'])
+def test_flow_ranking_parity(engine, specs):
+    expected = compute_flow_rankings(FLOW_DATA, CATEGORIES, specs)
+    assert query_engine.flow_ranking_rows(engine, FLOW_DATA, CATEGORIES, specs) == expected
+
+
+def test_flow_ranking_parity_on_export(engine, paths):
+    import process_data
+
+    data = process_data.process_flow_efficiency_data(paths['flow'])['data']
+    categories = process_data.process_flow_categories(paths['basic'])['categories']
+    expected = compute_flow_rankings(data, categories)
+    assert query_engine.flow_ranking_rows(engine, data, categories) == expected
+
+
+@pytest.mark.parametrize('k', [3, 20])
+def test_personal_process_rows_parity(engine, k):
+    df = _personnel()
+    counts = df['处理数_数值'].to_numpy(dtype='float64')
+    expected = top_k_indices([counts], k, mask=counts > 0)
+    assert query_engine.personal_process_rows(engine, df, k).tolist() == expected.tolist()
+
+
+def test_main_person_rows_parity(engine):
+    df = _personnel()
+    main_rows = np.array([0, 2, 3, 4, 5, 6])
+    counts = df['处理数_数值'].to_numpy(dtype='float64')[main_rows]
+    expected = main_rows[top_k_indices([counts], 2, mask=counts > 0)]
+    assert query_engine.main_person_process_rows(engine, df, main_rows, k=2).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('ascending', [False, True])
+def test_rollup_parity(engine, level, ascending):
+    df = _personnel()
+    cube = PersonnelCube(df)
+    for measure in MEASURES:
+        for stat in ['sum', 'mean', 'count']:
+            for k in [0, 2]:
+                expected = cube.top_k(level, measure, stat, k=k, ascending=ascending)
+                result = query_engine.rollup(engine, df, level, measure, stat, k=k, ascending=ascending)
+                assert result == expected, (measure, stat, k)
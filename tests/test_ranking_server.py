@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""排名服务的冒烟测试：直接调用 RankingServer.handle，不监听端口"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ranking_server
+from ranking_server import RankingData, RankingServer, Request
+
+
+@pytest.fixture
+def server(paths, data_dir):
+    return RankingServer(RankingData(paths), data_dir)
+
+
+def get(server, target, headers=None):
+    return asyncio.run(server.handle(Request('GET', target, headers or {})))
+
+
+@pytest.mark.parametrize('target', ['/rankings/flow?k=3', '/rankings/duration?k=3', '/rankings/personal_process?k=3',
+                                    '/rollups/department?k=2'])
+def test_query_endpoints(server, target):
+    response = get(server, target)
+    assert response.status == 200, response.body
+    payload = json.loads(response.body)
+    assert payload['success'] is True
+    assert 0 < len(payload['data']) <= 3
+
+
+def test_query_etag(server):
+    first = get(server, '/rankings/flow?k=3')
+    second = get(server, '/rankings/flow?k=3', {'if-none-match': first.headers['ETag']})
+    assert second.status == 304
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+
+def test_concurrent_refresh_loads_once(paths, monkeypatch):
+    data = RankingData(paths)
+    old_state = data.state
+    loads = []
+    build = ranking_server.RankingState
+
+    def counting_state(*args):
+        loads.append(args)
+        return build(*args)
+    monkeypatch.setattr(ranking_server, 'RankingState', counting_state)
+
+    stat = os.stat(paths['flow'])
+    os.utime(paths['flow'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: data.refresh_if_changed(), range(8)))
+
+    assert len(loads) == 1
+    assert results.count(True) == 1
+    assert data.state is not old_state
+    # 旧数据保持完整，正在使用它的查询不受影响
+    assert old_state.ranking('flow', k=3)['data'] == data.state.ranking('flow', k=3)['data']
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""排序索引：文字列的排序与浏览器的 localeCompare('zh-CN') 一致，locale 路径不改变进程的 locale 设置"""
+
+import json
+import locale
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import sort_index
+
+
+@pytest.fixture
+def locale_keys(monkeypatch):
+    # 测试环境不一定装有 zh_CN locale，用 C.UTF-8 验证 strxfrm 路径本身；sys.modules 中置 None 使 import icu 失败
+    monkeypatch.setitem(sys.modules, 'icu', None)
+    monkeypatch.setattr(sort_index, 'COLLATION_TABLE', '/nonexistent/zh_collation.txt')
+    monkeypatch.setattr(sort_index, 'ZH_LOCALES', ['C.UTF-8'])
+    monkeypatch.setattr(sort_index, '_collation_keys', False)
+    if sort_index.collation_keys() is None:
+        pytest.skip('没有 C.UTF-8 locale')
+
+
+@pytest.fixture
+def table_keys(monkeypatch):
+    """不用 PyICU，只用排序表"""
+    monkeypatch.setitem(sys.modules, 'icu', None)
+    monkeypatch.setattr(sort_index, '_collation_keys', False)
+    return sort_index.collation_keys()
+
+
+# 顺序由 Intl.Collator('zh-CN') 得出：标点、数字、汉字（按拼音，多音字取常用读音）、拉丁字母
+TEXTS = ['张三', '安娜', 'Zoe', 'abc', 'ABC', '10', '2', '（测试）', '(测试)', 'IT需求申请', 'Ⅱ期工程',
+         '重庆分公司', '长沙分公司', '行政部', '银行', '李四', '李 四', '']
+ICU_ORDER = [17, 8, 7, 5, 6, 1, 11, 16, 15, 13, 14, 0, 12, 3, 4, 10, 9, 2]
+
+
+def test_text_permutation(locale_keys):
+    before = locale.setlocale(locale.LC_COLLATE)
+    values = ['c', None, 'a', 'b', 'a']
+    assert sort_index.sort_permutation(values, '人员名称') == [1, 2, 4, 3, 0]
+    assert locale.setlocale(locale.LC_COLLATE) == before
+
+
+def test_threads(locale_keys):
+    values = [f'name{i % 97:03d}' for i in range(2000)]
+    expected = sorted(range(len(values)), key=values.__getitem__)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: sort_index.sort_permutation(values, '人员名称'), range(16)))
+    assert all(result == expected for result in results)
+
+
+def test_table_order(table_keys):
+    assert sort_index.sort_permutation(TEXTS, '模板名称') == ICU_ORDER
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='没有 node')
+def test_table_matches_icu(table_keys, export_dir):
+    from personnel_stream import iter_sheet_rows
+    texts = sorted({str(value) for name in ['流程效率明细.xlsx', '人员效率明细.xlsx']
+                    for row in iter_sheet_rows(f'{export_dir}/{name}') for value in row[:3] if value})
+    script = ("const texts = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+              "console.log(JSON.stringify(texts.sort(new Intl.Collator('zh-CN').compare)));")
+    result = subprocess.run(['node', '-e', script], input=json.dumps(texts), capture_output=True, text=True, check=True)
+    permutation = sort_index.sort_permutation(texts, '模板名称')
+    assert [texts[i] for i in permutation] == json.loads(result.stdout)
+
+
+def test_no_collation_drops_text_columns(monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, 'icu', None)
+    monkeypatch.setattr(sort_index, 'COLLATION_TABLE', '/nonexistent/zh_collation.txt')
+    monkeypatch.setattr(sort_index, 'ZH_LOCALES', ['xx_XX.invalid'])
+    monkeypatch.setattr(sort_index, '_collation_keys', False)
+    document = {'data': {'raw_data': [{'模板名称': '安', '发起流程数': 1}]}}
+    assert list(sort_index.build_sort_indexes(document)['raw_data']) == ['发起流程数']
+    assert '模板名称' in capsys.readouterr().out
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""上传处理：结果与 chart_data.json 格式相同，临时文件的句柄不留在缓存中"""
+
+import json
+import os
+
+import excel_ingest
+from upload_handler import UPLOAD_FIELDS, process_upload
+
+
+def test_process_upload_releases_workbooks(paths, tmp_path):
+    excel_ingest.close_workbooks()
+    parts = {}
+    for field, key in UPLOAD_FIELDS.items():
+        parts[field] = {'filename': os.path.basename(paths[key]), 'file': open(paths[key], 'rb'),
+                        'size': os.path.getsize(paths[key])}
+    try:
+        body = process_upload(parts, str(tmp_path / 'cache'))
+    finally:
+        for part in parts.values():
+            part['file'].close()
+
+    document = json.loads(body)
+    assert document['success'] is True
+    assert document['format_version'] == 2
+    assert not [key for key in excel_ingest._workbooks if 'lcjx-upload-' in key[0]]
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""常驻进程：转交执行与在本进程执行的结果相同"""
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import pytest
+
+import lcjx
+import settings
+import worker_daemon
+from chart_format import read_chart_data
+from settings import DATA_DIR_ENV, INPUT_KEYS
+
+
+@pytest.fixture
+def daemon():
+    directory = tempfile.mkdtemp(prefix='lcjx-test-')
+    server = worker_daemon.WorkerServer(os.path.join(directory, 'daemon.sock'))
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def send(socket_path, argv, env):
+    """以给定的客户端环境变量发送一条请求，返回退出码"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps({'argv': argv, 'cwd': os.getcwd(), 'env': env}).encode('utf-8') + b'\n')
+        with client.makefile('rb') as replies:
+            for line in replies:
+                message = json.loads(line)
+                if 'exit' in message:
+                    return message['exit']
+
+
+def stable(document):
+    return {key: value for key, value in document.items() if key not in ['generated_at', 'generation']}
+
+
+def test_client_without_data_dir_uses_default(daemon, paths, tmp_path, monkeypatch):
+    # 默认数据目录中是输入文件；常驻进程启动时设置的数据目录是空的
+    default_dir = tmp_path / 'default'
+    default_dir.mkdir()
+    for key in INPUT_KEYS:
+        shutil.copy(paths[key], default_dir / settings.FILE_NAMES[key])
+    monkeypatch.setattr(settings, 'DEFAULT_DATA_DIR', str(default_dir))
+    daemon_dir = tmp_path / 'daemon'
+    daemon_dir.mkdir()
+    monkeypatch.setenv(DATA_DIR_ENV, str(daemon_dir))
+    output = settings.data_path('output', str(default_dir))
+
+    assert send(daemon, ['pipeline', '--force'], {}) == 0
+    assert os.environ[DATA_DIR_ENV] == str(daemon_dir)
+    assert not os.listdir(daemon_dir)
+    from_daemon = read_chart_data(output)
+
+    monkeypatch.delenv(DATA_DIR_ENV)
+    assert lcjx.run_local(['pipeline', '--force']) == 0
+    assert stable(read_chart_data(output)) == stable(from_daemon)
+
+
+def test_client_env_is_forwarded(daemon, paths, data_dir, tmp_path, monkeypatch):
+    for key in INPUT_KEYS:
+        os.replace(paths[key], os.path.join(data_dir, settings.FILE_NAMES[key]))
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path / 'daemon'))
+
+    assert send(daemon, ['pipeline', '--force'], {DATA_DIR_ENV: data_dir}) == 0
+    assert read_chart_data(settings.data_path('output', data_dir))['success'] is True
+    assert os.environ[DATA_DIR_ENV] == str(tmp_path / 'daemon')
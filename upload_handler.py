@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传处理模块 - 仪表盘上传的三个 Excel 文件在服务端处理
+multipart/form-data 请求体边接收边拆分，每个文件写入 SpooledTemporaryFile（小文件留在内存，大文件落盘），
+再交给与静态数据相同的 pipeline 生成排名，返回与 chart_data.json 相同的 v2 紧凑 JSON
+"""
+
+import os
+import re
+import shutil
+import tempfile
+
+from chart_format import dumps
+from excel_ingest import close_workbooks
+from pipeline import Pipeline
+
+# 上传字段名 -> pipeline 的输入文件键
+UPLOAD_FIELDS = {
+    'processEfficiency': 'flow',
+    'personnelEfficiency': 'personnel',
+    'basicInfo': 'basic',
+}
+
+# 允许上传的文件类型
+UPLOAD_EXTENSIONS = ['.xls', '.xlsx']
+
+# 单个文件超过该大小后由内存转存到磁盘
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# 整个请求体的大小上限
+MAX_UPLOAD_SIZE = 512 * 1024 * 1024
+
+# 每次从连接读取的字节数
+READ_CHUNK_SIZE = 256 * 1024
+
+
+class UploadError(ValueError):
+    """上传内容不符合要求"""
+
+
+def multipart_boundary(content_type):
+    """从 Content-Type 中取出 multipart 分隔符"""
+    if not content_type.lower().startswith('multipart/form-data'):
+        raise UploadError("请求必须是 multipart/form-data")
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if not match:
+        raise UploadError("缺少 multipart 分隔符")
+    return match.group(1).encode('latin-1')
+
+
+def _parse_part_headers(raw):
+    """解析一个部分的头部，返回 (字段名, 文件名)"""
+    disposition = ''
+    for line in raw.decode('utf-8', 'replace').split('\r\n'):
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-disposition':
+            disposition = value
+    name = re.search(r'\bname="([^"]*)"', disposition)
+    filename = re.search(r'\bfilename="([^"]*)"', disposition)
+    return (name.group(1) if name else None), (filename.group(1) if filename else None)
+
+
+class MultipartSpooler:
+    """
+    流式拆分 multipart 请求体：feed() 逐块写入，每个文件部分写入各自的 SpooledTemporaryFile
+    只在内存中保留不超过一个分隔符长度的未决数据
+    """
+
+    def __init__(self, boundary, spool_max_size=SPOOL_MAX_SIZE):
+        self.delimiter = b'\r\n--' + boundary
+        self.spool_max_size = spool_max_size
+        # 在请求体前补上 CRLF，第一个分隔符就与后续分隔符形式相同
+        self.buffer = b'\r\n'
+        self.state = 'preamble'
+        self.current = None
+        # 字段名 -> {'filename', 'file', 'size'}
+        self.parts = {}
+
+    def feed(self, data):
+        self.buffer += data
+        while True:
+            if self.state == 'preamble':
+                index = self.buffer.find(self.delimiter)
+                if index < 0:
+                    self.buffer = self.buffer[-len(self.delimiter):]
+                    return
+                self.buffer = self.buffer[index + len(self.delimiter):]
+                self.state = 'after_delimiter'
+            elif self.state == 'after_delimiter':
+                if len(self.buffer) < 2:
+                    return
+                if self.buffer.startswith(b'--'):
+                    self.state = 'done'
+                    self.buffer = b''
+                    return
+                self.state = 'headers'
+            elif self.state == 'headers':
+                index = self.buffer.find(b'\r\n\r\n')
+                if index < 0:
+                    if len(self.buffer) > 64 * 1024:
+                        raise UploadError("multipart 头部过长")
+                    return
+                name, filename = _parse_part_headers(self.buffer[:index].lstrip(b'\r\n'))
+                self.buffer = self.buffer[index + 4:]
+                self.current = None
+                if name in UPLOAD_FIELDS and filename:
+                    self.current = {
+                        'filename': filename,
+                        'file': tempfile.SpooledTemporaryFile(max_size=self.spool_max_size),
+                        'size': 0,
+                    }
+                    self.parts[name] = self.current
+                self.state = 'body'
+            elif self.state == 'body':
+                index = self.buffer.find(self.delimiter)
+                if index < 0:
+                    # 末尾可能是被截断的分隔符，保留下来等待下一块
+                    keep = len(self.delimiter) - 1
+                    self._write(self.buffer[:-keep])
+                    self.buffer = self.buffer[-keep:]
+                    return
+                self._write(self.buffer[:index])
+                self.buffer = self.buffer[index + len(self.delimiter):]
+                self.state = 'after_delimiter'
+            else:
+                return
+
+    def _write(self, data):
+        if self.current is not None and data:
+            self.current['file'].write(data)
+            self.current['size'] += len(data)
+
+    def finish(self):
+        """请求体读取完毕，检查是否完整"""
+        if self.state != 'done':
+            raise UploadError("multipart 请求体不完整")
+        for part in self.parts.values():
+            part['file'].seek(0)
+        return self.parts
+
+    def close(self):
+        for part in self.parts.values():
+            part['file'].close()
+
+
+async def receive_upload(reader, content_type, content_length, max_size=MAX_UPLOAD_SIZE):
+    """
+    从连接中流式读取上传的请求体
+
+    返回:
+    {字段名: {'filename', 'file', 'size'}}，调用方负责关闭各文件
+    """
+    if content_length is None:
+        raise UploadError("缺少 Content-Length")
+    if content_length > max_size:
+        raise UploadError(f"上传内容过大: {content_length} 字节")
+
+    spooler = MultipartSpooler(multipart_boundary(content_type))
+    remaining = content_length
+    try:
+        while remaining > 0:
+            data = await reader.read(min(READ_CHUNK_SIZE, remaining))
+            if not data:
+                raise UploadError("连接在上传完成前断开")
+            remaining -= len(data)
+            spooler.feed(data)
+        return spooler.finish()
+    except Exception:
+        spooler.close()
+        raise
+
+
+def process_upload(parts, cache_dir=None):
+    """
+    用 pipeline 处理上传的文件
+
+    参数:
+    parts: receive_upload 的返回值
+    cache_dir: pipeline 步骤结果缓存目录；内容相同的文件再次上传时直接复用结果
+
+    返回:
+    v2 紧凑格式的 JSON 字节串
+    """
+    missing = [name for name in UPLOAD_FIELDS if name not in parts]
+    if missing:
+        raise UploadError(f"缺少上传文件: {', '.join(missing)}")
+
+    with tempfile.TemporaryDirectory(prefix='lcjx-upload-') as work_dir:
+        paths = {'output': os.path.join(work_dir, 'chart_data.json')}
+        for field, key in UPLOAD_FIELDS.items():
+            part = parts[field]
+            extension = os.path.splitext(part['filename'])[1].lower()
+            if extension not in UPLOAD_EXTENSIONS:
+                raise UploadError(f"请选择Excel文件(.xlsx或.xls格式): {part['filename']}")
+            if part['size'] == 0:
+                raise UploadError(f"上传的文件为空: {part['filename']}")
+
+            # 解析器需要按扩展名区分 .xls/.xlsx，落到临时目录中的同类型文件
+            paths[key] = os.path.join(work_dir, key + extension)
+            with open(paths[key], 'wb') as f:
+                shutil.copyfileobj(part['file'], f, READ_CHUNK_SIZE)
+
+        try:
+            pipeline = Pipeline(paths, cache_dir=cache_dir)
+            document = pipeline.build_document()
+        finally:
+            # 临时目录随后删除，这些文件的句柄不会再用到，不能留在常驻进程的句柄缓存中
+            close_workbooks(work_dir)
+    return dumps(document)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻工作进程 - 通过 Unix socket 接收 lcjx.py 的子命令并在进程内执行
+调度器每小时多次调用各脚本时，每次都要重新启动解释器、导入 pandas/NumPy、打开工作簿；
+常驻进程只在启动时导入一次，打开过的工作簿句柄（excel_ingest）、时长解析缓存等
+在各次调用之间保持有效，lcjx.py 发现常驻进程在运行时直接把命令转交给它。
+
+协议：每条消息是一行 JSON。
+客户端发送 {"argv": [...], "cwd": "...", "env": {...}}；
+常驻进程逐段返回 {"stream": "stdout"|"stderr", "data": "..."}，最后返回 {"exit": 退出码}。
+请求逐个串行执行（各命令会切换工作目录、写同一个 chart_data.json，不能并发）
+"""
+
+import argparse
+import importlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+import lcjx
+
+# 停止常驻进程的特殊命令
+STOP_COMMAND = '__stop__'
+PING_COMMAND = '__ping__'
+
+# 转交给常驻进程的环境变量前缀（其余环境变量以常驻进程启动时为准）
+FORWARDED_ENV_PREFIX = 'LCJX_'
+
+# 客户端连接超时（秒）；连接不上时回退到本进程执行
+CONNECT_TIMEOUT = 1.0
+
+
+def default_socket_path():
+    """默认的 socket 路径：$LCJX_SOCKET，否则放在 $XDG_RUNTIME_DIR 或临时目录下，按用户区分"""
+    if os.environ.get('LCJX_SOCKET'):
+        return os.environ['LCJX_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f'lcjx-{os.getuid()}.sock')
+
+
+def _send(connection, message):
+    connection.sendall(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+class _StreamWriter(io.TextIOBase):
+    """把 print 的输出逐段发回客户端"""
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            _send(self.connection, {'stream': self.name, 'data': text})
+        return len(text)
+
+
+class _EnvOverride:
+    """
+    请求执行期间使用客户端的 LCJX_* 环境变量：
+    设置客户端转交的，并去掉常驻进程有而客户端没有的，与客户端在本进程执行时一致
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.saved = {}
+
+    def __enter__(self):
+        own = [key for key in os.environ if key.startswith(FORWARDED_ENV_PREFIX)]
+        for key in set(own) | set(self.env):
+            self.saved[key] = os.environ.get(key)
+        for key in own:
+            if key not in self.env:
+                del os.environ[key]
+        os.environ.update(self.env)
+        return self
+
+    def __exit__(self, *exc):
+        for key, value in self.saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def execute(argv, cwd, env, stdout, stderr):
+    """在本进程中执行一条子命令，返回退出码"""
+    previous_cwd = os.getcwd()
+    try:
+        os.chdir(cwd)
+        with _EnvOverride(env), redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                return lcjx.run_local(argv)
+            except SystemExit as e:
+                return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                return 1
+    finally:
+        os.chdir(previous_cwd)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            argv = list(request['argv'])
+        except (ValueError, KeyError, TypeError):
+            _send(self.connection, {'stream': 'stderr', 'data': '无法解析的请求\n'})
+            _send(self.connection, {'exit': 2})
+            return
+
+        if argv == [PING_COMMAND]:
+            _send(self.connection, {'exit': 0, 'pid': os.getpid()})
+            return
+        if argv == [STOP_COMMAND]:
+            _send(self.connection, {'exit': 0})
+            # shutdown() 会等待 serve_forever 返回，不能在处理请求的线程里直接调用
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+
+        env = {key: str(value) for key, value in (request.get('env') or {}).items()
+               if key.startswith(FORWARDED_ENV_PREFIX)}
+        code = execute(argv, request.get('cwd') or os.getcwd(), env,
+                       _StreamWriter(self.connection, 'stdout'), _StreamWriter(self.connection, 'stderr'))
+        _send(self.connection, {'exit': code})
+
+
+class WorkerServer(socketserver.UnixStreamServer):
+    """串行处理请求的 Unix socket 服务"""
+
+    def __init__(self, socket_path):
+        # 只允许当前用户连接：绑定前收紧 umask，socket 文件创建时就是 0600
+        previous_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+
+def warm_up(data_dir=None):
+    """
+    预先导入各子命令的模块；给出数据目录时预先打开其中的工作簿
+    """
+    for name in lcjx.WARM_COMMANDS:
+        importlib.import_module(lcjx.COMMANDS[name][0])
+    if data_dir:
+        from excel_ingest import open_workbook
+        from settings import INPUT_KEYS, default_paths
+        paths = default_paths(data_dir)
+        for path in (paths[key] for key in INPUT_KEYS):
+            if os.path.exists(path):
+                open_workbook(path)
+
+
+def request(argv, socket_path=None, stdout=None, stderr=None):
+    """
+    把子命令交给常驻进程执行
+
+    返回:
+    退出码；常驻进程没有运行时返回 None（调用方自行在本进程执行）
+    """
+    socket_path = socket_path or default_socket_path()
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(CONNECT_TIMEOUT)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        return None
+
+    # 连接成功后不再限时，命令本身可能运行很久
+    client.settimeout(None)
+    env = {key: value for key, value in os.environ.items() if key.startswith(FORWARDED_ENV_PREFIX)}
+    with client, client.makefile('rb') as replies:
+        _send(client, {'argv': list(argv), 'cwd': os.getcwd(), 'env': env})
+        for line in replies:
+            message = json.loads(line)
+            if 'exit' in message:
+                return message['exit']
+            target = stderr if message.get('stream') == 'stderr' else stdout
+            target.write(message.get('data', ''))
+            target.flush()
+    # 常驻进程中途退出
+    print("常驻进程连接中断", file=stderr)
+    return 1
+
+
+def serve(socket_path=None, data_dir=None):
+    """启动常驻进程（前台运行，由 systemd/supervisor 等负责守护）"""
+    socket_path = socket_path or default_socket_path()
+    if os.path.exists(socket_path):
+        if request([PING_COMMAND], socket_path, io.StringIO(), io.StringIO()) is not None:
+            print(f"常驻进程已在运行: {socket_path}")
+            return 1
+        # 上次异常退出留下的 socket 文件
+        os.remove(socket_path)
+
+    warm_up(data_dir)
+    server = WorkerServer(socket_path)
+    print(f"常驻进程已启动: {socket_path} (pid {os.getpid()})")
+    try:
+        server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    print("常驻进程已停止")
+    return 0
+
+
+def main(argv=None):
+    """命令行入口：启动、停止或查看常驻进程"""
+    parser = argparse.ArgumentParser(description='保持解释器和工作簿常驻的工作进程（Unix socket）')
+    parser.add_argument('action', nargs='?', choices=['start', 'stop', 'status'], default='start')
+    parser.add_argument('--socket', help='socket 路径（默认 $LCJX_SOCKET 或运行时目录下的 lcjx-<uid>.sock）')
+    parser.add_argument('--data-dir', help='启动时预先打开该目录中的输入文件')
+    args = parser.parse_args(argv)
+
+    socket_path = args.socket or default_socket_path()
+    if args.action == 'start':
+        return serve(socket_path, args.data_dir)
+
+    command = STOP_COMMAND if args.action == 'stop' else PING_COMMAND
+    if request([command], socket_path, io.StringIO(), io.StringIO()) is None:
+        print(f"常驻进程没有运行: {socket_path}")
+        return 1
+    print(f"常驻进程{'已停止' if args.action == 'stop' else '正在运行'}: {socket_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
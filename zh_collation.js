@@ -0,0 +1,75 @@
+/**
+ * 营销平台流程绩效分析平台 - 生成中文排序表 zh_collation.txt
+ * 用 Intl.Collator('zh-CN')（与浏览器的 localeCompare('zh-CN') 同为 ICU 排序规则）
+ * 给常用字符排好顺序，sort_index.py 在没有 PyICU 时按这张表生成文字列的排序索引。
+ *
+ * 用法: node zh_collation.js > zh_collation.txt
+ *
+ * 输出格式（按 \n 分行）：
+ * 第一行是排序时忽略的字符；
+ * 第二行是一级比较时展开成多个字符的字符（如 Ⅱ 按 II 比较），以 \t 分隔，每项第一个字符是原字符，其余是展开结果；
+ * 第三行是多音字的特殊读法（见 CONTRACTIONS），以 \t 分隔，每项是两个字和第一个字紧随其后排列的字；
+ * 第四行是一级比较时忽略、只在后续比较中起作用的字符（如声调符号），按升序排列；
+ * 其后每行是一组一级相同（只有大小写、全半角、声调等差别）的字符，组内、组间都按升序排列
+ */
+
+// 收录的字符范围（含两端）
+const RANGES = [
+    [0x0020, 0x007E],  // ASCII
+    [0x00A1, 0x017F],  // 拉丁字母补充、扩展A
+    [0x2010, 0x2027],  // 常用标点
+    [0x2030, 0x205E],
+    [0x2150, 0x218B],  // 数字形式（罗马数字等）
+    [0x2460, 0x24FF],  // 带圈、带括号的数字和字母
+    [0x3000, 0x303F],  // 中日韩符号和标点
+    [0x3400, 0x4DBF],  // 中日韩统一表意文字扩展A
+    [0x4E00, 0x9FFF],  // 中日韩统一表意文字
+    [0xF900, 0xFAFF],  // 中日韩兼容表意文字
+    [0xFF01, 0xFF65],  // 全角 ASCII、半角标点
+];
+
+// CLDR zh 拼音排序规则中的多字规则（&虫<重庆/庆：重庆的"重"排在"虫"之后，再接着比较"庆"）
+const CONTRACTIONS = [['重庆', '虫'], ['沈阳', '弞'], ['藏文', '銺']];
+
+const collator = new Intl.Collator('zh-CN');
+const primary = new Intl.Collator('zh-CN', { sensitivity: 'base' });
+
+const characters = [];
+RANGES.forEach(([start, end]) => {
+    for (let code = start; code <= end; code++) {
+        characters.push(String.fromCodePoint(code));
+    }
+});
+
+const ignorable = characters.filter(c => collator.compare(c, '') === 0);
+const expansions = characters
+    .map(c => [c, c.normalize('NFKC')])
+    .filter(([c, expanded]) => [...expanded].length > 1 && primary.compare(c, expanded) === 0)
+    .map(([c, expanded]) => c + expanded);
+const ordered = characters.filter(c => collator.compare(c, '') !== 0).sort(collator.compare);
+
+// 确认当前的 ICU 仍然使用这些规则：排在前导字之后、前导字的下一个字之前
+CONTRACTIONS.forEach(([word, anchor]) => {
+    const next = ordered[ordered.indexOf(anchor) + 1];
+    if (!(collator.compare(anchor + word[1], word) < 0 && collator.compare(word, next + word[1]) <= 0)) {
+        throw new Error(`ICU 的排序规则与 ${word} 的规则不符`);
+    }
+});
+const secondary = ordered.filter(c => primary.compare(c, '') === 0);
+
+const groups = [];
+ordered.filter(c => primary.compare(c, '') !== 0).forEach(c => {
+    const group = groups[groups.length - 1];
+    if (group && primary.compare(group[0], c) === 0) {
+        group.push(c);
+    } else {
+        groups.push([c]);
+    }
+});
+
+process.stdout.write([
+    ignorable.join(''),
+    expansions.join('\t'),
+    CONTRACTIONS.map(([word, anchor]) => word + anchor).join('\t'),
+    secondary.join(''),
+].concat(groups.map(group => group.join(''))).join('\n') + '\n');